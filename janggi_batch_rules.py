@@ -0,0 +1,195 @@
+import numpy as np
+from janggi_game import SQUARE_COORDINATES
+from janggi_pieces import GENERAL, GUARD, HORSE, ELEPHANT, CHARIOT, CANNON, SOLDIER, BLUE, RED
+from janggi_tensor import encode_boards
+
+# Batched versions of JanggiGame.move_check() and check_check() over stacks of boards as made by
+# janggi_tensor.encode_boards(): int8 arrays of shape (N, 10, 9) indexed [board, row, column] holding
+# 1 + 2 * piece type + color, with the piece types in the order of janggi_zobrist.PIECE_TYPES and Blue = 0, Red = 1.
+# Every rule is evaluated for the whole batch at once, quirks of the per-game rules included, so the results are the
+# same as asking each game separately.
+
+COLOR_INDICES = {"Blue": BLUE, "Red": RED, "BLUE": BLUE, "RED": RED, "blue": BLUE, "red": RED}
+
+_COLUMNS = np.arange(9)
+_ROWS = np.arange(10)
+
+
+def move_coordinates(moves):
+    """Returns (source, destination) pairs in algebraic notation as an (N, 4) array of x, y coordinates"""
+    return np.array([SQUARE_COORDINATES[source] + SQUARE_COORDINATES[destination] for source, destination in moves],
+                    dtype=np.int64).reshape(-1, 4)
+
+
+def _color_indices(colors, count):
+    """Returns colors given as 'Blue'/'Red' or 0/1, one per board or one for all, as an array of 0/1"""
+    if isinstance(colors, str):
+        colors = COLOR_INDICES[colors]
+    elif not np.isscalar(colors):
+        colors = [COLOR_INDICES.get(color, color) for color in colors]
+    return np.broadcast_to(np.asarray(colors, dtype=np.int64), (count,))
+
+
+def _cells(boards, index, columns, rows):
+    """Returns the piece codes at the given squares of boards[index], with 0 for squares off the board"""
+    inside = (columns >= 0) & (columns <= 8) & (rows >= 0) & (rows <= 9)
+    codes = boards[index, np.clip(rows, 0, 9), np.clip(columns, 0, 8)].astype(np.int64)
+    return np.where(inside, codes, 0)
+
+
+def _in_fortress(columns, rows):
+    return (columns >= 3) & (columns <= 5) & ((rows <= 2) | (rows >= 7))
+
+
+def _in_red_palace(columns, rows):
+    return (columns >= 3) & (columns <= 5) & (rows >= 0) & (rows <= 2)
+
+
+def _in_blue_palace(columns, rows):
+    return (columns >= 3) & (columns <= 5) & (rows >= 7) & (rows <= 9)
+
+
+def _move_check(boards, index, source_columns, source_rows, dest_columns, dest_rows):
+    """
+    Evaluates move_check() for the moves of boards[index]. All arguments are equal length integer arrays, with the
+    source squares on the board. Returns a bool array, False where the source square is empty
+    """
+    sc, sr, dc, dr = source_columns, source_rows, dest_columns, dest_rows
+    piece = boards[index, sr, sc].astype(np.int64)
+    target = _cells(boards, index, dc, dr)
+    piece_type = (piece - 1) // 2
+    color = (piece - 1) % 2
+
+    dx = dc - sc
+    dy = dr - sr
+    adx = np.abs(dx)
+    ady = np.abs(dy)
+    step_x = np.sign(dx)
+    step_y = np.sign(dy)
+
+    in_bounds = (dc >= 0) & (dc <= 8) & (dr >= 0) & (dr <= 9)
+    empty_or_enemy = (target == 0) | ((target - 1) % 2 != color)
+    both_in_fortress = _in_fortress(sc, sr) & _in_fortress(dc, dr)
+
+    # pieces strictly between source and destination along the source row and the source column, which is what the
+    # sliding rules count even for the diagonal moves inside a fortress
+    row_cells = boards[index, sr, :].astype(np.int64)
+    column_cells = boards[index, :, sc].astype(np.int64)
+    between_columns = ((_COLUMNS > np.minimum(sc, dc)[:, np.newaxis]) &
+                       (_COLUMNS < np.maximum(sc, dc)[:, np.newaxis]))
+    between_rows = ((_ROWS > np.minimum(sr, dr)[:, np.newaxis]) &
+                    (_ROWS < np.maximum(sr, dr)[:, np.newaxis]))
+    row_pieces = (row_cells != 0) & between_columns
+    column_pieces = (column_cells != 0) & between_rows
+    blockers = row_pieces.sum(axis=1) + column_pieces.sum(axis=1)
+    screens = ((row_pieces & ((row_cells - 1) // 2 != CANNON)).sum(axis=1) +
+               (column_pieces & ((column_cells - 1) // 2 != CANNON)).sum(axis=1))
+
+    # Horse: one step along the long side, which must be empty, then one diagonal step
+    horse_leg = _cells(boards, index, sc + np.where(adx == 2, step_x, 0), sr + np.where(ady == 2, step_y, 0))
+    horse = (((adx == 2) & (ady == 1)) | ((adx == 1) & (ady == 2))) & (horse_leg == 0)
+
+    # Elephant: one step along the long side and one diagonal step, both empty, then another diagonal step
+    first_x = sc + np.where(adx == 3, step_x, 0)
+    first_y = sr + np.where(ady == 3, step_y, 0)
+    elephant = ((((adx == 3) & (ady == 2)) | ((adx == 2) & (ady == 3))) &
+                (_cells(boards, index, first_x, first_y) == 0) &
+                (_cells(boards, index, first_x + step_x, first_y + step_y) == 0))
+
+    # Chariot: straight lines, the palace center to and from its palace, and three of the four corner diagonals
+    chariot = (((sc == 4) & (sr == 1) & _in_red_palace(dc, dr)) |
+               ((sc == 4) & (sr == 8) & _in_blue_palace(dc, dr)) |
+               ((dc == 4) & (dr == 1) & _in_red_palace(sc, sr)) |
+               ((dc == 4) & (dr == 8) & _in_blue_palace(sc, sr)) |
+               (both_in_fortress & (((dx == 2) & (ady == 2)) | ((dx == -2) & (dy == 2)))) |
+               (dc == sc) | (dr == sr)) & (blockers == 0)
+
+    # Cannon: straight lines or fortress corner diagonals over exactly one piece that is not a cannon, and never
+    # onto a cannon
+    cannon = ((both_in_fortress & (adx == 2) & (ady == 2)) | (dc == sc) | (dr == sr)) & \
+        ((target - 1) // 2 != CANNON) & (screens == 1)
+
+    # General and Guard: one orthogonal step or any step to or from their own palace's center, inside a fortress
+    center_row = np.where(color == BLUE, 8, 1)
+    own_palace = np.where(color == BLUE, _in_blue_palace(dc, dr), _in_red_palace(dc, dr))
+    palace_piece = _in_fortress(dc, dr) & (((adx == 1) & (dy == 0)) | ((dx == 0) & (ady == 1)) |
+                                          ((dc == 4) & (dr == center_row)) |
+                                          ((sc == 4) & (sr == center_row) & own_palace))
+
+    # Soldier: forward or sideways, and to or from the center of the opposing palace
+    enemy_center_row = np.where(color == BLUE, 1, 8)
+    enemy_palace_destination = np.where(color == BLUE, _in_red_palace(dc, dr), _in_blue_palace(dc, dr))
+    enemy_palace_source = np.where(color == BLUE, _in_red_palace(sc, sr), _in_blue_palace(sc, sr))
+    soldier = (((sc == 4) & (sr == enemy_center_row) & enemy_palace_destination) |
+               ((dc == 4) & (dr == enemy_center_row) & enemy_palace_source) |
+               ((adx == 1) & (dy == 0)) |
+               ((dx == 0) & (dy == np.where(color == BLUE, -1, 1))))
+
+    rules = np.select([piece_type == GENERAL, piece_type == GUARD, piece_type == HORSE, piece_type == ELEPHANT,
+                       piece_type == CHARIOT, piece_type == CANNON, piece_type == SOLDIER],
+                      [palace_piece, palace_piece, horse, elephant, chariot, cannon, soldier], False)
+
+    return (piece != 0) & in_bounds & empty_or_enemy & rules
+
+
+def batch_move_check(boards, moves):
+    """
+    Returns for each board whether its move follows the piece's rules, like JanggiGame.move_check(). moves is an
+    (N, 4) array of source column, source row, destination column, destination row, one move per board. Moves from
+    an empty square are False
+    """
+    boards = np.asarray(boards)
+    moves = np.asarray(moves, dtype=np.int64).reshape(-1, 4)
+    index = np.arange(len(boards))
+    return _move_check(boards, index, moves[:, 0], moves[:, 1], moves[:, 2], moves[:, 3])
+
+
+def batch_check_check(boards, colors):
+    """
+    Returns for each board whether the general of the given color can be reached by an opposing piece, like
+    JanggiGame.check_check(). colors is 'Blue'/'Red' (or 0/1) for all boards or one per board. Boards without that
+    general are False
+    """
+    boards = np.asarray(boards)
+    count = len(boards)
+    colors = _color_indices(colors, count)
+    flat = boards.reshape(count, 90).astype(np.int64)
+
+    is_general = flat == (1 + 2 * GENERAL + colors)[:, np.newaxis]
+    general_square = is_general.argmax(axis=1)
+
+    # every opposing piece of every board tries to reach its board's general in one batch
+    opposing = (flat != 0) & ((flat - 1) % 2 != colors[:, np.newaxis])
+    index, square = np.nonzero(opposing)
+    target = general_square[index]
+    hits = _move_check(boards, index, square % 9, square // 9, target % 9, target // 9)
+
+    attacked = np.zeros(count, dtype=bool)
+    attacked[index[hits]] = True
+    return attacked & is_general.any(axis=1)
+
+
+def batch_is_legal(boards, moves):
+    """
+    Returns for each board whether its move is legal: it follows the piece's rules and does not leave the mover's own
+    general in check. This is what make_move() accepts, apart from whose turn it is
+    """
+    boards = np.asarray(boards)
+    moves = np.asarray(moves, dtype=np.int64).reshape(-1, 4)
+    legal = batch_move_check(boards, moves)
+
+    index = np.nonzero(legal)[0]
+    sc, sr, dc, dr = moves[index].T
+    after = boards[index].copy()
+    local = np.arange(len(index))
+    colors = (after[local, sr, sc].astype(np.int64) - 1) % 2
+    after[local, dr, dc] = after[local, sr, sc]
+    after[local, sr, sc] = 0
+
+    legal[index] = ~batch_check_check(after, colors)
+    return legal
+
+
+def games_in_check(games, colors):
+    """Convenience wrapper: batch_check_check() over JanggiGame objects"""
+    return batch_check_check(encode_boards(games), colors)
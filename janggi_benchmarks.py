@@ -0,0 +1,198 @@
+import argparse
+import copy
+import pickle
+import random
+import sys
+import timeit
+from array import array
+import janggi_game
+from janggi_cache import EvalCache, PositionCache
+from janggi_moves import MOVE_TYPECODE
+from janggi_search import SELECTIVE, Searcher, evaluate
+from janggi_zobrist import position_hash
+
+# set constants
+REPEAT = 5
+NUMBER = 1000
+SEARCH_DEPTH = 4  # deep enough for null moves, which are tried with at least janggi_search.NULL_MOVE_DEPTH plies left
+SEARCH_SEED = 1
+OPENING = [('c7', 'c6'), ('c1', 'd3'), ('b10', 'd7'), ('b3', 'e3'), ('c10', 'd8'), ('h1', 'g3'), ('e7', 'e6'),
+           ('e3', 'e6'), ('h8', 'c8'), ('d3', 'e5')]
+CHECK = [('c8', 'c4'), ('e5', 'c4'), ('i10', 'i8'), ('g4', 'f4'), ('i8', 'f8'), ('g3', 'h5'), ('h10', 'g8'),
+         ('e6', 'e3')]
+
+
+def opening_game():
+    """Returns a game ten plies in, with a capture among them, so the histories are not empty"""
+    game = janggi_game.JanggiGame(sink=None)
+    for source, destination in OPENING:
+        game.make_move(source, destination)
+    return game
+
+
+def check_game():
+    """Returns the opening game played on until Blue is in check"""
+    game = opening_game()
+    for source, destination in CHECK:
+        game.make_move(source, destination)
+    return game
+
+
+def time_per_call(function, number=NUMBER, repeat=REPEAT):
+    """Returns the best time of repeat runs of number calls, in microseconds per call"""
+    return min(timeit.repeat(function, number=number, repeat=repeat)) / number * 1e6
+
+
+def bench_clone(number=NUMBER, repeat=REPEAT):
+    """Returns microseconds per copy of a game for JanggiGame.clone(), copy.deepcopy() and a pickle round trip"""
+    game = opening_game()
+    return {
+        'clone': time_per_call(game.clone, number, repeat),
+        'deepcopy': time_per_call(lambda: copy.deepcopy(game), number, repeat),
+        'pickle': time_per_call(lambda: pickle.loads(pickle.dumps(game, pickle.HIGHEST_PROTOCOL)), number, repeat),
+    }
+
+
+def bench_rules(number=NUMBER, repeat=REPEAT):
+    """Returns microseconds per call of the rules code that searches and move generation spend their time in"""
+    game = opening_game()
+    buffer = array(MOVE_TYPECODE)
+    return {
+        'check_check': time_per_call(lambda: game.check_check(game.get_turn()), number, repeat),
+        'attackers_of': time_per_call(lambda: game.attackers_of(game.get_general_coords(game.get_turn()), 'Red'),
+                                      number, repeat),
+        'is_in_check': time_per_call(lambda: game.is_in_check(game.get_turn()), number, repeat),
+        'position_hash': time_per_call(lambda: position_hash(game), number, repeat),
+        'legal_moves': time_per_call(game.generate_legal_moves, max(1, number // 100), repeat),
+        'packed_moves': time_per_call(lambda: game.generate_packed_moves(buffer), max(1, number // 100), repeat),
+        'evasions': time_per_call(check_game().generate_legal_moves, max(1, number // 10), repeat),
+    }
+
+
+def bench_attack_maps(number=NUMBER, repeat=REPEAT):
+    """
+    Returns microseconds per call of the attack queries with and without attack maps, and of making and taking back a
+    move, which is what keeping the maps costs
+    """
+    game = opening_game()
+    mapped = opening_game()
+    mapped.set_attack_maps(True)
+    turn = game.get_turn()
+
+    def make_and_undo(game):
+        game.make_move('g7', 'f7')
+        game.undo_move()
+
+    return {
+        'check_check': time_per_call(lambda: game.check_check(turn), number, repeat),
+        'check_check mapped': time_per_call(lambda: mapped.check_check(turn), number, repeat),
+        'attack_count': time_per_call(lambda: game.get_attack_count(4, 4, 'Red'), number, repeat),
+        'attack_count mapped': time_per_call(lambda: mapped.get_attack_count(4, 4, 'Red'), number, repeat),
+        'make_undo': time_per_call(lambda: make_and_undo(game), number, repeat),
+        'make_undo mapped': time_per_call(lambda: make_and_undo(mapped), number, repeat),
+    }
+
+
+def bench_cache(number=NUMBER, repeat=REPEAT):
+    """
+    Returns microseconds per call of the kept position hash, of the rules results a warm PositionCache holds and of an
+    evaluation computed and found in a warm EvalCache
+    """
+    game = opening_game()
+    game.set_cache(PositionCache())
+    turn = game.get_turn()
+    searcher = Searcher(eval_cache=EvalCache())
+    searcher.evaluate(game)
+    return {
+        'position_hash kept': time_per_call(game.get_position_hash, number, repeat),
+        'check_check cached': time_per_call(lambda: game.check_check(turn), number, repeat),
+        'legal_moves cached': time_per_call(game.generate_legal_moves, number, repeat),
+        'evaluate': time_per_call(lambda: evaluate(game), number, repeat),
+        'evaluate cached': time_per_call(lambda: searcher.evaluate(game), number, repeat),
+    }
+
+
+def bench_search(number=NUMBER, repeat=REPEAT):
+    """
+    Returns microseconds per SEARCH_DEPTH ply search of the opening game with a fresh Searcher, without selective
+    search, with each part of it alone and with all of it, and the nodes each search visits and how often each part
+    of the selective search fired (see Searcher.get_stats()). Every searcher breaks ties with the same SEARCH_SEED, so
+    the configurations search the same moves in the same order and differ only by their selective search
+    """
+    game = opening_game()
+    configurations = [('full', ())] + [(name, (name,)) for name in SELECTIVE] + [('selective', SELECTIVE)]
+    counted = {'null_move': 'null_cutoffs', 'reductions': 'reduced', 'futility': 'futile'}
+
+    def searcher(selective):
+        return Searcher(SEARCH_DEPTH, random.Random(SEARCH_SEED), **dict.fromkeys(selective, True))
+
+    results = {}
+    for label, selective in configurations:
+        results[label] = time_per_call(lambda: searcher(selective).search(game), max(1, number // 1000), repeat)
+        counts = searcher(selective)
+        counts.search(game)
+        stats = counts.get_stats()
+        results[label + ' nodes'] = stats['nodes']
+        for name in selective:
+            results[f'{label} {counted[name]}'] = stats[counted[name]]
+    return results
+
+
+def bench_nnue(number=NUMBER, repeat=REPEAT):
+    """
+    Returns microseconds per call of the handcrafted evaluation, of the NNUE evaluation (see janggi_nnue) from an
+    accumulator kept by the game and from one summed afresh, and of making and taking back a move, which is what
+    keeping the accumulator costs. Needs NumPy
+    """
+    import numpy as np
+    from janggi_nnue import HIDDEN, INPUTS, Network
+
+    # random weights of the full size cost the same to evaluate as trained ones
+    weights = np.random.default_rng(1)
+    network = Network(weights.integers(-64, 64, (INPUTS, HIDDEN)), weights.integers(-64, 64, HIDDEN),
+                      weights.integers(-64, 64, 2 * HIDDEN), 0, 1 / 4096)
+    game = opening_game()
+    kept = opening_game()
+    network.attach(kept)
+
+    def make_and_undo(game):
+        game.make_move('g7', 'f7')
+        game.undo_move()
+
+    return {
+        'evaluate': time_per_call(lambda: evaluate(game), number, repeat),
+        'nnue kept': time_per_call(lambda: network.evaluate(kept), number, repeat),
+        'nnue afresh': time_per_call(lambda: network.evaluate(game), number, repeat),
+        'make_undo': time_per_call(lambda: make_and_undo(game), number, repeat),
+        'make_undo kept': time_per_call(lambda: make_and_undo(kept), number, repeat),
+    }
+
+
+BENCHMARKS = {'clone': bench_clone, 'rules': bench_rules, 'attack_maps': bench_attack_maps, 'cache': bench_cache,
+              'search': bench_search, 'nnue': bench_nnue}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Times the hot paths of the Janggi game and its tools')
+    parser.add_argument('benchmarks', nargs='*', metavar='benchmark',
+                        help=f'benchmarks to run, all of them by default: {", ".join(sorted(BENCHMARKS))}')
+    parser.add_argument('--number', type=int, default=NUMBER, help='calls per timing run')
+    parser.add_argument('--repeat', type=int, default=REPEAT, help='timing runs, the best is reported')
+    args = parser.parse_args(argv)
+    for name in args.benchmarks:
+        if name not in BENCHMARKS:
+            parser.error(f'unknown benchmark {name!r}')
+
+    for name in args.benchmarks or sorted(BENCHMARKS):
+        results = BENCHMARKS[name](args.number, args.repeat)
+        print(name)
+        for label, result in results.items():
+            if isinstance(result, int):  # a count, such as the nodes of a search
+                print(f'  {label:<24} {result:10d}')
+            else:
+                print(f'  {label:<24} {result:10.2f} us {1e6 / result:12.1f} /s')
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
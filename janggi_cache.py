@@ -0,0 +1,120 @@
+from array import array
+from collections import OrderedDict
+
+# set constants
+CACHE_SIZE = 4096
+EVAL_CACHE_SIZE = 1 << 16
+
+
+class PositionCache:
+    """
+    Remembers the results of the rules for positions seen before, keyed by position hash, and forgets the least
+    recently used once it holds size of them. A JanggiGame given a cache (see JanggiGame.set_cache()) keeps its
+    legal moves, check and checkmate results in it. Keys hold the position hash, which changes with every move, undo
+    and turn, so a result is never looked up for a position other than its own. Games may share a cache
+    """
+
+    def __init__(self, size=CACHE_SIZE):
+        """Initializes an empty cache of at most size results"""
+        self._size = size
+        self._entries = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def get_size(self):
+        """Returns the number of results the cache holds at most"""
+        return self._size
+
+    def get(self, key):
+        """Returns the result stored under key, or None if there is none. Results are never None themselves"""
+        result = self._entries.get(key)
+        if result is None:
+            self._misses += 1
+        else:
+            self._hits += 1
+            self._entries.move_to_end(key)
+        return result
+
+    def put(self, key, result):
+        """Stores a result under key, forgetting the least recently used result if the cache is full"""
+        self._entries[key] = result
+        self._entries.move_to_end(key)
+        if len(self._entries) > self._size:
+            self._entries.popitem(last=False)
+            self._evictions += 1
+
+    def clear(self):
+        """Forgets every result and resets the statistics"""
+        self._entries.clear()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def get_stats(self):
+        """Returns a dictionary of the hits, misses, evictions, hit rate, results held and size of the cache"""
+        lookups = self._hits + self._misses
+        return {'hits': self._hits, 'misses': self._misses, 'evictions': self._evictions,
+                'hit_rate': self._hits / lookups if lookups else 0.0, 'entries': len(self._entries),
+                'size': self._size}
+
+
+class EvalCache:
+    """
+    Remembers the evaluation of positions seen before, keyed by position hash, in fixed arrays of size slots. Each
+    position has one slot, picked by the low bits of its hash, and a new evaluation always replaces the one in its slot.
+    Searches keep it apart from their transposition table (see janggi_search.Searcher), so leaf positions reached by
+    different move orders are evaluated once
+    """
+
+    def __init__(self, size=EVAL_CACHE_SIZE):
+        """Initializes an empty cache of size slots, which must be a power of two"""
+        if size <= 0 or size & (size - 1):
+            raise ValueError(f'size must be a power of two, not {size}')
+        self._size = size
+        self._mask = size - 1
+        self._keys = array('Q', bytes(8 * size))
+        self._scores = array('q', bytes(8 * size))
+        self._used = bytearray(size)
+        self._entries = 0
+        self._hits = 0
+        self._misses = 0
+        self._replacements = 0
+
+    def get_size(self):
+        """Returns the number of slots of the cache"""
+        return self._size
+
+    def get(self, key):
+        """Returns the evaluation stored under key, or None if there is none"""
+        slot = key & self._mask
+        if self._used[slot] and self._keys[slot] == key:
+            self._hits += 1
+            return self._scores[slot]
+        self._misses += 1
+        return None
+
+    def put(self, key, score):
+        """Stores an integer evaluation under key, replacing whatever its slot held"""
+        slot = key & self._mask
+        if not self._used[slot]:
+            self._used[slot] = 1
+            self._entries += 1
+        elif self._keys[slot] != key:
+            self._replacements += 1
+        self._keys[slot] = key
+        self._scores[slot] = score
+
+    def clear(self):
+        """Forgets every evaluation and resets the statistics"""
+        self._used = bytearray(self._size)
+        self._entries = 0
+        self._hits = 0
+        self._misses = 0
+        self._replacements = 0
+
+    def get_stats(self):
+        """Returns a dictionary of the hits, misses, replacements, hit rate, slots filled and size of the cache"""
+        lookups = self._hits + self._misses
+        return {'hits': self._hits, 'misses': self._misses, 'replacements': self._replacements,
+                'hit_rate': self._hits / lookups if lookups else 0.0, 'entries': self._entries, 'size': self._size}
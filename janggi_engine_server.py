@@ -1,69 +1,183 @@
+import argparse
+import random
 import struct
 from socket import *
 from select import *
-import sys
 import pickle
 import janggi_game
+from janggi_journal import GameJournal, SYNC_POLICIES, restore_game
 
 # set constants
 HEADER_LENGTH = 8
 ADDRESS = "localhost"
 PORT = 7777
+BACKLOG = 128
 
-# The server creates a socket and binds to ‘localhost’ and port xxxx
-server_socket = socket(AF_INET, SOCK_STREAM)
 
-# so no hanging occurs when testing
-server_socket.setsockopt(SOL_SOCKET, SO_REUSEADDR, 1)
-server_socket.bind((ADDRESS, PORT))
+def create_server_socket(address=ADDRESS, port=PORT):
+    """This function creates the server socket, binds it to the given address and port and starts listening"""
+    # The server creates a socket and binds to ‘localhost’ and port xxxx
+    server_socket = socket(AF_INET, SOCK_STREAM)
 
-# The server then listens for a connection
-server_socket.listen(1)
-print(f'Server listening on: {ADDRESS} on port: {PORT}...')
+    # so no hanging occurs when testing
+    server_socket.setsockopt(SOL_SOCKET, SO_REUSEADDR, 1)
+    server_socket.bind((address, port))
 
-# select will use these to make subsets
-sockets_list = [server_socket]
+    # The server then listens for connections
+    server_socket.listen(BACKLOG)
+    return server_socket
+
+
+def receive_exactly(client_socket, size):
+    """This function keeps receiving until size bytes arrived and returns False if the connection closes first"""
+    data = b''
+    while len(data) < size:
+        chunk = client_socket.recv(size - len(data))
+
+        if not len(chunk):
+            return False
+
+        data += chunk
+    return data
 
 
 def receive_message(client_socket):
     """This function receives messages from the client and returns False if an error occurs"""
     try:
-        header = client_socket.recv(HEADER_LENGTH)
+        header = receive_exactly(client_socket, HEADER_LENGTH)
 
-        if not len(header):
+        if not header:
             return False
 
         # get header to know how much to receive
         game_size = struct.unpack("!Q", header)[0]
 
-        return client_socket.recv(game_size)
-
+        return receive_exactly(client_socket, game_size)
 
     except Exception as e:
+        # only this client is dropped, the others keep playing
         print('Reading error: {}'.format(str(e)))
-        sys.exit()
+        return False
+
+
+def send_game(client_socket, game):
+    """This function encodes the game to bytes, prepares the header and sends both to the client"""
+    payload = pickle.dumps(game)
+    header = struct.pack('!Q', len(payload))
+    client_socket.sendall(header + payload)
+
+
+def prompt_move(game):
+    """Asks for the computer's move on the command line. Returns a (source, destination) pair or None if empty"""
+    move = input("Computer's Move: ")
+
+    if move:
+        move_arr = move.split(',')
+        return move_arr[0], move_arr[-1].strip()
+
+    return None
+
+
+def random_move(game):
+    """
+    Picks the computer's move at random from the legal moves of the game. Passes the turn if no legal move is left and
+    returns None if the game is already over
+    """
+    if game.get_game_state() != "UNFINISHED":
+        return None
+
+    moves = game.generate_legal_moves()
+    if moves:
+        return random.choice(moves)
+
+    # no legal move but not in checkmate, so the only thing left is to pass
+    general = game.get_algebraic(*game.get_general_coords(game.get_turn()))
+    return general, general
+
+
+def send_reply(client_socket, game, choose_move=prompt_move):
+    """This function makes the computer's move and sends the game back to the client that sent it"""
+    move = choose_move(game)
+
+    # If a move was chosen - make it
+    if move:
+        game.make_move(move[0], move[1])
+
+    send_game(client_socket, game)
 
 
-def send_reply(write_sockets, game):
-    """This function sends a message to the client and returns False if an error occurs"""
-    # iterate over read_sockets
-    for socket in write_sockets:
-        # get user input
-        move = input("Computer's Move: ")
+def restore_games(journal, sink=janggi_game.DEFAULT_SINK):
+    """
+    Restores every unfinished game in the journal by replaying only its own records. Returns them by game id. Games
+    marked finished in the journal are skipped without being read; games that ended before the server marked them are
+    still replayed and left out
+    """
+    games = {}
+    for game_id in journal.unfinished_game_ids():
+        game = restore_game(journal, game_id, sink)
+        if game.get_game_state() == "UNFINISHED":
+            games[game_id] = game
+    return games
 
-        # If message is not empty - send it
-        if move:
-            game.make_move(move)
-            # Encode game to bytes, prepare header and convert to bytes, then send
-            payload = pickle.dumps(game)
-            header = struct.pack('!Q', len(payload))
-            socket.send(header + payload)
 
+def make_journaled_move(game, source, destination, journal):
+    """Makes a move in the server's copy of a game and journals it if it was accepted. Returns True if accepted"""
+    made = len(game.get_moves())
+
+    # make_move() returns False for a checkmating move, so the move list tells whether the move was made
+    game.make_move(source, destination)
+    if len(game.get_moves()) == made:
+        return False
+
+    journal.append(game.get_game_id(), source, destination)
+    return True
+
+
+def journal_reply(received, games, journal, choose_move=prompt_move, sink=janggi_game.DEFAULT_SINK):
+    """
+    Brings the server's copy of the received game up to date with the moves the client made since the server last saw
+    it, makes the computer's move, and journals every accepted move. A game without a known id starts a new game.
+    The server's copy is authoritative and is what gets sent back
+    """
+    game = games.get(received.get_game_id())
+    if game is None:
+        game = janggi_game.JanggiGame(sink)
+        game.set_game_id(journal.new_game_id())
+        games[game.get_game_id()] = game
+
+    for source, destination in received.get_moves()[len(game.get_moves()):]:
+        if not make_journaled_move(game, source, destination, journal):
+            break
+
+    move = choose_move(game)
+    if move:
+        make_journaled_move(game, move[0], move[1], journal)
+
+    # finished games are kept only in the journal, marked so that restoring skips them
+    if game.get_game_state() != "UNFINISHED":
+        journal.finish(game.get_game_id())
+        games.pop(game.get_game_id())
+
+    return game
+
+
+def serve(server_socket, choose_move=prompt_move, journal=None, quiet=False):
+    """
+    Serves every connected client with select(). Each client sends its game after making a move and gets the same
+    game back with the computer's reply, so games never leak between clients. With a journal, every accepted move is
+    journaled, the moves of one select() round are flushed together before any reply is sent, and the unfinished
+    games of the journal are restored when the server starts. A quiet server renders no boards at all
+    """
+    sink = None if quiet else janggi_game.DEFAULT_SINK
+    # select will use these to make subsets
+    sockets_list = [server_socket]
+    client_addresses = {}
+    games = restore_games(journal, sink) if journal is not None else {}
 
-def main():
     while True:
-        # get read and exception sockets - pass write_sockets
-        read_sockets, write_sockets, exception_sockets = select(sockets_list, sockets_list, sockets_list)
+        # get read and exception sockets - clients are only written to when they sent a game
+        read_sockets, _, exception_sockets = select(sockets_list, [], sockets_list)
+        replies = []
 
         # iterate over read_sockets
         for socket in read_sockets:
@@ -76,6 +190,7 @@ def main():
 
                 # add client socket to socket_list
                 sockets_list.append(client_socket)
+                client_addresses[client_socket] = client_address
 
                 print("Connected by ('{}',:{})".format(*client_address))
 
@@ -84,9 +199,9 @@ def main():
                 # When connected, the server calls recv to receive data
                 game = receive_message(socket)
 
-                # If the reply is /q (there will be no message received, client exited), the server quits
+                # If the reply is /q (there will be no message received, client exited), close the connection
                 if not game:
-                    print(f'Closed connection from: {sockets_list[1].getpeername()}')
+                    print(f'Closed connection from: {client_addresses.pop(socket)}')
 
                     # Remove from sockets_list for socket() at start of loop
                     sockets_list.remove(socket)
@@ -95,15 +210,67 @@ def main():
                     socket.close()
 
                     # wait for another client
-                    # continue
+                    continue
 
-                # The server prints the data, then prompts for a reply
+                # The server prints the data, then replies
                 game = pickle.loads(game)
 
-                game.print_board()
-                # board = receive_message(socket)
-                # Otherwise, the server sends the reply
-                send_reply(write_sockets, game)
+                game.set_sink(sink)
+                if not quiet:
+                    game.print_board()
+
+                if journal is not None:
+                    replies.append((socket, journal_reply(game, games, journal, choose_move, sink)))
+                    continue
+
+                try:
+                    send_reply(socket, game, choose_move)
+                except OSError as e:
+                    print('Sending error: {}'.format(str(e)))
+
+        if replies:
+            # group commit: the round's moves are written before any of them is acknowledged
+            journal.flush()
+            for socket, game in replies:
+                try:
+                    send_game(socket, game)
+                except OSError as e:
+                    print('Sending error: {}'.format(str(e)))
+
+        for socket in exception_sockets:
+            if socket in client_addresses:
+                client_addresses.pop(socket)
+                sockets_list.remove(socket)
+                socket.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serves Janggi games to clients and replies with the computer's move")
+    parser.add_argument('--address', default=ADDRESS)
+    parser.add_argument('--port', type=int, default=PORT)
+    parser.add_argument('--auto', action='store_true',
+                        help='reply with random legal moves instead of prompting for each move')
+    parser.add_argument('--quiet', action='store_true', help='do not print the boards of the games served')
+    parser.add_argument('--journal', default=None,
+                        help='append accepted moves to this journal file and restore its unfinished games on startup')
+    parser.add_argument('--sync', choices=SYNC_POLICIES, default='interval',
+                        help='when the journal is fsync\'d: after every batch, at most once per --sync-interval, '
+                             'or never')
+    parser.add_argument('--sync-interval', type=float, default=1.0, help='seconds between journal fsyncs')
+    args = parser.parse_args(argv)
+
+    journal = None
+    if args.journal:
+        journal = GameJournal(args.journal, args.sync, sync_interval=args.sync_interval)
+
+    server_socket = create_server_socket(args.address, args.port)
+    print(f'Server listening on: {args.address} on port: {args.port}...')
+
+    try:
+        serve(server_socket, random_move if args.auto else prompt_move, journal, args.quiet)
+    finally:
+        if journal is not None:
+            journal.close()
 
 
 if __name__ == "__main__":
@@ -1,6 +1,18 @@
 import sys
 import os
+from array import array
 from janggi_pieces import *
+from janggi_sinks import NullSink, TextSink
+from janggi_zobrist import CODE_KEYS, RED_TO_MOVE_KEY, board_hash
+
+# lookup tables between algebraic squares ('a1' to 'i10') and x, y coordinates, built once instead of on every call
+COLUMN_LETTERS = 'abcdefghi'
+ALGEBRAIC_SQUARES = {(column, row): COLUMN_LETTERS[column] + str(row + 1) for column in range(9) for row in range(10)}
+SQUARE_COORDINATES = {square: coordinate for coordinate, square in ALGEBRAIC_SQUARES.items()}
+SQUARE_COORDINATES.update({square.upper(): coordinate for square, coordinate in list(SQUARE_COORDINATES.items())})
+
+# prints the board after every move, like the game always did
+DEFAULT_SINK = TextSink()
 
 
 class JanggiGame:
@@ -12,18 +24,30 @@ class JanggiGame:
     class that represents the pieces on the board
     """
 
-    def __init__(self):
+    def __init__(self, sink=DEFAULT_SINK):
         """
         Initializes the board game with the pieces in the correct spots, sets the game as unfinished, and
         sets the turn to the Cho (Blue) player. Must communicate with the GamePiece class to populate the board
-        and to move the pieces in the board.
+        and to move the pieces in the board. The sink (see janggi_sinks) is told about every move, pass and rejected
+        move; None or a NullSink means nothing is rendered at all.
         """
 
+        self._sink = None
+        self.set_sink(sink)
         self._current_state = "UNFINISHED"
-        self._pieces = self.initialize_pieces()
-        self._board = self.place_pieces(self._pieces)
+        self._board = dict(START_BOARD)
+        self._rank_masks, self._file_masks, self._screen_rank_masks, self._screen_file_masks = (
+            masks.copy() for masks in START_MASKS)
         self._turn = "Blue"
         self._check = ""
+        self._moves = []
+        self._undo = []
+        self._game_id = None
+        self._attack_maps = None
+        self._accumulator = None
+        self._hash = START_HASH
+        self._generals = list(START_GENERALS)
+        self._cache = None
 
     def get_game_state(self):
         """Returns the current state of the game (the game is unfinished, or which player has won)"""
@@ -39,6 +63,141 @@ class JanggiGame:
 
         self._current_state = winner.upper() + "_WON"
 
+    def __getstate__(self):
+        """Games are pickled without their sink, which may hold an open stream, and without their cache"""
+        state = self.__dict__.copy()
+        del state['_sink']
+        del state['_cache']
+        return state
+
+    def __setstate__(self, state):
+        """Unpickled games print to the console like new games do"""
+        self.__dict__.update(state)
+        self._sink = DEFAULT_SINK
+        self._cache = None
+
+    def clone(self):
+        """
+        Returns an independent copy of the game that shares only the sink, the cache, the pieces and the immutable
+        tables. Pieces keep no location of their own, so copying the board, move history and undo history is all it
+        takes, which is far cheaper than copy.deepcopy() or a pickle round trip
+        """
+        game = JanggiGame.__new__(JanggiGame)
+        game._sink = self._sink
+        game._current_state = self._current_state
+        game._board = self._board.copy()
+        game._rank_masks = self._rank_masks.copy()
+        game._file_masks = self._file_masks.copy()
+        game._screen_rank_masks = self._screen_rank_masks.copy()
+        game._screen_file_masks = self._screen_file_masks.copy()
+        game._turn = self._turn
+        game._check = self._check
+        game._moves = self._moves.copy()
+        game._undo = self._undo.copy()
+        game._game_id = self._game_id
+        game._attack_maps = self._attack_maps.copy(game) if self._attack_maps is not None else None
+        game._accumulator = self._accumulator.copy(game) if self._accumulator is not None else None
+        game._hash = self._hash
+        game._generals = self._generals.copy()
+        game._cache = self._cache
+        return game
+
+    def get_sink(self):
+        """Returns the sink told about the game's events, or None"""
+        return self._sink
+
+    def set_sink(self, sink):
+        """Sets the sink told about the game's events. A NullSink is stored as None so make_move() skips it entirely"""
+        if type(sink) is NullSink:
+            sink = None
+        self._sink = sink
+
+    def get_moves(self):
+        """Returns the list of moves made so far as (source, destination) pairs in the notation given to make_move()"""
+        return self._moves
+
+    def undo_move(self):
+        """
+        Takes back the last move or pass made with make_move(), restoring any captured piece, the turn, the check state
+        and the game state. Returns False if there is nothing to take back, otherwise True. This lets searches try a
+        move and return to the position without copying the game
+        """
+        if not self._undo:
+            return False
+
+        undo = self._undo.pop()
+        self._moves.pop()
+        self.toggle_turn()
+        if undo is None:  # a pass
+            return True
+
+        piece, source_column, source_row, dest_column, dest_row, captured, check = undo
+        self.move_piece(piece, dest_column, dest_row, source_column, source_row)
+        self.set_piece_by_coordinate(dest_column, dest_row, captured)
+        self.set_check_state(check)
+        self._current_state = "UNFINISHED"
+        return True
+
+    def get_cache(self):
+        """Returns the PositionCache the game keeps its rules results in, or None"""
+        return self._cache
+
+    def set_cache(self, cache):
+        """
+        Sets the janggi_cache.PositionCache generate_legal_moves(), check_check() and checkmate_check() keep their
+        results in, or None for no cache. Games may share one
+        """
+        self._cache = cache
+
+    def get_position_hash(self):
+        """
+        Returns the Zobrist hash of the position (see janggi_zobrist.position_hash()), which the game keeps up to date
+        on every change to the board and the turn instead of computing it from the board
+        """
+        return self._hash
+
+    def get_attack_maps(self):
+        """Returns the AttackMaps kept up to date with the board, or None if the game keeps none"""
+        return self._attack_maps
+
+    def set_attack_maps(self, enabled):
+        """
+        Starts or stops keeping AttackMaps, which make check_check() and get_attack_count() single lookups at the cost
+        of updating the maps on every change to the board. Worth it when a position is asked about far more often than
+        moves are made, as in analysis
+        """
+        self._attack_maps = AttackMaps(self) if enabled else None
+
+    def get_accumulator(self):
+        """Returns the evaluation accumulator kept up to date with the board, or None if the game keeps none"""
+        return self._accumulator
+
+    def set_accumulator(self, accumulator):
+        """
+        Sets the accumulator told about every change to the board, such as a janggi_nnue.Accumulator, or None. It is
+        called as accumulator.update(square, removed piece, added piece), with None for an empty square, and copied by
+        clone() with accumulator.copy(game)
+        """
+        self._accumulator = accumulator
+
+    def get_attack_count(self, column, row, color):
+        """
+        Returns the number of pieces of the color, 'Blue' / 'Red' or BLUE / RED, that can move to the given coordinates
+        by move_check(). Read from the attack maps when the game keeps them
+        """
+        color = color if color in (BLUE, RED) else COLOR_CODES[color]
+        if self._attack_maps is not None:
+            return self._attack_maps.get_count(column, row, color)
+        return sum(1 for _ in self.generate_attackers(column, row, color))
+
+    def get_game_id(self):
+        """Returns the identifier a server assigned to this game, or None"""
+        return self._game_id
+
+    def set_game_id(self, game_id):
+        """Sets the identifier a server uses to journal and restore this game"""
+        self._game_id = game_id
+
     def get_check_state(self):
         """Returns the check state of player"""
         return self._check
@@ -67,54 +226,141 @@ class JanggiGame:
         otherwise.
         """
 
-        if self.get_check_state().upper() == color.upper():
+        check = self.get_check_state()
+        if check == color:
             return True
+        if not check:
+            return False
 
-        return False
+        return check.upper() == color.upper()
 
     def check_check(self, color):
         """
         Takes a color and finds if that color's general can be threatened by an opposing player's piece. It does so by
-        calling a helper function to find the general's location and then iterates through the game board to find all
-        pieces of the opposing color and iterates through them to see if they can reach the general by checking all
-        their possible moves with the method move_check(). If any can, check_check() returns True, otherwise, it
+        calling a helper function to find the general's location and then asking generate_attackers() whether any
+        piece of the opposing color can reach that square. If any can, check_check() returns True, otherwise, it
         returns False
         """
 
+        cache = self._cache
+        if cache is not None and self._attack_maps is None:
+            key = (self._hash, 'check', color)
+            in_check = cache.get(key)
+            if in_check is not None:
+                return in_check
+
         if color == "Blue":
-            opposing_color = "Red"
+            opposing_color = RED
         else:
-            opposing_color = "Blue"
+            opposing_color = BLUE
 
-        (general_column, general_row) = self.get_general_coords(color)
+        (general_column, general_row) = self._generals[COLOR_CODES[color]]
 
-        for coordinate in self.get_board():
-            piece = self.get_piece_by_coordinate(coordinate[0], coordinate[1])
-            if (piece is not None) and (piece.get_color() == opposing_color):
-                # test possible moves
-                if self.move_check(piece.get_column(), piece.get_row(), general_column, general_row):
-                    return True
-        return False
+        if self._attack_maps is not None:
+            return self._attack_maps.get_count(general_column, general_row, opposing_color) > 0
 
-    def checkmate_check(self, color):
+        in_check = False
+        for _ in self.generate_attackers(general_column, general_row, opposing_color):
+            in_check = True
+            break
+
+        if cache is not None:
+            cache.put(key, in_check)
+        return in_check
+
+    def attackers_of(self, square, color):
         """
-        Takes a color and checks if any possible move will not end in check. It does so by making a copy of the board
-        that can be reverted to if need be, then it iterates through the board and finds every piece of the given color.
-        The method then sends the piece and all positions on the board to a helper function, will_move_end_check()
-        that determines if any piece can move in such a way that does not end in check. If such a move exists and that
-        helper function returns True, then checkmate_check() returns False, meaning there is no checkmate.
+        Takes a (column, row) square and a color, 'Blue' / 'Red' or BLUE / RED, and returns the pieces of that color
+        that can move to the square by move_check(), as PlacedPiece objects. A piece of the same color standing on
+        the square is not attacked by its own side, so the list is then empty
         """
-        board = self.get_board().copy()
+        color = color if color in (BLUE, RED) else COLOR_CODES[color]
+        board = self.get_board()
+        return [PlacedPiece(board[column, row], column, row)
+                for column, row in self.generate_attackers(square[0], square[1], color)]
 
-        for coordinate in board:
-            piece = self.get_piece_by_coordinate(coordinate[0], coordinate[1])
-            if (piece is not None) and (piece.get_color() == color):
-                for x in range(9):
-                    for y in range(10):
-                        if self.will_move_end_check(piece, x, y):
-                            return False
+    def generate_attackers(self, x, y, color):
+        """
+        Generator of the column, row squares of the pieces of the color code that can move to x, y by move_check().
+        It works backwards from x, y instead of trying every piece: straight Chariot and Cannon lines are read from
+        the sliding tables of the square's own rank and file, since a line can be walked either way, palace lines are
+        looked up around the square, and the other pieces are looked for on the squares their reversed move tables
+        give
+        """
+        board = self.get_board()
+        target = board.get((x, y))
+        if target is not None and target.get_color_code() == color:
+            return
+
+        chariot = PIECES[CHARIOT][color]
+        cannon = PIECES[CANNON][color]
+        rank_mask = self._rank_masks[y]
+        file_mask = self._file_masks[x]
+
+        # the nearest piece each way along the rank and file, for a Chariot
+        pieces = RANK_SLIDES[x][rank_mask] & rank_mask
+        while pieces:
+            column = (pieces & -pieces).bit_length() - 1
+            pieces &= pieces - 1
+            if board[column, y] is chariot:
+                yield column, y
+        pieces = FILE_SLIDES[y][file_mask] & file_mask
+        while pieces:
+            row = (pieces & -pieces).bit_length() - 1
+            pieces &= pieces - 1
+            if board[x, row] is chariot:
+                yield x, row
+
+        # the pieces beyond exactly one screen, for a Cannon, which may not capture a Cannon
+        if target is None or target.get_type_code() != CANNON:
+            pieces = RANK_JUMPS[x][self._screen_rank_masks[y]] & rank_mask
+            while pieces:
+                column = (pieces & -pieces).bit_length() - 1
+                pieces &= pieces - 1
+                if board[column, y] is cannon:
+                    yield column, y
+            pieces = FILE_JUMPS[y][self._screen_file_masks[x]] & file_mask
+            while pieces:
+                row = (pieces & -pieces).bit_length() - 1
+                pieces &= pieces - 1
+                if board[x, row] is cannon:
+                    yield x, row
+
+        # Chariot and Cannon moves along the diagonal palace lines, which never leave the palace of the square
+        if (x, y) in FORTRESS_SQUARES:
+            for column, row in (*PALACE_EDGES[x, y], *PALACE_DIAGONALS.get((x, y), NO_SQUARES)):
+                if column != x and row != y:
+                    piece = board.get((column, row))
+                    if (piece is chariot or piece is cannon) and self.move_check(column, row, x, y):
+                        yield column, row
+
+        for type_code in (GENERAL, GUARD, HORSE, ELEPHANT, SOLDIER):
+            piece = PIECES[type_code][color]
+            for column, row in piece.sources_to(x, y):
+                if board.get((column, row)) is piece and self.move_check(column, row, x, y):
+                    yield column, row
 
-        return True
+    def checkmate_check(self, color):
+        """
+        Takes a color and checks if any possible move will not end in check. It does so by asking generate_moves() for
+        the first legal move of that color, which only tries the evasions of generate_evasions() when the color is in
+        check. If such a move exists, then checkmate_check() returns False, meaning there is no checkmate.
+        """
+        cache = self._cache
+        if cache is not None:
+            key = (self._hash, 'checkmate', color)
+            mated = cache.get(key)
+            if mated is not None:
+                return mated
+
+        mated = True
+        for _ in self.generate_moves(color):
+            mated = False
+            break
+
+        if cache is not None:
+            cache.put(key, mated)
+        return mated
 
     def will_move_end_check(self, piece, x, y):
         """
@@ -122,40 +368,282 @@ class JanggiGame:
         on the board and checks if each piece can move in such a way that doesn't result in check. It does so by calling
         move_check() to find if there are any valid movements, then calls move_piece() to move the pieces there and then
         calls check_check() to see if those moves result in a situation such that that color is not in check. If such
-        a move doesn't exist, then this method returns False and therefore, checkmate is True.
+        a move doesn't exist, then this method returns False and therefore, checkmate is True. The piece is a
+        PlacedPiece, such as get_placed_piece() returns, since pieces on the board do not know where they are.
         """
 
-        if self.move_check(piece.get_column(), piece.get_row(), x, y):
-            pre_x = piece.get_column()
-            pre_y = piece.get_row()
-            self.move_piece(piece, pre_x, pre_y, x, y)
-            out_of_check = not self.check_check(piece.get_color())
-            self.move_piece(piece, x, y, pre_x, pre_y)
-            return out_of_check
+        return self.will_move_from_end_check(piece.get_column(), piece.get_row(), x, y)
+
+    def will_move_from_end_check(self, source_column, source_row, x, y):
+        """
+        Does the work of will_move_end_check() for the piece at the source coordinates, for callers that already know
+        where the piece stands
+        """
+        if self.move_check(source_column, source_row, x, y):
+            return self.move_leaves_general_safe(source_column, source_row, x, y)
         return False
 
+    def move_leaves_general_safe(self, source_column, source_row, x, y):
+        """
+        Makes a move that already passed move_check() on the board, checks with check_check() whether the mover's
+        general is safe afterwards and takes the move back. Returns True if the general is not in check
+        """
+        piece = self.get_piece_by_coordinate(source_column, source_row)
+        captured = self.get_piece_by_coordinate(x, y)
+        # the board is the same again afterwards, so any attack maps and accumulator are left out of the trial instead
+        # of updated twice, and the trial positions are kept out of any cache
+        attack_maps, self._attack_maps = self._attack_maps, None
+        accumulator, self._accumulator = self._accumulator, None
+        cache, self._cache = self._cache, None
+        self.move_piece(piece, source_column, source_row, x, y)
+        out_of_check = not self.check_check(piece.get_color())
+        self.move_piece(piece, x, y, source_column, source_row)
+        self.set_piece_by_coordinate(x, y, captured)  # put back any piece captured by the trial move
+        self._attack_maps = attack_maps
+        self._accumulator = accumulator
+        self._cache = cache
+        return out_of_check
+
+    def generate_targets(self, source_column, source_row):
+        """
+        Generator of the x, y squares the piece at the source coordinates can move to by move_check(). Only the
+        destinations in the piece's precomputed move table are tried, instead of all 90 squares, and moves whose
+        blocking squares are occupied are skipped without calling move_check(). Straight Chariot and Cannon moves are
+        read from the sliding tables in one lookup per rank and file
+        """
+        board = self.get_board()
+        piece = board.get((source_column, source_row))
+        if piece.get_type_code() in (CHARIOT, CANNON):
+            yield from self._generate_sliding_targets(piece, source_column, source_row)
+            return
+
+        for x, y, blocking in piece.targets_from(source_column, source_row):
+            for square in blocking:
+                if board.get(square) is not None:
+                    break
+            else:
+                if self.move_check(source_column, source_row, x, y):
+                    yield x, y
+
+    def _generate_sliding_targets(self, piece, source_column, source_row):
+        """generate_targets() for a Chariot or Cannon"""
+        board = self.get_board()
+        color = piece.get_color_code()
+        cannon = piece.get_type_code() == CANNON
+        if cannon:
+            rank_reach = RANK_JUMPS[source_column][self._screen_rank_masks[source_row]]
+            file_reach = FILE_JUMPS[source_row][self._screen_file_masks[source_column]]
+        else:
+            rank_reach = RANK_SLIDES[source_column][self._rank_masks[source_row]]
+            file_reach = FILE_SLIDES[source_row][self._file_masks[source_column]]
+
+        for x, y, _ in piece.targets_from(source_column, source_row):
+            if y == source_row:
+                reached = rank_reach >> x & 1
+            elif x == source_column:
+                reached = file_reach >> y & 1
+            else:
+                # the palace lines are left to move_check()
+                if self.move_check(source_column, source_row, x, y):
+                    yield x, y
+                continue
+
+            if reached:
+                target = board.get((x, y))
+                if target is None or (target.get_color_code() != color and
+                                      not (cannon and target.get_type_code() == CANNON)):
+                    yield x, y
+
+    def generate_legal_moves(self):
+        """
+        Returns every legal move for the player whose turn it is as a list of (source, destination) pairs in algebraic
+        notation, the same format accepted by make_move(), in the order generate_moves() finds them. A move is only
+        listed if it follows the piece's rules and does not leave the player's own general in check. Passing the turn
+        is not included. Returns an empty list if the game is over.
+        """
+        moves = []
+        if self.get_game_state() != "UNFINISHED":
+            return moves
+
+        cache = self._cache
+        if cache is not None:
+            key = (self._hash, 'moves')
+            cached = cache.get(key)
+            if cached is not None:
+                return list(cached)
+
+        for source_column, source_row, x, y in self.generate_moves(self.get_turn()):
+            moves.append((self.get_algebraic(source_column, source_row), self.get_algebraic(x, y)))
+
+        if cache is not None:
+            cache.put(key, tuple(moves))
+        return moves
+
+    def generate_packed_moves(self, moves=None):
+        """
+        Returns the moves of generate_legal_moves(), in the same order, packed into 16 bits as from-square * 90 +
+        to-square (see janggi_moves) in an array('H'). If moves, an array('H'), is given it is emptied and filled
+        instead of a new one, so searches can reuse one per ply
+        """
+        if moves is None:
+            moves = array('H')
+        else:
+            del moves[:]
+        if self.get_game_state() != "UNFINISHED":
+            return moves
+
+        append = moves.append
+        for source_column, source_row, x, y in self.generate_moves(self.get_turn()):
+            append((source_row * 9 + source_column) * 90 + y * 9 + x)
+        return moves
+
+    def generate_moves(self, color):
+        """
+        Generator of the legal moves of the color as (source column, source row, x, y) tuples, by source square and
+        then destination. When the color is in check only the evasions are tried (see generate_evasions()), otherwise
+        each of its pieces and the destinations generate_targets() finds for it are fed to move_leaves_general_safe()
+        """
+        general_column, general_row = self.get_general_coords(color)
+        color = COLOR_CODES[color]
+        checkers = list(self.generate_attackers(general_column, general_row, RED if color == BLUE else BLUE))
+        if checkers:
+            yield from self.generate_evasions(general_column, general_row, checkers)
+            return
+
+        # out of check, only a move that uncovers an attack on the general or completes a Cannon's line can leave it in
+        # check, so the other moves need no trial
+        pinned, screens = self.find_pins(general_column, general_row)
+        pinned.add((general_column, general_row))
+        board = self.get_board()
+        for column, row in sorted(board):
+            piece = board[column, row]
+            if (piece is not None) and (piece.get_color_code() == color):
+                for x, y in self.generate_targets(column, row):
+                    if ((column, row) not in pinned and (x, y) not in screens) or \
+                            self.move_leaves_general_safe(column, row, x, y):
+                        yield column, row, x, y
+
+    def find_pins(self, general_column, general_row):
+        """
+        Returns (pinned, screens) for the general at the given coordinates, which must not be in check. pinned is the
+        set of squares whose piece would uncover an attack on the general by leaving: the only piece in the way of an
+        opposing Chariot, Horse or Elephant, or one of the two screens of an opposing Cannon. screens is the set of
+        squares where a move could leave a Cannon exactly one screen: the empty line of a Cannon with no screen yet,
+        and the screens of a Cannon with two, which a Cannon could capture. Any other move except the general's own
+        leaves the general out of check
+        """
+        board = self.get_board()
+        general = board[general_column, general_row]
+        color = RED if general.get_color_code() == BLUE else BLUE
+        pinned = set()
+        screens = set()
+
+        for type_code in (HORSE, ELEPHANT, CHARIOT, CANNON):
+            attacker = PIECES[type_code][color]
+            for column, row in attacker.sources_to(general_column, general_row):
+                if board.get((column, row)) is not attacker:
+                    continue
+                if type_code in (HORSE, ELEPHANT):
+                    line = attacker.blocking_squares(column, row, general_column, general_row)
+                else:
+                    line = self.line_squares(column, row, general_column, general_row)
+                in_the_way = [square for square in line if board.get(square) is not None]
+
+                if type_code != CANNON:
+                    if len(in_the_way) == 1:
+                        pinned.update(in_the_way)
+                else:
+                    # pieces in the way that are not cannons, the screens counted by make_cannon_move()
+                    in_the_way = [square for square in in_the_way if board[square].get_type_code() != CANNON]
+                    if not in_the_way:
+                        screens.update(line)
+                    elif len(in_the_way) == 2:
+                        pinned.update(in_the_way)
+                        screens.update(in_the_way)
+
+        return pinned, screens
+
+    @staticmethod
+    def line_squares(source_column, source_row, dest_column, dest_row):
+        """
+        Returns the squares a Chariot or Cannon move counts as in the way, like make_chariot_move() and
+        make_cannon_move(): the squares between source and destination along the source row and the source column
+        """
+        line = [(x, source_row) for x in range(9) if BETWEEN_MASKS[source_column][dest_column] >> x & 1]
+        line += [(source_column, y) for y in range(10) if BETWEEN_MASKS[source_row][dest_row] >> y & 1]
+        return line
+
+    def generate_evasions(self, general_column, general_row, checkers):
+        """
+        Generator of the legal moves out of check of the general at the given coordinates, attacked from the checkers
+        squares, as (source column, source row, x, y) tuples by source square and then destination. Besides the moves
+        of the general itself, a move can only end the check of a piece if it captures it, lands on a square that
+        piece's move needs to be empty, or, for a Cannon, takes a piece out of its line or puts one in. Only those moves
+        are tried with move_leaves_general_safe(); the pieces that can make them are found with generate_attackers()
+        """
+        board = self.get_board()
+        general = board[general_column, general_row]
+        color = general.get_color_code()
+
+        # the destinations and, for Cannons, the sources that can end the check of each checker
+        evasions = []
+        for column, row in checkers:
+            destinations = {(column, row)}
+            sources = set()
+            checker = board[column, row]
+            if checker.get_type_code() in (CHARIOT, CANNON):
+                line = self.line_squares(column, row, general_column, general_row)
+                destinations.update(line)
+                if checker.get_type_code() == CANNON:
+                    sources.update(line)
+            else:
+                destinations.update(checker.blocking_squares(column, row, general_column, general_row))
+            evasions.append((destinations, sources))
+
+        candidates = set()
+        for destinations, sources in evasions:
+            for x, y in destinations:
+                for column, row in self.generate_attackers(x, y, color):
+                    candidates.add((column, row, x, y))
+            for column, row in sources:
+                piece = board.get((column, row))
+                if piece is not None and piece.get_color_code() == color:
+                    for x, y in self.generate_targets(column, row):
+                        candidates.add((column, row, x, y))
+
+        for x, y in self.generate_targets(general_column, general_row):
+            candidates.add((general_column, general_row, x, y))
+
+        for column, row, x, y in sorted(candidates):
+            if (column, row) == (general_column, general_row) or all(
+                    (x, y) in destinations or (column, row) in sources for destinations, sources in evasions):
+                if self.move_leaves_general_safe(column, row, x, y):
+                    yield column, row, x, y
+
     def get_general_coords(self, color):
         """
-        Helper method for check_check(). Returns general's location on the board. It does so by iterating through the
-        board and finding pieces that correspond to the General class and then determines if the color is the same as
-        the one that was fed to the method. Once found, the General's location is then returned to check_check()"""
-        for coordinate in self.get_board():
-            piece = self.get_piece_by_coordinate(coordinate[0], coordinate[1])
-            if piece is not None:
-                if (type(piece) == General) and piece.get_color() == color:
-                    return [piece.get_column(), piece.get_row()]
+        Returns the [column, row] location of the General of the given color on the board, or None if it has none.
+        set_piece_by_coordinate() keeps the squares of both Generals up to date, so the board is not searched"""
+        color = COLOR_CODES.get(color)
+        if color is None or self._generals[color] is None:
+            return None
+        return list(self._generals[color])
 
     def move_check(self, source_column, source_row, dest_column, dest_row):
         """
         Makes sure a piece located at the source coordinates can move to the destination coordinates. It does so by
-        retrieving the piece at the given source coordinates and then determines the type of that piece. Then the
-        piece is sent to a specific set of rules for that type of piece. Then the piece is sent that piece type's
-        move-set. If the piece is attempting a move that does not follow those rules or its move-set, this method
-        returns False, otherwise, if the move is valid, it returns True.
+        retrieving the piece at the given source coordinates and checking the destination against that piece type's
+        move-set. Only then is the type of that piece determined and the piece sent to the specific set of rules for
+        that type of piece, since the move-set alone rules out most destinations cheaply. If the piece is attempting a
+        move that does not follow its move-set or those rules, this method returns False, otherwise, if the move is
+        valid, it returns True.
         """
 
         piece = self.get_piece_by_coordinate(source_column, source_row)
 
+        if not piece.is_legal_move_from(source_column, source_row, dest_column, dest_row):
+            return False
+
         piece_type = type(piece)
 
         if piece_type == Horse:
@@ -186,9 +674,6 @@ class JanggiGame:
             if not self.make_soldier_move(source_column, source_row, dest_column, dest_row):
                 return False
 
-        if not piece.is_legal_move(dest_column, dest_row):
-            return False
-
         return True
 
     def get_board(self):
@@ -198,103 +683,165 @@ class JanggiGame:
     @staticmethod
     def initialize_pieces():
         """
-        Initializes GamePiece class objects in a dictionary in their appropriate starting positions and assigns them
-        each to a player
-        """
-        pieces = {
-            Chariot("Red", 0, 0), Elephant("Red", 1, 0), Horse("Red", 2, 0), Guard("Red", 3, 0), General("Red", 4, 1),
-            Guard("Red", 5, 0), Elephant("Red", 6, 0), Horse("Red", 7, 0), Chariot("Red", 8, 0),
-            Cannon("Red", 1, 2), Cannon("Red", 7, 2),
-            Soldier("Red", 0, 3), Soldier("Red", 2, 3), Soldier("Red", 4, 3), Soldier("Red", 6, 3),
-            Soldier("Red", 8, 3),
-            Soldier("Blue", 0, 6), Soldier("Blue", 2, 6), Soldier("Blue", 4, 6), Soldier("Blue", 6, 6),
-            Soldier("Blue", 8, 6),
-            Cannon("Blue", 1, 7), Cannon("Blue", 7, 7),
-            Chariot("Blue", 0, 9), Elephant("Blue", 1, 9), Horse("Blue", 2, 9), Guard("Blue", 3, 9),
-            General("Blue", 4, 8), Guard("Blue", 5, 9), Elephant("Blue", 6, 9), Horse("Blue", 7, 9),
-            Chariot("Blue", 8, 9)
-        }
-        return pieces
+        Returns the pieces of both players in their starting positions, as PlacedPiece views of the shared pieces
+        """
+        starting_position = [
+            (Chariot, "Red", 0, 0), (Elephant, "Red", 1, 0), (Horse, "Red", 2, 0), (Guard, "Red", 3, 0),
+            (General, "Red", 4, 1), (Guard, "Red", 5, 0), (Elephant, "Red", 6, 0), (Horse, "Red", 7, 0),
+            (Chariot, "Red", 8, 0),
+            (Cannon, "Red", 1, 2), (Cannon, "Red", 7, 2),
+            (Soldier, "Red", 0, 3), (Soldier, "Red", 2, 3), (Soldier, "Red", 4, 3), (Soldier, "Red", 6, 3),
+            (Soldier, "Red", 8, 3),
+            (Soldier, "Blue", 0, 6), (Soldier, "Blue", 2, 6), (Soldier, "Blue", 4, 6), (Soldier, "Blue", 6, 6),
+            (Soldier, "Blue", 8, 6),
+            (Cannon, "Blue", 1, 7), (Cannon, "Blue", 7, 7),
+            (Chariot, "Blue", 0, 9), (Elephant, "Blue", 1, 9), (Horse, "Blue", 2, 9), (Guard, "Blue", 3, 9),
+            (General, "Blue", 4, 8), (Guard, "Blue", 5, 9), (Elephant, "Blue", 6, 9), (Horse, "Blue", 7, 9),
+            (Chariot, "Blue", 8, 9)
+        ]
+        return [PlacedPiece(get_piece(piece_type.TYPE_CODE, color), column, row)
+                for piece_type, color, column, row in starting_position]
 
     @staticmethod
     def place_pieces(pieces, game_board=None):
         """
         Initializes a new game.
-        Takes dictionary of pieces and enters each one into the board dictionary.
+        Takes placed pieces and enters each one's shared piece into the board dictionary at its location.
         """
         if game_board is None:
             game_board = {}
         for piece in pieces:
-            game_board[piece.get_column(), piece.get_row()] = piece
+            game_board[piece.get_column(), piece.get_row()] = piece.get_piece()
         return game_board
 
     def toggle_turn(self):
         """Toggles whose turn it is"""
         if self._turn == "Blue":
             self._turn = "Red"
+            self._hash ^= RED_TO_MOVE_KEY
         elif self._turn == "Red":
             self._turn = "Blue"
+            self._hash ^= RED_TO_MOVE_KEY
 
     @staticmethod
     def get_coordinates(algebraic):
         """Helper method for make_move(). Returns coordinates in a usable x, y format from coordinates entered in
-        algebraic notation"""
-        alpha = ['A', 'B', 'C', 'D', 'E', 'F', 'G', 'H', 'I']  # 9 columns
-        nums = [str(num) for num in range(1, 11)]  # 10 rows
-        return [alpha.index(algebraic[0].upper()), nums.index(algebraic[1:])]
+        algebraic notation. Raises ValueError if the square is not on the board"""
+        try:
+            return SQUARE_COORDINATES[algebraic]
+        except KeyError:
+            raise ValueError(f'{algebraic!r} is not a square on the board') from None
+
+    @staticmethod
+    def get_algebraic(column, row):
+        """Inverse of get_coordinates(). Returns the algebraic notation (e.g. 'a7') of the given x, y coordinates"""
+        return ALGEBRAIC_SQUARES[column, row]
 
     def get_piece_by_coordinate(self, column, row):
         """Returns piece on the board at the given coordinates"""
-        keys = sorted(self.get_board().keys())
-        for key in keys:
-            if key[0] == column and key[1] == row:
-                if self.get_board()[key] is not None:
-                    return self.get_board()[key]
+        return self.get_board().get((column, row))
 
-        return None
+    def get_placed_piece(self, column, row):
+        """Returns a PlacedPiece view of the piece at the given coordinates, or None if the square is empty"""
+        piece = self.get_board().get((column, row))
+        if piece is None:
+            return None
+        return PlacedPiece(piece, column, row)
 
     def move_piece(self, piece, source_column, source_row, dest_column, dest_row):
         """
         Moves a given piece within the board dictionary by removing it from its source coordinates and then
-        saves it in the new location by calling the piece's set_column() and set_row() functions with the given
-        destination coordinates
+        saves it in the new location. The board is the only place a piece's location is kept
         """
-        self.get_board()[source_column, source_row] = None
-        piece.set_column(dest_column)
-        piece.set_row(dest_row)
-        self.get_board()[dest_column, dest_row] = piece
+        self.set_piece_by_coordinate(source_column, source_row, None)
+        self.set_piece_by_coordinate(dest_column, dest_row, piece)
+
+    def set_piece_by_coordinate(self, column, row, piece):
+        """
+        Puts a piece, or None, on the board at the given coordinates and updates the position hash, the squares of the
+        Generals, the rank and file occupancy masks the sliding rules read, and the attack maps and accumulator if the
+        game keeps them. Every change to the board goes through here
+        """
+        board = self.get_board()
+        square = row * 9 + column
+        replaced = board.get((column, row))
+        if replaced is not None:
+            self._hash ^= CODE_KEYS[2 * replaced.get_type_code() + replaced.get_color_code()][square]
+            if replaced.get_type_code() == GENERAL:
+                self._generals[replaced.get_color_code()] = None
+        if piece is not None:
+            # the board only ever holds the shared pieces, which generate_attackers() and find_pins() look for by
+            # identity, so pieces constructed directly or passed as PlacedPiece views are swapped for them
+            piece = PIECES[piece.get_type_code()][piece.get_color_code()]
+            self._hash ^= CODE_KEYS[2 * piece.get_type_code() + piece.get_color_code()][square]
+            if piece.get_type_code() == GENERAL:
+                self._generals[piece.get_color_code()] = (column, row)
+        board[column, row] = piece
+        rank_bit = 1 << column
+        file_bit = 1 << row
+        if piece is None:
+            self._rank_masks[row] &= ~rank_bit
+            self._file_masks[column] &= ~file_bit
+            self._screen_rank_masks[row] &= ~rank_bit
+            self._screen_file_masks[column] &= ~file_bit
+        else:
+            self._rank_masks[row] |= rank_bit
+            self._file_masks[column] |= file_bit
+            if piece.get_type_code() == CANNON:
+                # cannons never count as screens
+                self._screen_rank_masks[row] &= ~rank_bit
+                self._screen_file_masks[column] &= ~file_bit
+            else:
+                self._screen_rank_masks[row] |= rank_bit
+                self._screen_file_masks[column] |= file_bit
+
+        if self._attack_maps is not None:
+            self._attack_maps.update(column, row)
+        if self._accumulator is not None:
+            self._accumulator.update(square, replaced, piece)
+
+    def get_occupancy_masks(self, column, row):
+        """
+        Returns (rank mask, file mask) of the rank and file through the given coordinates: bit x of the rank mask is
+        set when (x, row) holds a piece, bit y of the file mask when (column, y) does
+        """
+        return self._rank_masks[row], self._file_masks[column]
+
+    def get_screen_masks(self, column, row):
+        """
+        Returns (rank mask, file mask) like get_occupancy_masks(), but of the pieces that can screen a Cannon, which
+        leaves out the Cannons
+        """
+        return self._screen_rank_masks[row], self._screen_file_masks[column]
 
     def print_board(self):
         """
-        Prints the board for the user so that the game can be visualized at certain points. Called after each
-        move is made
+        Prints the board for the user so that the game can be visualized at certain points. The text sink calls
+        format_board() after each move is made
         """
-        print()
-        print("  |   A   |   B   |   C   |   D   |   E   |   F   |   G   |   H   |   I   ", end="")
+        print(self.format_board(), end='')
+
+    def format_board(self):
+        """Returns the board, game state and turn as the text print_board() prints"""
         rows = ["1 ", "2 ", "3 ", "4 ", "5 ", "6 ", "7 ", "8 ", "9 ", "10"]
+        separator = '|\n' + '-' * 75 + '\n'
+        lines = ["\n  |   A   |   B   |   C   |   D   |   E   |   F   |   G   |   H   |   I   "]
 
         for row in range(10):
-            print('|')
-            print('-' * 75)
-            print(rows[row], end='')
+            lines.append(separator)
+            lines.append(rows[row])
 
             for column in range(9):
                 piece = self.get_piece_by_coordinate(column, row)
 
                 if piece is None:
-                    print('|  ---  ', end='')
+                    lines.append('|  ---  ')
                 else:
-                    symbol = self.get_piece_by_coordinate(column, row).get_symbol()
-                    print('|   ' + symbol, end='   ')
+                    lines.append('|   ' + piece.get_symbol() + '   ')
 
-        print('|')
-        print('-' * 75)
-
-        print()
-        print(self.get_game_state())
-        print()
-        print(self.get_turn() + "'s turn")
-        print()
+        lines.append(separator)
+        lines.append('\n' + self.get_game_state() + '\n\n' + self.get_turn() + "'s turn\n\n")
+        return ''.join(lines)
 
     def make_move(self, alg_source, alg_destination):
         """
@@ -314,12 +861,11 @@ class JanggiGame:
 
         if str(alg_source) == str(alg_destination):  # player passes turn
             if self.get_check_state() != self.get_turn():
-                print()
-                print("Turn Passed")
-                print()
+                self._moves.append((alg_source, alg_destination))
+                self._undo.append(None)
                 self.toggle_turn()
-                print(str(self.get_turn()) + "'s turn")
-                print()
+                if self._sink is not None:
+                    self._sink.pass_turn(self)
                 return True
             else:
                 return False
@@ -338,36 +884,43 @@ class JanggiGame:
             return False
 
         if piece is None:  # if no piece at location
-            print("No piece selected, try again")
+            if self._sink is not None:
+                self._sink.error(self, "No piece selected, try again")
             return False
 
         piece_color = piece.get_color()
         if piece_color != self.get_turn():
-            print("Piece not your color. Try again")
+            if self._sink is not None:
+                self._sink.error(self, "Piece not your color. Try again")
             return False
 
         if self.move_check(source_column, source_row, dest_column, dest_row) is False:
             return False
 
-        self.move_piece(piece, piece.get_column(), piece.get_row(), dest_column, dest_row)
+        captured = self.get_piece_by_coordinate(dest_column, dest_row)
+        self.move_piece(piece, source_column, source_row, dest_column, dest_row)
         if self.check_check(self.get_turn()):
-            self.move_piece(piece, piece.get_column(), piece.get_row(), source_column, source_row)
+            self.move_piece(piece, dest_column, dest_row, source_column, source_row)
+            self.set_piece_by_coordinate(dest_column, dest_row, captured)
             return False
 
+        self._moves.append((alg_source, alg_destination))
+        self._undo.append((piece, source_column, source_row, dest_column, dest_row, captured, self.get_check_state()))
         self.set_check_state("")
         self.toggle_turn()
         if self.check_check(self.get_turn()):
             # opponent in check
             self.set_check_state(self.get_turn())
 
-        if self.is_in_check(self.get_turn()):
-            if self.checkmate_check(self.get_turn()):
-                self.set_game_state(self.get_turn())
-                return False
+        mated = self.is_in_check(self.get_turn()) and self.checkmate_check(self.get_turn())
+        if mated:
+            self.set_game_state(self.get_turn())
 
-        self.print_board()
+        if self._sink is not None:
+            self._sink.move(self, alg_source, alg_destination)
 
-        return True
+        # the move that ends the game has always returned False
+        return not mated
 
     def make_horse_move(self, source_column, source_row, dest_column, dest_row):
         """
@@ -412,26 +965,20 @@ class JanggiGame:
     def make_chariot_move(self, source_column, source_row, dest_column, dest_row):
         """
         Helper to move_check(). Determines rules for the Chariot piece. Chariots can move in a straight line over the
-        whole board - given that it is unobstructed.
+        whole board - given that it is unobstructed. The squares counted as in the way are those between source and
+        destination along the source row and the source column, read from the occupancy masks
         """
 
-        smaller_column = min(source_column, dest_column)
-        larger_column = max(source_column, dest_column)
-        smaller_row = min(source_row, dest_row)
-        larger_row = max(source_row, dest_row)
-
         # can't take friendly pieces
         if self.empty_or_enemy(source_column, source_row, dest_column, dest_row) is False:
             return False
 
         # destination must be unobstructed
-        for space in range(smaller_column + 1, larger_column):
-            if self.get_piece_by_coordinate(space, source_row) is not None:
-                return False
+        if self._rank_masks[source_row] & BETWEEN_MASKS[source_column][dest_column]:
+            return False
 
-        for space in range(smaller_row + 1, larger_row):
-            if self.get_piece_by_coordinate(source_column, space) is not None:
-                return False
+        if self._file_masks[source_column] & BETWEEN_MASKS[source_row][dest_row]:
+            return False
 
         return True
 
@@ -521,33 +1068,21 @@ class JanggiGame:
     def make_cannon_move(self, source_column, source_row, dest_column, dest_row):
         """
         Helper to move_check(). Determines rules for Cannon piece. Cannon moves like a Chariot, but must first jump
-        1 - and only 1 - piece. Cannons cannot jump over or capture opposing Cannons.
+        1 - and only 1 - piece. Cannons cannot capture opposing Cannons, and cannons do not count as the piece jumped.
+        The screens are counted from the occupancy masks, which leave cannons out
         """
 
-        smaller_column = min(source_column, dest_column)
-        larger_column = max(source_column, dest_column)
-        smaller_row = min(source_row, dest_row)
-        larger_row = max(source_row, dest_row)
-
         # can't capture friendly
         if self.empty_or_enemy(source_column, source_row, dest_column, dest_row) is False:
             return False
 
         # can't capture Cannon
-        if type(self.get_piece_by_coordinate(dest_column, dest_row)) == Cannon:
+        target = self.get_piece_by_coordinate(dest_column, dest_row)
+        if target is not None and target.get_type_code() == CANNON:
             return False
 
-        count = 0
-
-        for space in range(smaller_column + 1, larger_column):
-            if self.get_piece_by_coordinate(space, source_row) is not None:
-                if type(self.get_piece_by_coordinate(space, source_row)) is not Cannon:
-                    count += 1
-
-        for space in range(smaller_row + 1, larger_row):
-            if self.get_piece_by_coordinate(source_column, space) is not None:
-                if type(self.get_piece_by_coordinate(source_column, space)) is not Cannon:
-                    count += 1
+        count = ((self._screen_rank_masks[source_row] & BETWEEN_MASKS[source_column][dest_column]).bit_count() +
+                 (self._screen_file_masks[source_column] & BETWEEN_MASKS[source_row][dest_row]).bit_count())
 
         # need to jump 1 - and only 1 - piece to move
         if count != 1:
@@ -589,13 +1124,13 @@ class JanggiGame:
         from capturing own pieces
         """
         other_piece = self.get_piece_by_coordinate(dest_column, dest_row)
-        piece_color = self.get_piece_by_coordinate(source_column, source_row).get_color()
+        piece_color = self.get_piece_by_coordinate(source_column, source_row).get_color_code()
 
         if not other_piece:
             return True
 
         # there is a piece in the space
-        other_piece_color = self.get_piece_by_coordinate(dest_column, dest_row).get_color()
+        other_piece_color = other_piece.get_color_code()
         return self.is_enemy(piece_color, other_piece_color)
 
     @staticmethod
@@ -605,3 +1140,215 @@ class JanggiGame:
         Returns False if piece is of the same color as the players
         """
         return piece_color != other_piece_color
+
+
+class AttackMaps:
+    """
+    Counts, for each color and each of the 90 squares, the pieces of that color that can move to the square by
+    move_check(), along with each color's total number of such moves (its mobility). A JanggiGame keeping attack maps
+    (see JanggiGame.set_attack_maps()) tells them about every square that changes. The straight Chariot and Cannon
+    moves are kept by rank and file and read again from the sliding tables for the rank and file of the square only,
+    and the other moves again only for the pieces whose reversed move tables reach the square (see
+    watching_squares()). Nothing is redone until the maps are next read, so a move and its undo cost one update
+    """
+
+    def __init__(self, game):
+        """Initializes the maps of the game from its board"""
+        self._game = game
+        self._local = {}  # square of every piece: (color code, the squares it can move to off the sliding tables)
+        self._rank_rays = [{} for _ in range(10)]  # by row, then column: (color code, mask of the columns reached)
+        self._file_rays = [{} for _ in range(9)]  # by column, then row: (color code, mask of the rows reached)
+        self._counts = ([0] * 90, [0] * 90)  # by color code, then row * 9 + column
+        self._mobility = [0, 0]
+        self._pending = set()  # squares whose piece's other moves may have changed since the last read
+        self._changed = set()  # squares changed since the last read, whose rank and file are read again
+        for (column, row), piece in game.get_board().items():
+            if piece is not None:
+                self._add(column, row)
+        for row in range(10):
+            self._scan(0, row, True)
+        for column in range(9):
+            self._scan(column, 0, False)
+
+    def copy(self, game):
+        """Returns an independent copy of the maps for game, a copy of the game these maps belong to"""
+        self._refresh()
+        maps = AttackMaps.__new__(AttackMaps)
+        maps._game = game
+        maps._local = self._local.copy()
+        maps._rank_rays = [rays.copy() for rays in self._rank_rays]
+        maps._file_rays = [rays.copy() for rays in self._file_rays]
+        maps._counts = (self._counts[BLUE].copy(), self._counts[RED].copy())
+        maps._mobility = self._mobility.copy()
+        maps._pending = set()
+        maps._changed = set()
+        return maps
+
+    def get_count(self, column, row, color):
+        """Returns the number of pieces of the color code that can move to the given coordinates"""
+        if self._changed:
+            self._refresh()
+        return self._counts[color][row * 9 + column]
+
+    def get_mobility(self, color):
+        """Returns the number of moves by move_check() the pieces of the color code have, ignoring checks"""
+        if self._changed:
+            self._refresh()
+        return self._mobility[color]
+
+    def get_targets(self, column, row):
+        """Returns the squares the piece at the given coordinates can move to, or an empty tuple"""
+        if self._changed:
+            self._refresh()
+        entry = self._local.get((column, row))
+        if entry is None:
+            return ()
+        targets = list(entry[1])
+        _, reach = self._rank_rays[row].get(column, (None, 0))
+        targets.extend((x, row) for x in range(9) if reach >> x & 1)
+        _, reach = self._file_rays[column].get(row, (None, 0))
+        targets.extend((column, y) for y in range(10) if reach >> y & 1)
+        return tuple(targets)
+
+    def update(self, column, row):
+        """Notes that the square at the given coordinates of the game's board has just changed"""
+        self._pending.update(watching_squares(column, row))
+        self._changed.add((column, row))
+
+    def _refresh(self):
+        """Reads the rank and file of the changed squares again, and the other moves of the pieces on pending squares"""
+        board = self._game.get_board()
+        for square in self._pending:
+            if square in self._local:
+                self._remove(*square)
+            if board.get(square) is not None:
+                self._add(*square)
+        ranks = {row: column for column, row in self._changed}
+        files = {column: row for column, row in self._changed}
+        for row, column in ranks.items():
+            self._scan(column, row, True)
+        for column, row in files.items():
+            self._scan(column, row, False)
+        self._pending.clear()
+        self._changed.clear()
+
+    def _scan(self, column, row, along_rank):
+        """
+        Counts again the straight Chariot and Cannon moves along the rank, or else the file, through the given
+        coordinates, from the occupancy and screen masks of the game
+        """
+        game = self._game
+        board = game.get_board()
+        rank_mask, file_mask = game.get_occupancy_masks(column, row)
+        screen_rank_mask, screen_file_mask = game.get_screen_masks(column, row)
+        if along_rank:
+            mask, screens, slides, jumps = rank_mask, screen_rank_mask, RANK_SLIDES, RANK_JUMPS
+            rays = self._rank_rays[row]
+            square, index = lambda point: (point, row), lambda point: row * 9 + point
+        else:
+            mask, screens, slides, jumps = file_mask, screen_file_mask, FILE_SLIDES, FILE_JUMPS
+            rays = self._file_rays[column]
+            square, index = lambda point: (column, point), lambda point: point * 9 + column
+
+        for color, reach in rays.values():
+            self._count(color, reach, index, -1)
+        rays.clear()
+
+        pieces = mask
+        while pieces:
+            point = (pieces & -pieces).bit_length() - 1
+            pieces &= pieces - 1
+            piece = board[square(point)]
+            type_code = piece.get_type_code()
+            if type_code == CHARIOT:
+                reach = slides[point][mask]
+            elif type_code == CANNON:
+                reach = jumps[point][screens]
+            else:
+                continue
+
+            # drop the pieces reached that may not be taken: the mover's own, and any Cannon taken by a Cannon
+            color = piece.get_color_code()
+            reached = reach & mask
+            while reached:
+                bit = reached & -reached
+                reached &= reached - 1
+                target = board[square(bit.bit_length() - 1)]
+                if target.get_color_code() == color or (type_code == CANNON and target.get_type_code() == CANNON):
+                    reach &= ~bit
+            rays[point] = (color, reach)
+            self._count(color, reach, index, 1)
+
+    def _count(self, color, reach, index, step):
+        """Adds step to the counts of the color code for the points of the reach mask, and to its mobility"""
+        counts = self._counts[color]
+        while reach:
+            point = (reach & -reach).bit_length() - 1
+            reach &= reach - 1
+            counts[index(point)] += step
+            self._mobility[color] += step
+
+    def _add(self, column, row):
+        """Counts the moves of the piece at the given coordinates that are not read from the sliding tables"""
+        game = self._game
+        board = game.get_board()
+        piece = board[column, row]
+        color = piece.get_color_code()
+        if piece.get_type_code() in (CHARIOT, CANNON):
+            # the palace lines, left to move_check()
+            targets = ()
+            if (column, row) in FORTRESS_SQUARES:
+                targets = tuple((x, y) for x, y in (*PALACE_EDGES[column, row],
+                                                    *PALACE_DIAGONALS.get((column, row), NO_SQUARES))
+                                if x != column and y != row and game.move_check(column, row, x, y))
+        else:
+            # move_check() asks nothing more of these pieces than empty blocking squares and no piece of their own
+            targets = []
+            for x, y, blocking in piece.targets_from(column, row):
+                for square in blocking:
+                    if board.get(square) is not None:
+                        break
+                else:
+                    target = board.get((x, y))
+                    if target is None or target.get_color_code() != color:
+                        targets.append((x, y))
+            targets = tuple(targets)
+
+        counts = self._counts[color]
+        for x, y in targets:
+            counts[y * 9 + x] += 1
+        self._mobility[color] += len(targets)
+        self._local[column, row] = (color, targets)
+
+    def _remove(self, column, row):
+        """Takes back the moves counted by _add() for the square at the given coordinates"""
+        color, targets = self._local.pop((column, row))
+        counts = self._counts[color]
+        for x, y in targets:
+            counts[y * 9 + x] -= 1
+        self._mobility[color] -= len(targets)
+
+
+# the board every new game starts from, built once and copied by JanggiGame.__init__()
+START_BOARD = JanggiGame.place_pieces(JanggiGame.initialize_pieces())
+
+
+def _board_masks(board):
+    """Returns the rank, file, screen rank and screen file occupancy masks of a board dictionary"""
+    masks = ([0] * 10, [0] * 9, [0] * 10, [0] * 9)
+    for (column, row), piece in board.items():
+        if piece is not None:
+            masks[0][row] |= 1 << column
+            masks[1][column] |= 1 << row
+            if piece.get_type_code() != CANNON:
+                masks[2][row] |= 1 << column
+                masks[3][column] |= 1 << row
+    return masks
+
+
+START_MASKS = _board_masks(START_BOARD)
+# the squares of the Blue and Red Generals, which games keep up to date as pieces move
+START_GENERALS = tuple(next((square for square, piece in START_BOARD.items()
+                             if piece is not None and piece.get_type_code() == GENERAL and
+                             piece.get_color_code() == color), None) for color in (BLUE, RED))
+START_HASH = board_hash(START_BOARD, "Blue")
@@ -0,0 +1,263 @@
+import mmap
+import os
+import struct
+import time
+import zlib
+import janggi_game
+from janggi_game import ALGEBRAIC_SQUARES, SQUARE_COORDINATES
+
+# The journal is an append-only file of fixed size records, one per accepted move:
+#
+#   sequence number, game id, offset of the game's previous record + 1 (0 for its first), source, destination, crc32
+#
+# Squares are stored as column * 10 + row. The back pointer chains every game's records together, so a game is restored
+# by reading only its own records. A game that has ended gets one more record with GAME_OVER_SQUARE for both squares.
+# The index file is memory-mapped and holds, for every game id, the offset + 1 of the game's last record, with the
+# FINISHED bit set once the game has ended, so finished games are skipped without reading their records. Its first two
+# slots hold the journal length the index covers and the highest game id. An index that does not cover the whole
+# journal (e.g. after a crash between writing records and updating the index) is rebuilt by scanning the journal.
+
+RECORD = struct.Struct('<QQQBB')
+CRC = struct.Struct('<I')
+RECORD_SIZE = RECORD.size + CRC.size
+SLOT = struct.Struct('<Q')
+INDEX_HEADER_SLOTS = 2
+INITIAL_INDEX_SLOTS = 1024
+DIRTY = 2 ** 64 - 1
+FINISHED = 1 << 63
+PASS_SQUARE = 255  # a pass given with text that is not a square
+GAME_OVER_SQUARE = 254
+
+SYNC_POLICIES = ('always', 'interval', 'never')
+BATCH_SIZE = 256
+SYNC_INTERVAL = 1.0
+
+
+def encode_square(algebraic):
+    """Returns the one byte code of an algebraic square, or PASS_SQUARE if the text is not a square"""
+    coordinate = SQUARE_COORDINATES.get(algebraic)
+    if coordinate is None:
+        return PASS_SQUARE
+    return coordinate[0] * 10 + coordinate[1]
+
+
+def decode_square(code):
+    """Inverse of encode_square(). PASS_SQUARE decodes to 'pass'"""
+    if code == PASS_SQUARE:
+        return 'pass'
+    return ALGEBRAIC_SQUARES[code // 10, code % 10]
+
+
+class GameJournal:
+    """
+    Append-only journal of accepted moves with a memory-mapped index from game id to the game's records. Appended
+    records are buffered and written in batches; whether and how often the journal is fsync'd after a write is set by
+    the sync policy:
+
+    'always'   - fsync on every flush()
+    'interval' - fsync on a flush() at most every sync_interval seconds
+    'never'    - leave it to the operating system
+    """
+
+    def __init__(self, path, sync='interval', batch_size=BATCH_SIZE, sync_interval=SYNC_INTERVAL):
+        """Opens or creates the journal at path and its index at path + '.idx'"""
+        if sync not in SYNC_POLICIES:
+            raise ValueError(f'sync must be one of {SYNC_POLICIES}, not {sync!r}')
+
+        self._sync = sync
+        self._batch_size = batch_size
+        self._sync_interval = sync_interval
+        self._last_sync = time.monotonic()
+        self._buffer = bytearray()
+        self._buffered = 0
+
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT | os.O_APPEND, 0o644)
+        self._length = self._truncate_torn_tail()
+        self._next_sequence = self._read_last_sequence() + 1
+
+        self._index_fd = os.open(path + '.idx', os.O_RDWR | os.O_CREAT, 0o644)
+        self._index = None
+        self._map_index(max(os.fstat(self._index_fd).st_size // SLOT.size, INITIAL_INDEX_SLOTS))
+        if self._get_slot(0) != self._length:
+            self._rebuild_index()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _truncate_torn_tail(self):
+        """Drops a partially written or corrupt last record left by a crash. Returns the journal length"""
+        length = os.fstat(self._fd).st_size
+        length -= length % RECORD_SIZE
+        while length and not self._read_record(length - RECORD_SIZE):
+            length -= RECORD_SIZE
+        os.ftruncate(self._fd, length)
+        return length
+
+    def _read_record(self, offset):
+        """Returns the fields of the record at offset, or None if its checksum does not match"""
+        data = os.pread(self._fd, RECORD_SIZE, offset)
+        if len(data) != RECORD_SIZE:
+            return None
+        body = data[:RECORD.size]
+        if CRC.unpack_from(data, RECORD.size)[0] != zlib.crc32(body):
+            return None
+        return RECORD.unpack(body)
+
+    def _read_last_sequence(self):
+        """Returns the sequence number of the last record in the journal, or 0 if it is empty"""
+        if not self._length:
+            return 0
+        return self._read_record(self._length - RECORD_SIZE)[0]
+
+    def _map_index(self, slots):
+        """Grows the index file to hold at least the given number of slots and maps it into memory"""
+        if self._index is not None:
+            self._index.close()
+        size = slots * SLOT.size
+        if os.fstat(self._index_fd).st_size < size:
+            os.ftruncate(self._index_fd, size)
+        self._index = mmap.mmap(self._index_fd, size)
+
+    def _get_slot(self, slot):
+        return SLOT.unpack_from(self._index, slot * SLOT.size)[0]
+
+    def _set_slot(self, slot, value):
+        if (slot + 1) * SLOT.size > len(self._index):
+            self._map_index(max(slot + 1, 2 * len(self._index) // SLOT.size))
+        SLOT.pack_into(self._index, slot * SLOT.size, value)
+
+    def _rebuild_index(self):
+        """Rebuilds the index by scanning every record of the journal"""
+        self._index[:] = bytes(len(self._index))
+        highest = 0
+        for offset in range(0, self._length, RECORD_SIZE):
+            _, game_id, _, source, _ = self._read_record(offset)
+            self._set_slot(INDEX_HEADER_SLOTS + game_id - 1,
+                           (offset + 1) | (FINISHED if source == GAME_OVER_SQUARE else 0))
+            highest = max(highest, game_id)
+        self._set_slot(1, highest)
+        self._set_slot(0, self._length)
+        self._index.flush()
+
+    def new_game_id(self):
+        """Reserves and returns the id for a new game. Ids start at 1"""
+        game_id = self._get_slot(1) + 1
+        self._set_slot(1, game_id)
+        return game_id
+
+    def game_ids(self):
+        """Returns the ids of every game with at least one journaled move"""
+        return [game_id for game_id in range(1, self._get_slot(1) + 1)
+                if self._get_slot(INDEX_HEADER_SLOTS + game_id - 1)]
+
+    def unfinished_game_ids(self):
+        """Returns the ids of the games with at least one journaled move that have not been marked by finish()"""
+        slots = (self._get_slot(INDEX_HEADER_SLOTS + game_id - 1) for game_id in range(1, self._get_slot(1) + 1))
+        return [game_id for game_id, pointer in enumerate(slots, 1) if pointer and not pointer & FINISHED]
+
+    def is_finished(self, game_id):
+        """Returns True if the game has been marked by finish()"""
+        slot = INDEX_HEADER_SLOTS + game_id - 1
+        return slot * SLOT.size < len(self._index) and bool(self._get_slot(slot) & FINISHED)
+
+    def append(self, game_id, source, destination):
+        """
+        Buffers a record for a move accepted in the given game and returns its sequence number. The buffer is written
+        once it holds batch_size records; call flush() to write it sooner
+        """
+        return self._append(game_id, encode_square(source), encode_square(destination))
+
+    def finish(self, game_id):
+        """
+        Buffers the record that marks a game as ended, so restoring skips it without replaying its moves, and returns
+        its sequence number. No more moves should be appended to the game
+        """
+        return self._append(game_id, GAME_OVER_SQUARE, GAME_OVER_SQUARE)
+
+    def _append(self, game_id, source, destination):
+        """Buffers a record with the given square codes for a game and returns its sequence number"""
+        slot = INDEX_HEADER_SLOTS + game_id - 1
+        offset = self._length + len(self._buffer)
+        previous = self._get_slot(slot) & ~FINISHED if slot * SLOT.size < len(self._index) else 0
+
+        if not self._buffer:
+            # until flush() the index points past the end of the journal, so mark it as not covering the journal
+            self._set_slot(0, DIRTY)
+
+        sequence = self._next_sequence
+        self._next_sequence += 1
+        body = RECORD.pack(sequence, game_id, previous, source, destination)
+        self._buffer += body
+        self._buffer += CRC.pack(zlib.crc32(body))
+        self._buffered += 1
+
+        self._set_slot(slot, (offset + 1) | (FINISHED if source == GAME_OVER_SQUARE else 0))
+        if game_id > self._get_slot(1):
+            self._set_slot(1, game_id)
+
+        if self._buffered >= self._batch_size:
+            self.flush()
+        return sequence
+
+    def flush(self):
+        """Writes the buffered records, fsyncs as the sync policy says and marks them as covered by the index"""
+        if self._buffer:
+            view = memoryview(self._buffer)
+            while view:
+                view = view[os.write(self._fd, view):]
+            self._length += len(self._buffer)
+            self._buffer = bytearray()
+            self._buffered = 0
+
+            now = time.monotonic()
+            if self._sync == 'always' or (self._sync == 'interval' and now - self._last_sync >= self._sync_interval):
+                os.fsync(self._fd)
+                self._index.flush()
+                self._last_sync = now
+
+        self._set_slot(0, self._length)
+
+    def read_game(self, game_id):
+        """
+        Returns the moves journaled for a game as (sequence, source, destination) tuples in the order they were made,
+        following the game's chain of records back from the last one
+        """
+        self.flush()
+        slot = INDEX_HEADER_SLOTS + game_id - 1
+        if slot * SLOT.size >= len(self._index):
+            return []
+
+        moves = []
+        pointer = self._get_slot(slot) & ~FINISHED
+        while pointer:
+            sequence, _, pointer, source, destination = self._read_record(pointer - 1)
+            if source != GAME_OVER_SQUARE:
+                moves.append((sequence, decode_square(source), decode_square(destination)))
+        moves.reverse()
+        return moves
+
+    def close(self):
+        """Writes anything still buffered, fsyncs and closes the journal and its index"""
+        if self._fd is None:
+            return
+        self.flush()
+        if self._sync != 'never':
+            os.fsync(self._fd)
+            self._index.flush()
+        self._index.close()
+        os.close(self._index_fd)
+        os.close(self._fd)
+        self._fd = None
+
+
+def restore_game(journal, game_id, sink=None):
+    """Rebuilds a game by replaying its journaled moves and returns it with its game id and the given sink set"""
+    game = janggi_game.JanggiGame(sink=None)
+    game.set_game_id(game_id)
+    for _, source, destination in journal.read_game(game_id):
+        game.make_move(source, destination)
+    game.set_sink(sink)
+    return game
@@ -0,0 +1,267 @@
+import argparse
+import contextlib
+import os
+import pickle
+import random
+import socket
+import struct
+import subprocess
+import sys
+import threading
+import time
+import janggi_game
+from janggi_engine_server import ADDRESS, PORT, HEADER_LENGTH, receive_exactly, send_game
+
+# set constants
+CLIENTS = 8
+RATE = 5.0  # moves per second per client, 0 means as fast as the server answers
+DURATION = 10.0
+MAX_PLIES = 200
+TIMEOUT = 5.0
+PERCENTILES = (50, 90, 99)
+
+
+class LoadStats:
+    """
+    Collects the round trip latencies, finished games and errors recorded by the simulated clients. Every client
+    thread writes into the same object so all updates are made under a lock
+    """
+
+    def __init__(self):
+        """Initializes empty counters"""
+        self._lock = threading.Lock()
+        self._latencies = []
+        self._errors = {}
+        self._games = 0
+
+    def record_move(self, latency):
+        """Records the time in seconds between sending a move and receiving the server's reply"""
+        with self._lock:
+            self._latencies.append(latency)
+
+    def record_game(self):
+        """Records a game that was played to the end or to the ply limit"""
+        with self._lock:
+            self._games += 1
+
+    def record_error(self, kind):
+        """Records an error of the given kind (e.g. 'timeout', 'connect', 'bad_reply')"""
+        with self._lock:
+            self._errors[kind] = self._errors.get(kind, 0) + 1
+
+    def summary(self, elapsed, clients):
+        """Returns a dictionary with throughput, latency percentiles in milliseconds and error rates"""
+        with self._lock:
+            latencies = sorted(self._latencies)
+            errors = dict(self._errors)
+            games = self._games
+
+        requests = len(latencies) + sum(errors.values())
+        return {
+            'clients': clients,
+            'elapsed': elapsed,
+            'moves': len(latencies),
+            'games': games,
+            'throughput': len(latencies) / elapsed if elapsed else 0.0,
+            'latency_ms': {pct: percentile(latencies, pct) * 1000 for pct in PERCENTILES},
+            'max_latency_ms': latencies[-1] * 1000 if latencies else 0.0,
+            'errors': errors,
+            'error_rate': sum(errors.values()) / requests if requests else 0.0,
+        }
+
+
+def percentile(sorted_values, pct):
+    """Returns the nearest-rank percentile of an already sorted list, or 0.0 if the list is empty"""
+    if not sorted_values:
+        return 0.0
+
+    rank = max(1, -(-len(sorted_values) * pct // 100))  # ceiling without floats
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def receive_game(client_socket):
+    """Receives one game sent by the server. Returns None if the server closed the connection"""
+    header = receive_exactly(client_socket, HEADER_LENGTH)
+    if not header:
+        return None
+
+    game_size = struct.unpack("!Q", header)[0]
+    payload = receive_exactly(client_socket, game_size)
+    if not payload:
+        return None
+
+    return pickle.loads(payload)
+
+
+def play_games(client_socket, rng, interval, deadline, stats, max_plies):
+    """
+    Plays random legal games over one connection until the deadline. Each round trip is the client making a move,
+    sending the game and waiting for the game to come back with the server's reply. A new game is started whenever the
+    game ends or reaches max_plies
+    """
+    game = janggi_game.JanggiGame(sink=None)
+    plies = 0
+
+    while time.monotonic() < deadline:
+        next_send = time.monotonic() + interval
+
+        moves = game.generate_legal_moves()
+        if not moves or plies >= max_plies:
+            stats.record_game()
+            game = janggi_game.JanggiGame(sink=None)
+            plies = 0
+            continue
+
+        source, destination = rng.choice(moves)
+        game.make_move(source, destination)
+        turn = game.get_turn()
+
+        start = time.perf_counter()
+        send_game(client_socket, game)
+        reply = receive_game(client_socket)
+        latency = time.perf_counter() - start
+
+        if reply is None:
+            raise ConnectionResetError('connection closed by the server')
+
+        stats.record_move(latency)
+        plies += 2
+
+        # the server must hand back a game it has replied to, unless our move already ended it
+        if not isinstance(reply, janggi_game.JanggiGame):
+            stats.record_error('bad_reply')
+            game = janggi_game.JanggiGame(sink=None)
+            plies = 0
+            continue
+        if reply.get_game_state() == "UNFINISHED" and reply.get_turn() == turn:
+            stats.record_error('no_server_move')
+
+        reply.set_sink(None)
+        game = reply
+
+        pause = next_send - time.monotonic()
+        if pause > 0:
+            time.sleep(pause)
+
+
+def run_client(address, port, rate, deadline, stats, seed, max_plies=MAX_PLIES, timeout=TIMEOUT):
+    """
+    Simulates one client speaking the engine client protocol. The client reconnects after any connection error or
+    timeout, since a lost reply leaves the connection out of step with the server
+    """
+    rng = random.Random(seed)
+    interval = 1.0 / rate if rate else 0.0
+
+    while time.monotonic() < deadline:
+        try:
+            client_socket = socket.create_connection((address, port), timeout=timeout)
+        except OSError:
+            stats.record_error('connect')
+            time.sleep(min(max(interval, 0.1), max(deadline - time.monotonic(), 0)))
+            continue
+
+        with client_socket:
+            try:
+                play_games(client_socket, rng, interval, deadline, stats, max_plies)
+            except socket.timeout:
+                stats.record_error('timeout')
+            except OSError:
+                stats.record_error('connection')
+
+
+def run_load_test(address=ADDRESS, port=PORT, clients=CLIENTS, rate=RATE, duration=DURATION, max_plies=MAX_PLIES,
+                  timeout=TIMEOUT, seed=None):
+    """
+    Spawns the given number of simulated clients as threads, lets them play against the server for duration seconds
+    and returns the summary of the run. The clients' games have no sink, so nothing is rendered on this side
+    """
+    stats = LoadStats()
+    seeder = random.Random(seed)
+    deadline = time.monotonic() + duration
+
+    threads = [threading.Thread(target=run_client,
+                                args=(address, port, rate, deadline, stats, seeder.random(), max_plies, timeout),
+                                daemon=True)
+               for _ in range(clients)]
+
+    start = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - start
+
+    return stats.summary(elapsed, clients)
+
+
+def format_report(summary):
+    """Returns the summary of a run as printable text"""
+    latency = summary['latency_ms']
+    lines = [
+        f"clients:     {summary['clients']}",
+        f"elapsed:     {summary['elapsed']:.2f} s",
+        f"moves:       {summary['moves']} ({summary['games']} games finished)",
+        f"throughput:  {summary['throughput']:.1f} moves/s",
+        "latency:     " + "  ".join(f"p{pct} {latency[pct]:.2f} ms" for pct in PERCENTILES)
+        + f"  max {summary['max_latency_ms']:.2f} ms",
+        f"error rate:  {summary['error_rate']:.2%}",
+    ]
+    for kind, count in sorted(summary['errors'].items()):
+        lines.append(f"  {kind}: {count}")
+    return "\n".join(lines)
+
+
+@contextlib.contextmanager
+def spawned_server(address, port, timeout=TIMEOUT):
+    """Starts janggi_engine_server.py in auto reply mode as a subprocess and stops it when the block exits"""
+    server_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'janggi_engine_server.py')
+    process = subprocess.Popen([sys.executable, server_path, '--auto', '--quiet', '--address', address,
+                                '--port', str(port)], stdout=subprocess.DEVNULL)
+    try:
+        # wait for the server to accept connections
+        give_up = time.monotonic() + timeout
+        while True:
+            try:
+                socket.create_connection((address, port), timeout=timeout).close()
+                break
+            except OSError:
+                if process.poll() is not None or time.monotonic() > give_up:
+                    raise RuntimeError(f'server did not start on {address}:{port}')
+                time.sleep(0.05)
+        yield process
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Plays random legal Janggi games against the engine server from many '
+                                                 'concurrent simulated clients and reports throughput and latency')
+    parser.add_argument('--address', default=ADDRESS)
+    parser.add_argument('--port', type=int, default=PORT)
+    parser.add_argument('--clients', type=int, default=CLIENTS, help='number of simulated clients')
+    parser.add_argument('--rate', type=float, default=RATE,
+                        help='moves per second per client, 0 sends the next move as soon as the reply arrives')
+    parser.add_argument('--duration', type=float, default=DURATION, help='seconds to run')
+    parser.add_argument('--max-plies', type=int, default=MAX_PLIES, help='plies before a game is restarted')
+    parser.add_argument('--timeout', type=float, default=TIMEOUT, help='seconds to wait for a reply')
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--spawn-server', action='store_true',
+                        help='start janggi_engine_server.py --auto on the given address and port for the run')
+    args = parser.parse_args(argv)
+
+    with contextlib.ExitStack() as stack:
+        if args.spawn_server:
+            stack.enter_context(spawned_server(args.address, args.port, args.timeout))
+
+        summary = run_load_test(args.address, args.port, args.clients, args.rate, args.duration, args.max_plies,
+                                args.timeout, args.seed)
+
+    print(format_report(summary))
+
+    # non-zero exit status lets scripts catch regressions
+    return 1 if summary['errors'] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
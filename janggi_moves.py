@@ -0,0 +1,89 @@
+from array import array
+from janggi_game import ALGEBRAIC_SQUARES, SQUARE_COORDINATES
+
+# Moves are packed into 16 bits as from-square * 90 + to-square, with squares counted along the rows from a1
+# (row * 9 + column), so every move on the board is a number from 0 to 8099:
+#
+#   PASS_MOVE   passing the turn
+#   NO_MOVE     no move at all, such as after the last position of a game
+#
+# Move lists are array('H') buffers of packed moves. JanggiGame.generate_packed_moves() fills one, and MoveBuffers
+# keeps one per ply for searches to reuse (see janggi_search.Searcher), so generating moves stores no Python object per
+# move.
+
+PASS_MOVE = 0x8000
+NO_MOVE = 0xFFFF
+MOVE_TYPECODE = 'H'
+
+SQUARE_INDICES = {square: row * 9 + column for square, (column, row) in SQUARE_COORDINATES.items()}
+SQUARE_NAMES = tuple(ALGEBRAIC_SQUARES[index % 9, index // 9] for index in range(90))
+
+# the (source, destination) pair and the source column, source row, destination column, destination row of every
+# packed move, so decoding is a single index
+MOVE_NAMES = tuple((source, destination) for source in SQUARE_NAMES for destination in SQUARE_NAMES)
+MOVE_COORDINATES = tuple((source % 9, source // 9, destination % 9, destination // 9)
+                         for source in range(90) for destination in range(90))
+
+
+def pack_move(source_column, source_row, dest_column, dest_row):
+    """Packs a move given as coordinates. A move from a square to itself passes the turn"""
+    if (source_column, source_row) == (dest_column, dest_row):
+        return PASS_MOVE
+    return (source_row * 9 + source_column) * 90 + dest_row * 9 + dest_column
+
+
+def encode_move(source, destination):
+    """Packs an algebraic move, as make_move() takes it, into 16 bits. A move from a square to itself passes the turn"""
+    if source == destination:
+        return PASS_MOVE
+    return SQUARE_INDICES[source] * 90 + SQUARE_INDICES[destination]
+
+
+def decode_move(move, game=None):
+    """
+    Inverse of encode_move(). A pass decodes to the square of the General of the side to move of game given twice,
+    which is how make_move() and game records write a pass, or to ('pass', 'pass') without a game
+    """
+    if move == PASS_MOVE:
+        if game is None:
+            return 'pass', 'pass'
+        general = game.get_algebraic(*game.get_general_coords(game.get_turn()))
+        return general, general
+    return MOVE_NAMES[move]
+
+
+def encode_moves(moves):
+    """Packs a list of algebraic (source, destination) pairs into an array('H')"""
+    return array(MOVE_TYPECODE, [encode_move(source, destination) for source, destination in moves])
+
+
+def decode_moves(moves):
+    """Inverse of encode_moves(). Returns a list of (source, destination) pairs"""
+    return [decode_move(move) for move in moves]
+
+
+def make_packed_move(game, move):
+    """
+    Makes a packed move in a JanggiGame with make_move() and returns what it returns. A pass is made on the square of
+    the General, so the moves of the game can be written to game records
+    """
+    return game.make_move(*decode_move(move, game))
+
+
+class MoveBuffers:
+    """
+    Move lists for a search, one array('H') per ply. The buffer of a ply is emptied and filled again for every position
+    searched at that ply, so after the first visit to each depth no move list is allocated again
+    """
+
+    def __init__(self):
+        """Initializes the buffers, which are made as deeper plies are first asked for"""
+        self._buffers = []
+
+    def get(self, ply):
+        """Returns the emptied buffer of a ply"""
+        while len(self._buffers) <= ply:
+            self._buffers.append(array(MOVE_TYPECODE))
+        buffer = self._buffers[ply]
+        del buffer[:]
+        return buffer
@@ -0,0 +1,196 @@
+import struct
+import numpy as np
+from janggi_pieces import BLUE, RED, COLOR_CODES
+from janggi_search import PIECE_VALUES
+from janggi_zobrist import PIECE_TYPES
+
+# An efficiently updatable neural network (NNUE) evaluation of JanggiGame positions, run on the CPU with NumPy.
+#
+# Inputs are piece-square features seen from each side: 2 * piece type code + 0 for the side's own pieces or + 1 for
+# the other side's, times 90, plus the square. Red sees the board upside down (row 9 - row), so both sides see their
+# own pieces start at the bottom. The first layer sums the weights of the features present, plus a bias, into an
+# accumulator of HIDDEN integers per side. Games kept with an Accumulator (see Network.attach()) add and subtract the
+# weights of the one or two pieces each change to the board moves, instead of summing all of them again.
+#
+# The output is the accumulator of the side to move followed by the other side's, each clipped to 0 - CLIP, times
+# the output weights plus the output bias, times the output scale. It is rounded to whole points, like
+# janggi_search.evaluate(), and is from the point of view of the side to move. Everything before the output scale is
+# integer arithmetic, so accumulators kept up to date match accumulators summed afresh exactly.
+#
+# Weights files are little-endian: the header packs the magic bytes, format version, inputs, hidden size and output
+# scale as HEADER, followed by the input weights (inputs x hidden int16), input biases (hidden int16), output weights
+# (2 * hidden int16) and the output bias (int32).
+
+# set constants
+INPUTS = 14 * 90
+HIDDEN = 128
+CLIP = 255
+MAGIC = b'JNUE'
+VERSION = 1
+HEADER = struct.Struct('<4sHHHf')
+
+# the point value of one accumulator unit in material_network(), which keeps a full side of pieces below CLIP
+MATERIAL_UNITS = 3
+
+
+def feature_index(perspective, code, square):
+    """
+    Returns the input feature of a piece with code 2 * piece type code + color code on the 0 - 89 square, as seen by
+    the perspective color code
+    """
+    if perspective == RED:
+        return (code ^ 1) * 90 + (9 - square // 9) * 9 + square % 9
+    return code * 90 + square
+
+
+class Network:
+    """
+    The weights of an NNUE evaluation. Evaluates games with evaluate(), reading the accumulator of games that keep
+    one for this network (see attach()) and summing one afresh for the others
+    """
+
+    def __init__(self, input_weights, input_biases, output_weights, output_bias, scale):
+        """
+        Initializes the network from integer arrays of shape (INPUTS, hidden), (hidden,) and (2 * hidden,), the
+        integer output bias and the float output scale
+        """
+        self._input_weights = np.asarray(input_weights, dtype=np.int16)
+        self._input_biases = np.asarray(input_biases, dtype=np.int16)
+        self._output_weights = np.asarray(output_weights, dtype=np.int16)
+        self._output_bias = int(output_bias)
+        self._scale = float(scale)
+        hidden = len(self._input_biases)
+        if self._input_weights.shape != (INPUTS, hidden) or self._output_weights.shape != (2 * hidden,):
+            raise ValueError('the weight shapes do not match the hidden size')
+
+        # the weights of each piece code and square for both sides at once, which is what accumulators add
+        features = np.array([[[feature_index(perspective, code, square) for perspective in (BLUE, RED)]
+                              for square in range(90)] for code in range(14)])
+        self._columns = self._input_weights[features].astype(np.int32)
+        # the output weights lined up with the accumulators of Blue and Red, when Blue and when Red is to move
+        own, other = self._output_weights[:hidden].astype(np.int64), self._output_weights[hidden:].astype(np.int64)
+        self._turn_weights = (np.stack([own, other]), np.stack([other, own]))
+
+    def get_hidden(self):
+        """Returns the size of the accumulator of each side"""
+        return len(self._input_biases)
+
+    def get_scale(self):
+        """Returns the points one unit of the output is worth"""
+        return self._scale
+
+    def get_weights(self):
+        """Returns the input weights, input biases, output weights and output bias"""
+        return self._input_weights, self._input_biases, self._output_weights, self._output_bias
+
+    def get_columns(self):
+        """Returns the input weights of every piece code and square for Blue and Red, shaped (14, 90, 2, hidden)"""
+        return self._columns
+
+    def accumulate(self, game):
+        """Returns the accumulators of Blue and Red for the board of a game, summed afresh, shaped (2, hidden)"""
+        codes = []
+        squares = []
+        for (column, row), piece in game.get_board().items():
+            if piece is not None:
+                codes.append(2 * piece.get_type_code() + piece.get_color_code())
+                squares.append(row * 9 + column)
+        return self._columns[codes, squares].sum(axis=0, dtype=np.int32) + self._input_biases
+
+    def attach(self, game):
+        """Makes the game keep an Accumulator for this network and returns it"""
+        accumulator = Accumulator(self, game)
+        game.set_accumulator(accumulator)
+        return accumulator
+
+    def evaluate(self, game):
+        """Returns the evaluation of a JanggiGame for the player whose turn it is, in whole points"""
+        accumulator = game.get_accumulator()
+        if isinstance(accumulator, Accumulator) and accumulator.get_network() is self:
+            values = accumulator.get_values()
+        else:
+            values = self.accumulate(game)
+        output = np.vdot(values.clip(0, CLIP), self._turn_weights[COLOR_CODES[game.get_turn()]])
+        return round((self._output_bias + int(output)) * self._scale)
+
+
+class Accumulator:
+    """
+    The first layer of a Network for the board of one game, kept up to date by the game (see
+    JanggiGame.set_accumulator()) as pieces are added to and removed from squares
+    """
+
+    def __init__(self, network, game):
+        """Initializes the accumulator from the board of the game"""
+        self._network = network
+        self._columns = network.get_columns()
+        self._values = network.accumulate(game)
+
+    def get_network(self):
+        """Returns the network the accumulator belongs to"""
+        return self._network
+
+    def get_values(self):
+        """Returns the accumulators of Blue and Red, shaped (2, hidden)"""
+        return self._values
+
+    def copy(self, game):
+        """Returns a copy of the accumulator for a copy of its game"""
+        accumulator = Accumulator.__new__(Accumulator)
+        accumulator._network = self._network
+        accumulator._columns = self._columns
+        accumulator._values = self._values.copy()
+        return accumulator
+
+    def update(self, square, removed, added):
+        """Takes the piece removed from the 0 - 89 square out of the accumulators and puts the piece added in"""
+        if removed is not None:
+            self._values -= self._columns[2 * removed.get_type_code() + removed.get_color_code(), square]
+        if added is not None:
+            self._values += self._columns[2 * added.get_type_code() + added.get_color_code(), square]
+
+
+def material_network(hidden=HIDDEN):
+    """
+    Returns a network whose first accumulator unit counts each side's own material, which evaluates every position
+    the same as janggi_search.evaluate(). The other units start at zero, ready to be trained
+    """
+    input_weights = np.zeros((INPUTS, hidden), dtype=np.int16)
+    for type_code, piece_type in enumerate(PIECE_TYPES):
+        input_weights[2 * type_code * 90:(2 * type_code + 1) * 90, 0] = MATERIAL_UNITS * PIECE_VALUES[piece_type]
+    output_weights = np.zeros(2 * hidden, dtype=np.int16)
+    output_weights[0] = 1
+    output_weights[hidden] = -1
+    return Network(input_weights, np.zeros(hidden, dtype=np.int16), output_weights, 0, 1 / MATERIAL_UNITS)
+
+
+def save_network(network, path):
+    """Writes the weights of a network to a binary file at path"""
+    input_weights, input_biases, output_weights, output_bias = network.get_weights()
+    with open(path, 'wb') as stream:
+        stream.write(HEADER.pack(MAGIC, VERSION, INPUTS, network.get_hidden(), network.get_scale()))
+        stream.write(input_weights.astype('<i2').tobytes())
+        stream.write(input_biases.astype('<i2').tobytes())
+        stream.write(output_weights.astype('<i2').tobytes())
+        stream.write(struct.pack('<i', output_bias))
+
+
+def load_network(path):
+    """Returns the Network written to a binary file by save_network(). Raises ValueError for other files"""
+    with open(path, 'rb') as stream:
+        data = stream.read()
+    if len(data) < HEADER.size:
+        raise ValueError(f'{path} is not a Janggi network file')
+    magic, version, inputs, hidden, scale = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION or inputs != INPUTS:
+        raise ValueError(f'{path} is not a version {VERSION} Janggi network file')
+    if len(data) != HEADER.size + 2 * (inputs * hidden + 3 * hidden) + 4:
+        raise ValueError(f'{path} is truncated or too long')
+
+    offset = HEADER.size
+    arrays = []
+    for count in (inputs * hidden, hidden, 2 * hidden):
+        arrays.append(np.frombuffer(data, dtype='<i2', count=count, offset=offset))
+        offset += 2 * count
+    output_bias, = struct.unpack_from('<i', data, offset)
+    return Network(arrays[0].reshape(inputs, hidden), arrays[1], arrays[2], output_bias, scale)
@@ -1,45 +1,159 @@
+# Colors and piece types are small integer codes. The type codes follow janggi_zobrist.PIECE_TYPES, so
+# 1 + 2 * type code + color code is the piece code used by janggi_tensor and janggi_batch_rules.
+BLUE, RED = 0, 1
+COLOR_NAMES = ("Blue", "Red")
+COLOR_CODES = {"Blue": BLUE, "Red": RED}
+GENERAL, GUARD, HORSE, ELEPHANT, CHARIOT, CANNON, SOLDIER = range(7)
+
+# Palace geometry, shared by every rule that moves along the palace lines. Each palace is the 3x3 block of columns
+# 3 - 5 around its center, indexed by the color that owns it. Its lines join every point to its orthogonal neighbours
+# and the center to the four corners, and the two diagonals run from corner to corner through the center.
+PALACE_CENTERS = ((4, 8), (4, 1))  # Blue, Red
+PALACES = tuple(frozenset((column, row) for column in range(3, 6) for row in range(center_row - 1, center_row + 2))
+                for _, center_row in PALACE_CENTERS)
+FORTRESS_SQUARES = PALACES[BLUE] | PALACES[RED]
+PALACE_OF = {square: color for color, palace in enumerate(PALACES) for square in palace}
+
+
+def _palace_lines():
+    """Returns the one step edges and the corner to corner diagonals (opposite corner: center) of every palace point"""
+    edges = {square: set() for square in FORTRESS_SQUARES}
+    diagonals = {square: {} for square in FORTRESS_SQUARES}
+    for color, (center_column, center_row) in enumerate(PALACE_CENTERS):
+        for column, row in PALACES[color]:
+            for x, y in ((column + 1, row), (column - 1, row), (column, row + 1), (column, row - 1)):
+                if (x, y) in PALACES[color]:
+                    edges[column, row].add((x, y))
+        for step_x in (-1, 1):
+            for step_y in (-1, 1):
+                corner = (center_column + step_x, center_row + step_y)
+                edges[center_column, center_row].add(corner)
+                edges[corner].add((center_column, center_row))
+                diagonals[corner][center_column - step_x, center_row - step_y] = (center_column, center_row)
+    return ({square: frozenset(squares) for square, squares in edges.items()},
+            {square: corners for square, corners in diagonals.items() if corners})
+
+
+PALACE_EDGES, PALACE_DIAGONALS = _palace_lines()
+NO_SQUARES = frozenset()
+
+# Sliding move tables over a single rank (9 columns) or file (10 rows), whose occupancy is a bit mask with bit i set
+# when point i of the line holds a piece. BETWEEN_MASKS[a][b] has the bits strictly between points a and b.
+# RANK_SLIDES[column][mask] has the points a Chariot on that column of the rank reaches: every empty point up to and
+# including the first piece each way. RANK_JUMPS[column][mask] has the points a Cannon reaches with exactly one piece
+# in between, given the mask of its possible screens (pieces that are not cannons). FILE_SLIDES and FILE_JUMPS are the
+# same by row for files.
+BETWEEN_MASKS = [[((1 << max(a, b)) - 1) & ~((1 << (min(a, b) + 1)) - 1) for b in range(10)] for a in range(10)]
+
+
+def _line_tables(length):
+    """Returns the slide and jump tables of a line of the given length"""
+    slides = []
+    jumps = []
+    for position in range(length):
+        position_slides = []
+        position_jumps = []
+        for mask in range(1 << length):
+            slide = jump = 0
+            for step in (-1, 1):
+                screens = 0
+                point = position + step
+                while 0 <= point < length and screens < 2:
+                    if screens == 0:
+                        slide |= 1 << point
+                    else:
+                        jump |= 1 << point
+                    if mask >> point & 1:
+                        screens += 1
+                    point += step
+            position_slides.append(slide)
+            position_jumps.append(jump)
+        slides.append(position_slides)
+        jumps.append(position_jumps)
+    return slides, jumps
+
+
+RANK_SLIDES, RANK_JUMPS = _line_tables(9)
+FILE_SLIDES, FILE_JUMPS = _line_tables(10)
+
+
 class GamePiece:
     """
-    Represents the pieces on the board of Janggi. Each piece type subclass has their separate move-set and symbol
-    representation associated with it. Each piece interacts with the JanggiGame class as it is used to create and move
-    pieces and determine their move-sets throughout the game.
+    Represents the pieces on the board of Janggi. Each piece type subclass has their separate move-set, defined by its
+    is_legal_move_from(column, row, x, y), and symbol representation associated with it. A piece is only its type and
+    color: the board of a JanggiGame says where it is, so every game shares the same fourteen pieces (see get_piece())
+    and moving one never changes the piece itself. PlacedPiece pairs a piece with a location for code that wants the
+    old get_row() / get_column() accessors.
     """
 
-    def __init__(self, color, column, row):
-        """Initializes the GamePiece class. Each piece, when created, has an assigned color, location, and symbol
-        associated with it"""
-        self._color = color
-        self._row = row
-        self._column = column
-        self._red_symbol = ""
-        self._blue_symbol = ""
+    __slots__ = ('_color', '_targets', '_sources')
 
-    def get_color(self):
-        """Returns the color of the piece"""
-        return self._color
+    TYPE_CODE = None
+    SYMBOLS = ("", "")  # Blue, Red
 
-    def get_row(self):
-        """Returns the position of the row (the y-coordinate) of the piece"""
-        return self._row
+    def __init__(self, color):
+        """Initializes the GamePiece class. The color is 'Blue' or 'Red', or its code BLUE or RED"""
+        self._color = color if color in (BLUE, RED) else COLOR_CODES[color]
+        self._targets = {}
+        self._sources = None
 
-    def set_row(self, row):
-        """Set's the row (the y-coordinate) of the piece"""
-        self._row = row
+    def __reduce__(self):
+        """Pickled pieces unpickle as the shared piece of their type and color"""
+        return get_piece, (self.TYPE_CODE, self._color)
 
-    def get_column(self):
-        """Returns the position of the column (the x-coordinate) of the piece"""
-        return self._column
+    def __repr__(self):
+        return f'{type(self).__name__}({COLOR_NAMES[self._color]!r})'
 
-    def set_column(self, column):
-        """Set's the column (the x-coordinate) of the piece"""
-        self._column = column
+    def get_color(self):
+        """Returns the color of the piece"""
+        return COLOR_NAMES[self._color]
+
+    def get_color_code(self):
+        """Returns the color of the piece as BLUE or RED"""
+        return self._color
+
+    def get_type_code(self):
+        """Returns the type of the piece as one of GENERAL, GUARD, HORSE, ELEPHANT, CHARIOT, CANNON or SOLDIER"""
+        return self.TYPE_CODE
 
     def get_symbol(self):
         """Returns unicode symbol of piece depending on color"""
-        if self.get_color() == "Red":
-            return self._red_symbol
-        else:
-            return self._blue_symbol
+        return self.SYMBOLS[self._color]
+
+    def targets_from(self, column, row):
+        """
+        Returns every destination of the piece's move-set from column, row as a tuple of (x, y, blocking) entries,
+        in order of x and then y, where blocking holds the squares that must be empty for that move. The table of
+        each square is built from is_legal_move_from() the first time it is asked for, so the two always agree
+        """
+        targets = self._targets.get((column, row))
+        if targets is None:
+            targets = self._targets[column, row] = tuple(
+                (x, y, self.blocking_squares(column, row, x, y))
+                for x in range(9) for y in range(10) if self.is_legal_move_from(column, row, x, y))
+        return targets
+
+    def sources_to(self, x, y):
+        """
+        Returns every square the piece's move-set reaches x, y from, as a tuple of (column, row) pairs: the reverse of
+        targets_from(). The tables of all 90 squares are built together the first time one is asked for
+        """
+        if self._sources is None:
+            sources = {(column, row): [] for column in range(9) for row in range(10)}
+            for column in range(9):
+                for row in range(10):
+                    for target_x, target_y, _ in self.targets_from(column, row):
+                        if (target_x, target_y) != (column, row):
+                            sources[target_x, target_y].append((column, row))
+            self._sources = {square: tuple(squares) for square, squares in sources.items()}
+        return self._sources[x, y]
+
+    def blocking_squares(self, column, row, x, y):
+        """
+        Returns the squares between column, row and x, y that must be empty for the move. Only the Horse and the
+        Elephant have fixed ones; the game counts the pieces in the way of sliding moves itself
+        """
+        return ()
 
     @staticmethod
     def is_in_bounds(x, y):
@@ -63,34 +177,36 @@ class GamePiece:
         Determines if the coordinates given are within the boundaries of a fortress. Used to prevent general and
         guards from leaving the fortress
         """
-        if (3 <= x <= 5) and (0 <= y <= 2 or 7 <= y <= 9):
-            return True
-        else:
-            return False
+        return (x, y) in FORTRESS_SQUARES
 
 
 class Horse(GamePiece):
     """Represents a piece that can move forward one space unobstructed and forward diagonally another space"""
 
-    def __init__(self, color, column, row):
-        """Initializes the piece with its specific symbol representation"""
-        super().__init__(color, column, row)
-        self._red_symbol = "♞"
-        self._blue_symbol = "♘"
+    __slots__ = ()
 
-    def is_legal_move(self, x, y):
-        """Defines the legal move-set for the piece"""
+    TYPE_CODE = HORSE
+    SYMBOLS = ("♘", "♞")
+
+    def blocking_squares(self, column, row, x, y):
+        """The Horse's leg: the first step, along the long side of the move"""
+        if abs(x - column) == 2:
+            return ((column + (x - column) // 2, row),)
+        return ((column, row + (y - row) // 2),)
+
+    def is_legal_move_from(self, column, row, x, y):
+        """Defines the legal move-set for the piece standing at column, row"""
 
         if self.is_in_bounds(x, y) is False:
 
             return False
 
         # functionally the same for both colors
-        if (x == self.get_column() + 2 or x == self.get_column() - 2) and (
-                y == self.get_row() + 1 or y == self.get_row() - 1):
+        if (x == column + 2 or x == column - 2) and (
+                y == row + 1 or y == row - 1):
             return True
-        elif (x == self.get_column() + 1 or x == self.get_column() - 1) and (
-                y == self.get_row() + 2 or y == self.get_row() - 2):
+        elif (x == column + 1 or x == column - 1) and (
+                y == row + 2 or y == row - 2):
             return True
         else:
 
@@ -100,46 +216,33 @@ class Horse(GamePiece):
 class Chariot(GamePiece):
     """Represents piece that can move in a straight line unobstructed, until the end of the board."""
 
-    def __init__(self, color, column, row):
-        """Initializes the piece with its specific symbol representation"""
-        super().__init__(color, column, row)
-        self._red_symbol = "♜"
-        self._blue_symbol = "♖"
+    __slots__ = ()
 
-    def is_legal_move(self, x, y):
-        """Defines the legal move-set for the piece"""
+    TYPE_CODE = CHARIOT
+    SYMBOLS = ("♖", "♜")
+
+    def is_legal_move_from(self, column, row, x, y):
+        """Defines the legal move-set for the piece standing at column, row"""
 
         if self.is_in_bounds(x, y) is False:
 
             return False
 
         # functionally the same for both colors
-        # moves differently within fortresses
-        if (self.get_column() == 4) and (self.get_row() == 1) and ((3 <= x <= 5) and (0 <= y <= 2)):
+        # moves differently within fortresses: along the palace lines to and from the center
+        if (x, y) in PALACE_EDGES.get((column, row), NO_SQUARES):
             return True
-        if (self.get_column() == 4) and (self.get_row() == 8) and ((3 <= x <= 5) and (7 <= y <= 9)):
-            return True
-        if (x == 4) and (y == 1) and ((3 <= self.get_column() <= 5) and (0 <= self.get_row() <= 2)):
-            return True
-        if (x == 4) and (y == 8) and ((3 <= self.get_column() <= 5) and (7 <= self.get_row() <= 9)):
-            return True
-
-        if self.is_in_fortress(self.get_column(), self.get_row()) and self.is_in_fortress(x, y):
 
-            # can move from one corner to the next diagonally in fortress
-            if (x == self.get_column() + 2) and (y == self.get_row() + 2):
-                return True
-            if (x == self.get_column() - 2) and (y == self.get_row() - 2):
+        # can move from one corner to the next diagonally in fortress, except toward the upper left
+        if (x, y) in PALACE_DIAGONALS.get((column, row), NO_SQUARES):
+            if (x == column - 2) and (y == row - 2):
                 return
-            if (x == self.get_column() + 2) and (y == self.get_row() - 2):
-                return True
-            if (x == self.get_column() - 2) and (y == self.get_row() + 2):
-                return True
+            return True
 
-        if x == self.get_column():
+        if x == column:
             return True
 
-        if y == self.get_row():
+        if y == row:
             return True
 
         return False
@@ -148,26 +251,33 @@ class Chariot(GamePiece):
 class Elephant(GamePiece):
     """Represents a piece that can move two spaces forward unobstructed and 2 spaces diagonally"""
 
-    def __init__(self, color, column, row):
-        """Initializes the piece with its specific symbol representation"""
-        super().__init__(color, column, row)
-        self._red_symbol = "♣"
-        self._blue_symbol = "♧"
+    __slots__ = ()
 
-    def is_legal_move(self, x, y):
-        """Defines the legal move-set for the piece"""
+    TYPE_CODE = ELEPHANT
+    SYMBOLS = ("♧", "♣")
+
+    def blocking_squares(self, column, row, x, y):
+        """The first step along the long side of the move and the diagonal step after it"""
+        step_x = 1 if x > column else -1
+        step_y = 1 if y > row else -1
+        if abs(x - column) == 3:
+            return (column + step_x, row), (column + 2 * step_x, row + step_y)
+        return (column, row + step_y), (column + step_x, row + 2 * step_y)
+
+    def is_legal_move_from(self, column, row, x, y):
+        """Defines the legal move-set for the piece standing at column, row"""
 
         if self.is_in_bounds(x, y) is False:
             return False
 
-        move_right = (self.get_column() + 3)
-        move_left = (self.get_column() - 3)
-        horizontal_then_down = (self.get_row() + 2)
-        horizontal_then_up = (self.get_row() - 2)
-        vertical_then_left = (self.get_column() + 2)
-        vertical_then_right = (self.get_column() - 2)
-        move_up = (self.get_row() - 3)
-        move_down = (self.get_row() + 3)
+        move_right = (column + 3)
+        move_left = (column - 3)
+        horizontal_then_down = (row + 2)
+        horizontal_then_up = (row - 2)
+        vertical_then_left = (column + 2)
+        vertical_then_right = (column - 2)
+        move_up = (row - 3)
+        move_down = (row + 3)
 
         # functionally the same for both colors
         if (x == move_right or x == move_left) and (y == horizontal_then_down or y == horizontal_then_up):
@@ -185,14 +295,13 @@ class Cannon(GamePiece):
     This piece cannot jump over more than one piece at a time, and it cannot capture or jump over other cannon pieces.
     """
 
-    def __init__(self, color, column, row):
-        """Initializes the piece with its specific symbol representation"""
-        super().__init__(color, column, row)
-        self._red_symbol = "♛"
-        self._blue_symbol = "♕"
+    __slots__ = ()
 
-    def is_legal_move(self, x, y):
-        """Defines the legal move-set for the piece"""
+    TYPE_CODE = CANNON
+    SYMBOLS = ("♕", "♛")
+
+    def is_legal_move_from(self, column, row, x, y):
+        """Defines the legal move-set for the piece standing at column, row"""
 
         if self.is_in_bounds(x, y) is False:
 
@@ -200,23 +309,14 @@ class Cannon(GamePiece):
 
         # functionally the same for both colors
 
-        # moves differently within fortresses
-        if self.is_in_fortress(self.get_column(), self.get_row()) and self.is_in_fortress(x, y):
-
-            # can move from one corner to the next diagonally in fortress
-            if (x == self.get_column() + 2) and (y == self.get_row() + 2):
-                return True
-            if (x == self.get_column() - 2) and (y == self.get_row() - 2):
-                return True
-            if (x == self.get_column() + 2) and (y == self.get_row() - 2):
-                return True
-            if (x == self.get_column() - 2) and (y == self.get_row() + 2):
-                return True
+        # moves differently within fortresses: from one corner to the next diagonally
+        if (x, y) in PALACE_DIAGONALS.get((column, row), NO_SQUARES):
+            return True
 
-        if x == self.get_column():
+        if x == column:
             return True
 
-        if y == self.get_row():
+        if y == row:
             return True
 
         return False
@@ -230,144 +330,151 @@ class General(GamePiece):
     opponent
     """
 
-    def __init__(self, color, column, row):
-        """Initializes the piece with its specific symbol representation"""
-        super().__init__(color, column, row)
-        self._red_symbol = "♚"
-        self._blue_symbol = "♔"
+    __slots__ = ()
 
-    def is_legal_move(self, x, y):
-        """Defines the legal move-set for the piece"""
+    TYPE_CODE = GENERAL
+    SYMBOLS = ("♔", "♚")
 
-        if self.is_in_bounds(x, y) is False:
+    def is_legal_move_from(self, column, row, x, y):
+        """Defines the legal move-set for the piece standing at column, row: one step along the lines of its palace"""
+        return PALACE_OF.get((column, row)) == self._color and (x, y) in PALACE_EDGES[column, row]
 
-            return False
 
-        if self.is_in_fortress(x, y) is False:
+class Guard(GamePiece):
+    """Represents a piece that can only move on space in any direction within the bounds of the 'fortress'"""
 
-            return False
+    __slots__ = ()
 
-        if self.get_color() == "Blue":
-            if (x == self.get_column() + 1 or x == self.get_column() - 1) and y == self.get_row():
-                return True
-            elif x == self.get_column() and (y == self.get_row() + 1 or y == self.get_row() - 1):
-                return True
-            elif x == 4 and y == 8:  # can move to middle from all positions in the fortress
-                return True
-            elif ((self.get_column() == 4) and (self.get_row() == 8)) and ((3 <= x <= 5) and (7 <= y <= 9)):
-                return True
+    TYPE_CODE = GUARD
+    SYMBOLS = ("♗", "♝")
 
-            else:
+    def is_legal_move_from(self, column, row, x, y):
+        """Defines the legal move-set for the piece standing at column, row: one step along the lines of its palace"""
+        return PALACE_OF.get((column, row)) == self._color and (x, y) in PALACE_EDGES[column, row]
 
-                return False
 
-        if self.get_color() == "Red":
-            if (x == self.get_column() + 1 or x == self.get_column() - 1) and y == self.get_row():
-                return True
-            elif x == self.get_column() and (y == self.get_row() + 1 or y == self.get_row() - 1):
-                return True
-            elif x == 4 and y == 1:  # can move to middle from all positions in the fortress
-                return True
-            elif ((self.get_column() == 4) and (self.get_row() == 1)) and ((3 <= x <= 5) and (0 <= y <= 2)):
-                return True
+class Soldier(GamePiece):
+    """Represents a piece that can move one space forwards, backwards, or sideways. Inside the opposing color's
+    fortress, it is able to move to the middle from any space and also from the middle, can move to any space"""
 
-            else:
+    __slots__ = ()
 
-                return False
+    TYPE_CODE = SOLDIER
+    SYMBOLS = ("♙", "♟")
 
+    def is_legal_move_from(self, column, row, x, y):
+        """Defines the legal move-set for the piece standing at column, row"""
 
-class Guard(GamePiece):
-    """Represents a piece that can only move on space in any direction within the bounds of the 'fortress'"""
+        if self.is_in_bounds(x, y) is False:
 
-    def __init__(self, color, column, row):
-        """Initializes the piece with its specific symbol representation"""
-        super().__init__(color, column, row)
-        self._red_symbol = "♝"
-        self._blue_symbol = "♗"
+            return False
 
-    def is_legal_move(self, x, y):
-        """Defines the legal move-set for the piece"""
+        # moves differently within enemy fortress: along the palace lines to and from its center
+        enemy_center = PALACE_CENTERS[RED if self._color == BLUE else BLUE]
+        if (enemy_center == (column, row) or enemy_center == (x, y)) and (
+                (x, y) in PALACE_EDGES.get((column, row), NO_SQUARES)):
+            return True
 
-        if self.is_in_bounds(x, y) is False:
+        if (x == column + 1 or x == column - 1) and y == row:
+            return True
 
-            return False
+        # Blue advances up the board, Red down
+        if x == column and y == row + (-1 if self._color == BLUE else 1):
+            return True
 
-        if self.is_in_fortress(x, y) is False:
+        return False
 
-            return False
 
-        if self.get_color() == "Blue":
-            if (x == self.get_column() + 1 or x == self.get_column() - 1) and y == self.get_row():
-                return True
-            elif x == self.get_column() and (y == self.get_row() + 1 or y == self.get_row() - 1):
-                return True
-            elif x == 4 and y == 8:  # can move to middle from all positions in the fortress
-                return True
-            elif ((self.get_column() == 4) and (self.get_row() == 8)) and ((3 <= x <= 5) and (7 <= y <= 9)):
-                return True
+class PlacedPiece:
+    """
+    A piece together with the square it stands on, with the accessors pieces had when they kept their own location.
+    Moving a PlacedPiece with set_row() / set_column() only changes the view, never a game's board
+    """
 
-            else:
+    __slots__ = ('_piece', '_row', '_column')
 
-                return False
+    def __init__(self, piece, column, row):
+        """Initializes the view of the given piece at column, row"""
+        self._piece = piece
+        self._row = row
+        self._column = column
 
-        if self.get_color() == "Red":
-            if (x == self.get_column() + 1 or x == self.get_column() - 1) and y == self.get_row():
-                return True
-            elif x == self.get_column() and (y == self.get_row() + 1 or y == self.get_row() - 1):
-                return True
-            elif x == 4 and y == 1:  # can move to middle from all positions in the fortress
-                return True
-            elif ((self.get_column() == 4) and (self.get_row() == 1)) and ((3 <= x <= 5) and (0 <= y <= 2)):
-                return True
+    def get_piece(self):
+        """Returns the shared piece"""
+        return self._piece
 
-            else:
+    def get_color(self):
+        """Returns the color of the piece"""
+        return self._piece.get_color()
 
-                return False
+    def get_color_code(self):
+        """Returns the color of the piece as BLUE or RED"""
+        return self._piece.get_color_code()
 
+    def get_type_code(self):
+        """Returns the type code of the piece"""
+        return self._piece.TYPE_CODE
 
-class Soldier(GamePiece):
-    """Represents a piece that can move one space forwards, backwards, or sideways. Inside the opposing color's
-    fortress, it is able to move to the middle from any space and also from the middle, can move to any space"""
+    def get_symbol(self):
+        """Returns unicode symbol of piece depending on color"""
+        return self._piece.get_symbol()
 
-    def __init__(self, color, column, row):
-        """Initializes the piece with its specific symbol representation"""
-        super().__init__(color, column, row)
-        self._red_symbol = "♟"
-        self._blue_symbol = "♙"
+    def get_row(self):
+        """Returns the position of the row (the y-coordinate) of the piece"""
+        return self._row
 
-    def is_legal_move(self, x, y):
-        """Defines the legal move-set for the piece"""
+    def set_row(self, row):
+        """Set's the row (the y-coordinate) of the piece"""
+        self._row = row
 
-        if self.is_in_bounds(x, y) is False:
+    def get_column(self):
+        """Returns the position of the column (the x-coordinate) of the piece"""
+        return self._column
 
-            return False
+    def set_column(self, column):
+        """Set's the column (the x-coordinate) of the piece"""
+        self._column = column
 
-        if self.get_color() == "Red":
+    def is_legal_move(self, x, y):
+        """Defines the legal move-set for the piece from where it stands"""
+        return self._piece.is_legal_move_from(self._column, self._row, x, y)
 
-            # moves differently within enemy fortress
-            if (self.get_column() == 4) and (self.get_row() == 8) and ((3 <= x <= 5) and (7 <= y <= 9)):
-                return True
-            if ((x == 4) and (y == 8)) and ((3 <= self.get_column() <= 5) and (7 <= self.get_row() <= 9)):
-                return True
+    def __repr__(self):
+        return f'PlacedPiece({self._piece!r}, {self._column}, {self._row})'
 
-            if (x == self.get_column() + 1 or x == self.get_column() - 1) and y == self.get_row():
-                return True
-            if x == self.get_column() and (y == self.get_row() + 1):
-                return True
 
-            return False
+# the shared pieces, indexed [type code][color code]
+PIECES = tuple(tuple(piece_type(color) for color in (BLUE, RED))
+               for piece_type in (General, Guard, Horse, Elephant, Chariot, Cannon, Soldier))
 
-        if self.get_color() == "Blue":
 
-            # moves differently within enemy fortress
-            if ((self.get_column() == 4) and (self.get_row() == 1)) and ((3 <= x <= 5) and (0 <= y <= 2)):
-                return True
-            if ((x == 4) and (y == 1)) and ((3 <= self.get_column() <= 5) and (0 <= self.get_row() <= 2)):
-                return True
+def get_piece(type_code, color):
+    """Returns the shared piece of the given type code and color, which is 'Blue' / 'Red' or BLUE / RED"""
+    return PIECES[type_code][color if color in (BLUE, RED) else COLOR_CODES[color]]
 
-            if (x == self.get_column() + 1 or x == self.get_column() - 1) and y == self.get_row():
-                return True
-            if x == self.get_column() and y == self.get_row() - 1:
-                return True
 
-            return False
+# watching_squares() tables, built the first time they are asked for
+_WATCHING = {}
+
+
+def watching_squares(x, y):
+    """
+    Returns the squares whose piece, whatever it is, may move differently when what stands on x, y changes: x, y
+    itself, every square a move-set reaches x, y from, and every square whose Horse or Elephant moves have x, y as a
+    leg. Chariot and Cannon moves along the rank and file of x, y are left out, since which of those pieces see x, y
+    depends on the pieces in between
+    """
+    if not _WATCHING:
+        watching = {(column, row): {(column, row)} for column in range(9) for row in range(10)}
+        for pieces in PIECES:
+            for piece in pieces:
+                for column in range(9):
+                    for row in range(10):
+                        for target_x, target_y, blocking in piece.targets_from(column, row):
+                            if piece.TYPE_CODE in (CHARIOT, CANNON) and (target_x == column or target_y == row):
+                                continue
+                            watching[target_x, target_y].add((column, row))
+                            for square in blocking:
+                                watching[square].add((column, row))
+        _WATCHING.update((square, tuple(sorted(squares))) for square, squares in watching.items())
+    return _WATCHING[x, y]
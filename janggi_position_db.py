@@ -0,0 +1,282 @@
+import argparse
+import collections
+import heapq
+import itertools
+import mmap
+import os
+import shutil
+import struct
+import sys
+import tempfile
+import time
+import janggi_game
+from janggi_moves import NO_MOVE, decode_move, encode_move
+from janggi_records import iter_archive
+from janggi_zobrist import position_hash
+
+# Database layout, all little endian:
+#
+#   header     magic, number of positions, offset of the move table, offset of the position table
+#   moves      (move, times played, Blue wins, Red wins) for every move played from every position
+#   positions  (hash, times seen, Blue wins, Red wins, first move, number of moves), sorted by hash
+#
+# Lookups binary search the memory-mapped position table, so they take O(log n) reads and no server.
+# Moves are packed into 16 bits as janggi_moves describes. NO_MOVE marks the position a game ended in, counted as seen
+# but with no move played.
+
+MAGIC = b'JGPOSDB1'
+HEADER = struct.Struct('<8sQQQ')
+POSITION = struct.Struct('<QIIIQI')
+MOVE = struct.Struct('<HIII')
+RUN_ENTRY = struct.Struct('<QHIII')
+HASH = struct.Struct('<Q')
+
+MAX_ENTRIES = 1000000  # aggregated entries kept in memory before a sorted run is spilled to disk
+RUN_BLOCK = 4096
+
+PositionStats = collections.namedtuple('PositionStats', 'seen blue_wins red_wins unfinished moves')
+MoveStats = collections.namedtuple('MoveStats', 'source destination count blue_wins red_wins')
+
+
+def iter_positions(record):
+    """
+    Generator that replays a GameRecord and yields (position hash, packed move) for every position of the game and
+    the move played from it. The position the game stops in is yielded with NO_MOVE. Replay stops at an illegal move
+    """
+    game = janggi_game.JanggiGame(sink=None)
+
+    for source, destination in record.get_moves():
+        position = position_hash(game)
+        made = len(game.get_moves())
+        game.make_move(source, destination)
+        if len(game.get_moves()) == made:
+            break
+        yield position, encode_move(source, destination)
+
+    yield position_hash(game), NO_MOVE
+
+
+class PositionDatabaseBuilder:
+    """
+    Aggregates the positions of imported games and writes the sorted database. Aggregates are kept in memory until
+    max_entries is reached, then spilled to disk as sorted runs that are merged when the database is written, so
+    archives of any size can be imported
+    """
+
+    def __init__(self, max_entries=MAX_ENTRIES, temp_dir=None):
+        """Initializes an empty builder. Spilled runs go to a temporary directory inside temp_dir"""
+        self._max_entries = max_entries
+        self._entries = {}
+        self._directory = tempfile.TemporaryDirectory(dir=temp_dir)
+        self._runs = []
+        self._games = 0
+
+    def add_game(self, record):
+        """Adds every position of a GameRecord, credited with the record's result"""
+        result = record.get_result()
+        blue_win = result == "BLUE_WON"
+        red_win = result == "RED_WON"
+
+        for key in iter_positions(record):
+            stats = self._entries.get(key)
+            if stats is None:
+                if len(self._entries) >= self._max_entries:
+                    self._spill()
+                stats = self._entries[key] = [0, 0, 0]
+            stats[0] += 1
+            stats[1] += blue_win
+            stats[2] += red_win
+        self._games += 1
+
+    def get_game_count(self):
+        """Returns the number of games added"""
+        return self._games
+
+    def _spill(self):
+        """Writes the in-memory aggregates to disk as a sorted run"""
+        path = os.path.join(self._directory.name, f'run{len(self._runs)}')
+        with open(path, 'wb') as stream:
+            for (position, move), (count, blue_wins, red_wins) in sorted(self._entries.items()):
+                stream.write(RUN_ENTRY.pack(position, move, count, blue_wins, red_wins))
+        self._runs.append(path)
+        self._entries = {}
+
+    @staticmethod
+    def _read_run(path):
+        """Generator over the entries of a spilled run, as ((position, move), count, blue_wins, red_wins)"""
+        with open(path, 'rb') as stream:
+            while True:
+                block = stream.read(RUN_ENTRY.size * RUN_BLOCK)
+                if not block:
+                    return
+                for position, move, count, blue_wins, red_wins in RUN_ENTRY.iter_unpack(block):
+                    yield (position, move), count, blue_wins, red_wins
+
+    def _merged_entries(self):
+        """Generator over all aggregates in (position, move) order, with the counts of equal keys summed"""
+        in_memory = ((key, *stats) for key, stats in sorted(self._entries.items()))
+        runs = [self._read_run(path) for path in self._runs]
+        merged = heapq.merge(in_memory, *runs, key=lambda entry: entry[0])
+
+        for key, group in itertools.groupby(merged, key=lambda entry: entry[0]):
+            count = blue_wins = red_wins = 0
+            for _, entry_count, entry_blue, entry_red in group:
+                count += entry_count
+                blue_wins += entry_blue
+                red_wins += entry_red
+            yield key, count, blue_wins, red_wins
+
+    def write(self, path):
+        """Writes the database to path and returns the number of positions in it"""
+        positions_path = os.path.join(self._directory.name, 'positions')
+        position_count = 0
+        move_count = 0
+
+        with open(path, 'wb') as stream, open(positions_path, 'wb') as positions:
+            stream.write(HEADER.pack(MAGIC, 0, 0, 0))
+            moves_offset = stream.tell()
+
+            for position, entries in itertools.groupby(self._merged_entries(), key=lambda entry: entry[0][0]):
+                seen = blue_wins = red_wins = 0
+                first_move = move_count
+                for (_, move), count, entry_blue, entry_red in entries:
+                    seen += count
+                    blue_wins += entry_blue
+                    red_wins += entry_red
+                    if move != NO_MOVE:
+                        stream.write(MOVE.pack(move, count, entry_blue, entry_red))
+                        move_count += 1
+                positions.write(POSITION.pack(position, seen, blue_wins, red_wins, first_move,
+                                              move_count - first_move))
+                position_count += 1
+
+            positions_offset = stream.tell()
+            positions.flush()
+            with open(positions_path, 'rb') as source:
+                shutil.copyfileobj(source, stream)
+
+            stream.seek(0)
+            stream.write(HEADER.pack(MAGIC, position_count, moves_offset, positions_offset))
+
+        return position_count
+
+    def close(self):
+        """Removes the spilled runs"""
+        self._directory.cleanup()
+
+
+class PositionDatabase:
+    """Read-only view of a position database file, memory-mapped so lookups need no loading"""
+
+    def __init__(self, path):
+        """Opens and maps the database at path"""
+        with open(path, 'rb') as stream:
+            self._map = mmap.mmap(stream.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self._count, self._moves_offset, self._positions_offset = HEADER.unpack_from(self._map)
+        if magic != MAGIC:
+            self._map.close()
+            raise ValueError(f'{path} is not a position database')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        return self._count
+
+    def lookup(self, position):
+        """
+        Returns the PositionStats of a position hash, with its moves ordered from most to least played, or None if the
+        position is not in the database
+        """
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            key = HASH.unpack_from(self._map, self._positions_offset + middle * POSITION.size)[0]
+            if key < position:
+                low = middle + 1
+            elif key > position:
+                high = middle
+            else:
+                break
+        else:
+            return None
+
+        _, seen, blue_wins, red_wins, first_move, move_count = POSITION.unpack_from(
+            self._map, self._positions_offset + middle * POSITION.size)
+
+        moves = []
+        for index in range(first_move, first_move + move_count):
+            move, count, move_blue, move_red = MOVE.unpack_from(self._map, self._moves_offset + index * MOVE.size)
+            moves.append(MoveStats(*decode_move(move), count, move_blue, move_red))
+        moves.sort(key=lambda stats: -stats.count)
+
+        return PositionStats(seen, blue_wins, red_wins, seen - blue_wins - red_wins, moves)
+
+    def lookup_game(self, game):
+        """Returns the PositionStats of the current position of a JanggiGame, or None"""
+        return self.lookup(position_hash(game))
+
+    def close(self):
+        """Unmaps the database"""
+        self._map.close()
+
+
+def build(path, archives, max_entries=MAX_ENTRIES):
+    """Builds the database at path from the game records in the archives. Returns (games, positions)"""
+    builder = PositionDatabaseBuilder(max_entries)
+    try:
+        for archive in archives:
+            for record in iter_archive(archive):
+                builder.add_game(record)
+        return builder.get_game_count(), builder.write(path)
+    finally:
+        builder.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Builds and queries position statistics databases')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    build_parser = commands.add_parser('build', help='build a database from game record archives')
+    build_parser.add_argument('database')
+    build_parser.add_argument('archives', nargs='+')
+    build_parser.add_argument('--max-entries', type=int, default=MAX_ENTRIES,
+                              help='aggregates kept in memory before spilling to disk')
+
+    query_parser = commands.add_parser('query', help='show what happened from a position')
+    query_parser.add_argument('database')
+    query_parser.add_argument('moves', nargs='*', help='moves leading to the position, e.g. c7-c6 c4-c5')
+    args = parser.parse_args(argv)
+
+    if args.command == 'build':
+        start = time.perf_counter()
+        games, positions = build(args.database, args.archives, args.max_entries)
+        print(f'{games} games, {positions} positions in {time.perf_counter() - start:.2f} s')
+        return 0
+
+    game = janggi_game.JanggiGame(sink=None)
+    for move in args.moves:
+        source, _, destination = move.partition('-')
+        game.make_move(source, destination)
+
+    with PositionDatabase(args.database) as database:
+        start = time.perf_counter()
+        stats = database.lookup_game(game)
+        elapsed = time.perf_counter() - start
+
+    if stats is None:
+        print('position not found')
+        return 1
+
+    print(f'seen {stats.seen}: Blue won {stats.blue_wins}, Red won {stats.red_wins}, unfinished {stats.unfinished}'
+          f' ({elapsed * 1000:.3f} ms)')
+    for move in stats.moves:
+        print(f'  {move.source}-{move.destination}: {move.count} (Blue won {move.blue_wins}, Red won {move.red_wins})')
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,186 @@
+import gzip
+import re
+from janggi_game import ALGEBRAIC_SQUARES
+
+# A game record is a block of [Key "Value"] header lines followed by the move text, PGN style:
+#
+#   [Blue "Cho player"]
+#   [Red "Han player"]
+#   [Result "1-0"]
+#
+#   1. c7-c6 c4-c5 2. b10-d7 a4-a4 ... 1-0
+#
+# Each move is source-destination in the algebraic notation used by JanggiGame.make_move(). As in make_move(), a move
+# whose source and destination are the same square passes the turn. Blue (Cho) moves first.
+
+RESULT_TOKENS = {"BLUE_WON": "1-0", "RED_WON": "0-1", "UNFINISHED": "*"}
+RESULT_STATES = {token: state for state, token in RESULT_TOKENS.items()}
+
+# every possible move token mapped to its (source, destination) pair, so parsing a move is a single lookup
+MOVE_TOKENS = {source + '-' + destination: (source, destination)
+               for source in ALGEBRAIC_SQUARES.values() for destination in ALGEBRAIC_SQUARES.values()}
+
+HEADER_PATTERN = re.compile(r'\[\s*(\w+)\s+"((?:[^"\\]|\\.)*)"\s*\]')
+LINE_WIDTH = 80
+
+
+class RecordError(ValueError):
+    """Raised when a game record archive cannot be parsed. The message carries the line number"""
+
+
+class GameRecord:
+    """
+    Represents one recorded game: its headers, the moves played as (source, destination) pairs in algebraic notation
+    and the result as a game state ('UNFINISHED', 'BLUE_WON' or 'RED_WON')
+    """
+
+    def __init__(self, headers=None, moves=None, result="UNFINISHED"):
+        """Initializes the record. Headers keep their insertion order when written"""
+        self._headers = dict(headers) if headers else {}
+        self._moves = list(moves) if moves else []
+        self._result = result
+
+    def get_headers(self):
+        """Returns the header dictionary"""
+        return self._headers
+
+    def get_moves(self):
+        """Returns the list of (source, destination) moves"""
+        return self._moves
+
+    def add_move(self, source, destination):
+        """Appends a move to the record"""
+        self._moves.append((source, destination))
+
+    def get_result(self):
+        """Returns the result of the game as a game state"""
+        return self._result
+
+    def set_result(self, result):
+        """Sets the result of the game, given as a game state"""
+        self._result = result
+
+    def __eq__(self, other):
+        return (isinstance(other, GameRecord) and self._headers == other._headers and self._moves == other._moves
+                and self._result == other._result)
+
+    def __repr__(self):
+        return f'GameRecord({len(self._moves)} moves, {self._result})'
+
+
+def parse_move(token):
+    """Returns the (source, destination) pair of a move token such as 'c7-c6', or None if it is not a move"""
+    move = MOVE_TOKENS.get(token)
+    if move is None and not token.islower():
+        move = MOVE_TOKENS.get(token.lower())
+    return move
+
+
+def read_records(lines):
+    """
+    Generator that parses game records from an iterable of text lines (e.g. an open file) and yields one GameRecord at
+    a time, so an archive of any size is read in constant memory. The Result header is used when the move text does not
+    end with a result token. Raises RecordError on malformed input
+    """
+    headers = {}
+    moves = []
+    in_moves = False
+    line_number = 0
+
+    for line_number, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line or line[0] == ';':
+            continue
+
+        if line[0] == '[':
+            if in_moves:
+                # a new header block without a result token starts the next game
+                yield _finish_record(headers, moves, None)
+                headers, moves, in_moves = {}, [], False
+
+            match = HEADER_PATTERN.fullmatch(line)
+            if match is None:
+                raise RecordError(f'line {line_number}: malformed header {line!r}')
+            headers[match.group(1)] = match.group(2).replace('\\"', '"').replace('\\\\', '\\')
+            continue
+
+        in_moves = True
+        for token in line.split():
+            move = MOVE_TOKENS.get(token)
+            if move is not None:
+                moves.append(move)
+                continue
+
+            if token in RESULT_STATES:
+                yield _finish_record(headers, moves, RESULT_STATES[token])
+                headers, moves, in_moves = {}, [], False
+                continue
+
+            if token[-1] == '.' and token[:-1].rstrip('.').isdigit():  # move number
+                continue
+
+            move = parse_move(token)
+            if move is None:
+                raise RecordError(f'line {line_number}: {token!r} is not a move')
+            moves.append(move)
+
+    if headers or moves:
+        yield _finish_record(headers, moves, None)
+
+
+def _finish_record(headers, moves, result):
+    """Builds the GameRecord for read_records(), falling back to the Result header for the result"""
+    if result is None:
+        result = RESULT_STATES.get(headers.get("Result"), "UNFINISHED")
+    return GameRecord(headers, moves, result)
+
+
+def format_record(record):
+    """Returns the text of one game record, ending with a blank line"""
+    headers = dict(record.get_headers())
+    headers["Result"] = RESULT_TOKENS[record.get_result()]
+
+    lines = ['[{} "{}"]'.format(key, str(value).replace('\\', '\\\\').replace('"', '\\"'))
+             for key, value in headers.items()]
+    lines.append('')
+
+    line = ''
+    for ply, (source, destination) in enumerate(record.get_moves()):
+        token = source + '-' + destination
+        if ply % 2 == 0:
+            token = f'{ply // 2 + 1}. {token}'
+        if line and len(line) + len(token) + 1 > LINE_WIDTH:
+            lines.append(line)
+            line = token
+        else:
+            line = line + ' ' + token if line else token
+
+    result = RESULT_TOKENS[record.get_result()]
+    lines.append(line + ' ' + result if line else result)
+    lines.append('')
+    return '\n'.join(lines) + '\n'
+
+
+def write_records(stream, records):
+    """
+    Writes game records to a text stream as they are produced by the iterable (e.g. a generator), so records never
+    have to be held in memory together. Returns the number of records written
+    """
+    count = 0
+    for record in records:
+        stream.write(format_record(record))
+        count += 1
+    return count
+
+
+def open_archive(path, mode='r'):
+    """Opens a game record archive as a text stream. Paths ending in .gz are compressed with gzip"""
+    if str(path).endswith('.gz'):
+        return gzip.open(path, mode + 't', encoding='utf-8')
+    return open(path, mode, encoding='utf-8')
+
+
+def iter_archive(path):
+    """Generator that yields every game record of the archive at path"""
+    with open_archive(path) as stream:
+        yield from read_records(stream)
@@ -0,0 +1,101 @@
+import argparse
+import collections
+import itertools
+import multiprocessing
+import os
+import sys
+import time
+import janggi_game
+from janggi_records import iter_archive
+
+# set constants
+CHUNKSIZE = 16
+PENDING_CHUNKS = 4  # chunks submitted ahead per worker, which bounds the records held in memory
+
+
+def replay_record(record):
+    """
+    Replays the moves of a GameRecord through the JanggiGame rules with no sink, so nothing is rendered. Returns None
+    if every move is legal and the final game state matches the recorded result, otherwise returns a message describing
+    the first problem found
+    """
+    game = janggi_game.JanggiGame(sink=None)
+
+    for ply, (source, destination) in enumerate(record.get_moves(), 1):
+        if game.get_game_state() != "UNFINISHED":
+            return f'ply {ply}: {source}-{destination} played after the game ended'
+
+        # make_move() returns False for the move that delivers checkmate, so the game state tells those apart
+        if not game.make_move(source, destination) and game.get_game_state() == "UNFINISHED":
+            return f'ply {ply}: illegal move {source}-{destination}'
+
+    if game.get_game_state() != record.get_result():
+        return f'result mismatch: recorded {record.get_result()}, replayed {game.get_game_state()}'
+
+    return None
+
+
+def _replay_numbered(numbered_record):
+    """Pool worker. Takes a (game number, record) pair and returns (game number, problem or None)"""
+    number, record = numbered_record
+    return number, replay_record(record)
+
+
+def _replay_chunk(chunk):
+    """Pool worker. Takes a list of (game number, record) pairs and returns their (game number, problem) pairs"""
+    return [_replay_numbered(numbered_record) for numbered_record in chunk]
+
+
+def replay_archives(paths, workers=None, chunksize=CHUNKSIZE):
+    """
+    Generator that streams the records of the given archives through a process pool and yields a (game number, problem)
+    pair for every game, chunk by chunk in the order the chunks were read. Game numbers count from 1 across all
+    archives. At most PENDING_CHUNKS chunks of chunksize records per worker are read ahead of the results, so memory
+    stays bounded however large the archives are. With workers=1 the games are replayed in this process
+    """
+    records = itertools.chain.from_iterable(iter_archive(path) for path in paths)
+    numbered = enumerate(records, 1)
+
+    if workers == 1:
+        yield from map(_replay_numbered, numbered)
+        return
+
+    chunks = iter(lambda: list(itertools.islice(numbered, chunksize)), [])
+    limit = PENDING_CHUNKS * (workers or os.cpu_count() or 1)
+    with multiprocessing.Pool(workers) as pool:
+        pending = collections.deque()
+        for chunk in chunks:
+            if len(pending) == limit:
+                yield from pending.popleft().get()
+            pending.append(pool.apply_async(_replay_chunk, (chunk,)))
+        while pending:
+            yield from pending.popleft().get()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Replays archived game records through the JanggiGame rules and '
+                                                 'flags illegal moves and mismatched results')
+    parser.add_argument('archives', nargs='+', help='game record archives (.gz archives are decompressed)')
+    parser.add_argument('--workers', type=int, default=None, help='worker processes, defaults to the CPU count')
+    parser.add_argument('--chunksize', type=int, default=CHUNKSIZE, help='games sent to a worker at a time')
+    args = parser.parse_args(argv)
+
+    games = 0
+    flagged = 0
+    start = time.perf_counter()
+
+    for number, problem in replay_archives(args.archives, args.workers, args.chunksize):
+        games += 1
+        if problem is not None:
+            flagged += 1
+            print(f'game {number}: {problem}')
+
+    elapsed = time.perf_counter() - start
+    rate = games / elapsed if elapsed else 0.0
+    print(f'{games} games replayed in {elapsed:.2f} s ({rate:.1f} games/s), {flagged} flagged')
+
+    return 1 if flagged else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
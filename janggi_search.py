@@ -0,0 +1,287 @@
+import random
+from janggi_moves import MOVE_COORDINATES, PASS_MOVE, MoveBuffers, decode_move, make_packed_move
+from janggi_pieces import General, Guard, Horse, Elephant, Chariot, Cannon, Soldier
+
+# Scores are in points from the point of view of the player whose turn it is, using the usual Janggi piece values.
+# A checkmate is worth MATE_SCORE less the number of plies it takes, so quicker mates score higher.
+PIECE_VALUES = {General: 0, Guard: 3, Elephant: 3, Horse: 5, Cannon: 7, Chariot: 13, Soldier: 2}
+MATE_SCORE = 100000
+DEPTH = 2
+
+# Exchanges value the General above everything else, so it only captures last or onto a square nobody can recapture on
+EXCHANGE_VALUES = dict(PIECE_VALUES)
+EXCHANGE_VALUES[General] = 1000
+
+# transposition table bounds
+EXACT, LOWER, UPPER = 0, 1, 2
+
+# Selective search, each part switched on separately with the Searcher argument of the same name:
+#
+#   null_move   passing the turn, which Janggi allows whenever the player is not in check, is searched first with
+#               NULL_MOVE_REDUCTION plies less; when even that fails high the position is cut off
+#   reductions  quiet moves after the first LATE_MOVES are searched REDUCTION plies less with a null window, and again
+#               at full depth only when they beat alpha
+#   futility    with one ply left, quiet moves are skipped when the material balance plus FUTILITY_MARGIN cannot
+#               reach alpha
+SELECTIVE = ('null_move', 'reductions', 'futility')
+NULL_MOVE_REDUCTION = 2
+NULL_MOVE_DEPTH = 3  # least depth left to try a null move at
+LATE_MOVES = 3
+REDUCTION = 1
+REDUCTION_DEPTH = 3  # least depth left to reduce at
+FUTILITY_MARGIN = 2
+
+
+def evaluate(game):
+    """Returns the material balance of a JanggiGame for the player whose turn it is"""
+    turn = game.get_turn()
+    score = 0
+    for piece in game.get_board().values():
+        if piece is not None:
+            if piece.get_color() == turn:
+                score += PIECE_VALUES[type(piece)]
+            else:
+                score -= PIECE_VALUES[type(piece)]
+    return score
+
+
+def static_exchange(game, source_column, source_row, x, y):
+    """
+    Returns the material the capture from the source coordinates onto x, y wins for the mover, once every recapture
+    on x, y worth making has been made, each side always recapturing with its least valuable piece (static exchange
+    evaluation). The captures are made on the board to find the attackers of each turn with generate_attackers(), so a
+    Cannon never takes a Cannon, and the screens of the Cannons and the lines of the Chariots follow the pieces that
+    leave the board. Whether a capture would leave its own general in check is not considered. The game is left as
+    it was found
+    """
+    board = game.get_board()
+    piece = board[source_column, source_row]
+    captured = board[x, y]
+    color = piece.get_color_code()
+    gains = [EXCHANGE_VALUES[type(captured)]]
+    changes = [(source_column, source_row, piece), (x, y, captured)]
+    game.move_piece(piece, source_column, source_row, x, y)
+
+    while True:
+        color ^= 1
+        attackers = list(game.generate_attackers(x, y, color))
+        if not attackers:
+            break
+        column, row = min(attackers, key=lambda square: EXCHANGE_VALUES[type(board[square])])
+        # what the side to capture is ahead if it takes the piece on x, y and nothing more happens
+        gains.append(EXCHANGE_VALUES[type(piece)] - gains[-1])
+        changes.append((column, row, board[column, row]))
+        changes.append((x, y, piece))
+        piece = board[column, row]
+        game.move_piece(piece, column, row, x, y)
+
+    for column, row, changed in reversed(changes):
+        game.set_piece_by_coordinate(column, row, changed)
+
+    # each side may stop capturing when going on would lose
+    for depth in range(len(gains) - 1, 0, -1):
+        gains[depth - 1] = -max(-gains[depth - 1], gains[depth])
+    return gains[0]
+
+
+def square_exchange(game, x, y, color):
+    """
+    Returns the material the color code can win on x, y by starting the exchange there with its least valuable
+    attacker, or 0 if it cannot win anything
+    """
+    if game.get_piece_by_coordinate(x, y) is None:
+        return 0
+    attackers = list(game.generate_attackers(x, y, color))
+    if not attackers:
+        return 0
+    column, row = min(attackers, key=lambda square: EXCHANGE_VALUES[type(game.get_piece_by_coordinate(*square))])
+    return max(0, static_exchange(game, column, row, x, y))
+
+
+def pass_move(game):
+    """Returns the move that passes the turn: the square of the player's general given as source and destination"""
+    general = game.get_algebraic(*game.get_general_coords(game.get_turn()))
+    return general, general
+
+
+class Searcher:
+    """
+    Picks moves with a fixed depth alpha-beta (negamax) search over the JanggiGame rules. Moves are generated packed
+    (see janggi_moves) into a buffer per ply, tried with make_packed_move() and taken back with undo_move(), so the game
+    passed in is left as it was found. Positions already searched are kept in a transposition table keyed by Zobrist
+    hash for as long as the searcher lives. The selective search (see SELECTIVE) is off unless asked for, so that its
+    savings can be measured against the full search
+    """
+
+    def __init__(self, depth=DEPTH, rng=None, null_move=False, reductions=False, futility=False, eval_cache=None,
+                 evaluator=evaluate):
+        """
+        Initializes the searcher. rng, a random.Random, breaks ties between equally good moves. null_move, reductions
+        and futility switch on the parts of the selective search. eval_cache, a janggi_cache.EvalCache, keeps the
+        evaluations of the positions searched. evaluator scores positions in whole points for the side to move, like
+        evaluate() or janggi_nnue.Network.evaluate()
+        """
+        self._depth = depth
+        self._rng = rng or random.Random()
+        self._null_move = null_move
+        self._reductions = reductions
+        self._futility = futility
+        self._eval_cache = eval_cache
+        self._evaluator = evaluator
+        self._table = {}
+        self._buffers = MoveBuffers()
+        self._nodes = 0
+        self._stats = dict.fromkeys(('null_cutoffs', 'reduced', 're_searched', 'futile'), 0)
+
+    def get_depth(self):
+        """Returns the depth searched, in plies"""
+        return self._depth
+
+    def get_nodes(self):
+        """Returns the number of positions visited by the searches so far"""
+        return self._nodes
+
+    def get_eval_cache(self):
+        """Returns the EvalCache of the searcher, or None"""
+        return self._eval_cache
+
+    def get_selective(self):
+        """Returns the names of the parts of the selective search that are on"""
+        return tuple(name for name in SELECTIVE if getattr(self, '_' + name))
+
+    def get_stats(self):
+        """
+        Returns a dictionary of the nodes visited and of how often the selective search cut off a position after a null
+        move, reduced a late move, searched a reduced move again at full depth and skipped a futile move
+        """
+        stats = {'nodes': self._nodes}
+        stats.update(self._stats)
+        return stats
+
+    def clear(self):
+        """Empties the transposition table"""
+        self._table.clear()
+
+    def search(self, game):
+        """
+        Returns (move, score) for the player whose turn it is: the best (source, destination) pair found and its score.
+        The move is None if the game is over. When no legal move is left the move passes the turn
+        """
+        if game.get_game_state() != "UNFINISHED":
+            return None, -MATE_SCORE
+        move, score = self._negamax(game, self._depth, -MATE_SCORE - 1, MATE_SCORE + 1, 0, False)
+        return decode_move(move, game), score
+
+    def evaluate(self, game):
+        """Returns the evaluation of the game, looked up in and stored to the eval cache if the searcher has one"""
+        if self._eval_cache is None:
+            return self._evaluator(game)
+        key = game.get_position_hash()
+        score = self._eval_cache.get(key)
+        if score is None:
+            score = self._evaluator(game)
+            self._eval_cache.put(key, score)
+        return score
+
+    def ordered_moves(self, game, best=None, depth=None, ply=0):
+        """
+        Returns the legal moves of the game as a list of packed moves, generated into the move buffer of the ply,
+        shuffled and then ordered with the best move from an earlier search of the position in front, then the captures
+        that do not lose material by static_exchange(), most valuable victim first, then the other moves and last the
+        losing captures. With depth 1 left, the last ply of a search, no recapture is searched, so captures simply go
+        first by victim
+        """
+        moves = game.generate_packed_moves(self._buffers.get(ply))
+        self._rng.shuffle(moves)
+        board = game.get_board()
+
+        def order(move):
+            source_column, source_row, column, row = MOVE_COORDINATES[move]
+            victim = board.get((column, row))
+            if victim is None:
+                return 1, 0
+            if depth == 1:
+                return 0, -PIECE_VALUES[type(victim)]
+            gain = static_exchange(game, source_column, source_row, column, row)
+            return (0 if gain >= 0 else 2), -PIECE_VALUES[type(victim)], -gain
+
+        return sorted(moves, key=lambda move: (move != best, order(move)))
+
+    def _negamax(self, game, depth, alpha, beta, ply, null_move=True):
+        """
+        Returns (best packed move, score) of the position searched depth plies deep. null_move is False at the root and
+        right after a null move, where no null move is tried
+        """
+        self._nodes += 1
+
+        if game.get_game_state() != "UNFINISHED":
+            # the previous move was checkmate
+            return None, ply - MATE_SCORE
+
+        if depth == 0:
+            return None, self.evaluate(game)
+
+        key = game.get_position_hash()
+        entry = self._table.get(key)
+        best = None
+        if entry is not None:
+            entry_depth, bound, score, best = entry
+            if entry_depth >= depth and (bound == EXACT or (bound == LOWER and score >= beta) or
+                                         (bound == UPPER and score <= alpha)):
+                return best, score
+
+        in_check = game.check_check(game.get_turn())
+        if self._null_move and null_move and not in_check and depth >= NULL_MOVE_DEPTH:
+            make_packed_move(game, PASS_MOVE)
+            score = -self._negamax(game, depth - 1 - NULL_MOVE_REDUCTION, -beta, 1 - beta, ply + 1, False)[1]
+            game.undo_move()
+            if score >= beta:
+                self._stats['null_cutoffs'] += 1
+                return None, beta
+
+        futility_score = None
+        if self._futility and depth == 1 and not in_check:
+            futility_score = self.evaluate(game) + FUTILITY_MARGIN
+        futile = futility_score is not None and futility_score <= alpha
+        reducing = self._reductions and depth >= REDUCTION_DEPTH and not in_check
+
+        moves = self.ordered_moves(game, best, depth, ply)
+        if not moves:
+            moves = [PASS_MOVE]
+
+        board = game.get_board()
+        original_alpha = alpha
+        best_move, best_score = moves[0], -MATE_SCORE - 1
+        for index, move in enumerate(moves):
+            quiet = (futile or reducing) and move != PASS_MOVE and board.get(MOVE_COORDINATES[move][2:]) is None
+            if futile and quiet and index:
+                # the first move is always searched, so that there is a move to return
+                self._stats['futile'] += 1
+                best_score = max(best_score, futility_score)
+                continue
+
+            make_packed_move(game, move)
+            if reducing and quiet and index >= LATE_MOVES:
+                self._stats['reduced'] += 1
+                score = -self._negamax(game, depth - 1 - REDUCTION, -alpha - 1, -alpha, ply + 1)[1]
+                if score > alpha:
+                    self._stats['re_searched'] += 1
+                    score = -self._negamax(game, depth - 1, -beta, -alpha, ply + 1)[1]
+            else:
+                score = -self._negamax(game, depth - 1, -beta, -alpha, ply + 1)[1]
+            game.undo_move()
+
+            if score > best_score:
+                best_move, best_score = move, score
+            alpha = max(alpha, score)
+            if alpha >= beta:
+                break
+
+        if best_score <= original_alpha:
+            bound = UPPER
+        elif best_score >= beta:
+            bound = LOWER
+        else:
+            bound = EXACT
+        self._table[key] = (depth, bound, best_score, best_move)
+        return best_move, best_score
@@ -0,0 +1,267 @@
+import argparse
+import multiprocessing
+import os
+import random
+import sys
+import time
+from array import array
+import janggi_game
+from janggi_moves import MOVE_TYPECODE, decode_move
+from janggi_records import GameRecord, open_archive, write_records
+from janggi_search import DEPTH, SELECTIVE, Searcher, pass_move
+
+# Self-play output is written to a directory as numbered shards:
+#
+#   games-00000.txt    game records (see janggi_records), at most games_per_shard games each, .gz when compressed
+#   samples-00000.npy  training samples (see janggi_tensor.SAMPLE_DTYPE), at most positions_per_shard each
+#
+# Games finish in whatever order the workers complete them, so each record carries its game number in the Round header.
+# Only the shard being filled is held in memory.
+
+# set constants
+POLICIES = ('random', 'engine')
+GAMES = 100
+MAX_PLIES = 200
+RANDOM_PLIES = 4  # opening plies played at random by the engine policy, so its games do not all repeat
+GAMES_PER_SHARD = 1000
+POSITIONS_PER_SHARD = 100000
+CHUNKSIZE = 1
+
+
+def play_game(number, seed, policy='random', depth=DEPTH, max_plies=MAX_PLIES, random_plies=RANDOM_PLIES,
+              samples=False, blue_selective=(), red_selective=()):
+    """
+    Plays one game with both sides using the given policy and returns (game number, GameRecord, samples). The engine
+    policy searches depth plies deep after the first random_plies random moves, with the parts of the selective
+    search (see janggi_search.SELECTIVE) named in blue_selective and red_selective switched on for each side, so
+    engines can be matched against each other. The game stops after max_plies plies if nobody has won. samples is a
+    janggi_tensor.SAMPLE_DTYPE array with one sample per position played from when samples is True, otherwise None
+    """
+    rng = random.Random(seed)
+    game = janggi_game.JanggiGame(sink=None)
+    searchers = None
+    if policy == 'engine':
+        searchers = {color: Searcher(depth, rng, **dict.fromkeys(selective, True))
+                     for color, selective in (("Blue", blue_selective), ("Red", red_selective))}
+    buffer = array(MOVE_TYPECODE)  # reused for the move list of every random move
+    positions = []
+
+    if samples:
+        from janggi_tensor import encode_positions
+
+    while game.get_game_state() == "UNFINISHED" and len(game.get_moves()) < max_plies:
+        if searchers is None or len(game.get_moves()) < random_plies:
+            moves = game.generate_packed_moves(buffer)
+            move = decode_move(rng.choice(moves)) if moves else pass_move(game)
+        else:
+            move = searchers[game.get_turn()].search(game)[0]
+
+        if samples:
+            positions.append(encode_positions([game], 'int8')[0])
+        game.make_move(move[0], move[1])
+
+    headers = {"Event": "Self-play", "Round": number, "Blue": _player(policy, blue_selective),
+               "Red": _player(policy, red_selective), "Seed": seed}
+    record = GameRecord(headers, game.get_moves(), game.get_game_state())
+    return number, record, _training_samples(record, positions) if samples else None
+
+
+def _player(policy, selective):
+    """Returns the player header of a side: the policy, followed by the selective search it used joined with +"""
+    return '+'.join((policy,) + tuple(selective)) if policy == 'engine' else policy
+
+
+def _training_samples(record, positions):
+    """Returns the SAMPLE_DTYPE array of a finished game from the planes of each position played from"""
+    import numpy as np
+    from janggi_tensor import SAMPLE_DTYPE, encode_moves
+
+    result = {"BLUE_WON": 1, "RED_WON": -1}.get(record.get_result(), 0)
+    samples = np.zeros(len(positions), dtype=SAMPLE_DTYPE)
+    if positions:
+        samples['planes'] = positions
+        samples['move'] = encode_moves(record.get_moves())
+        # Blue moves on the even plies, passes included
+        samples['value'] = np.where(np.arange(len(positions)) % 2 == 0, result, -result)
+    return samples
+
+
+def _play_task(task):
+    """Pool worker. Takes the arguments of play_game() as a tuple"""
+    return play_game(*task)
+
+
+class RecordShards:
+    """Writes game records to numbered archives of at most games_per_shard games each"""
+
+    def __init__(self, directory, games_per_shard=GAMES_PER_SHARD, compress=False):
+        """Initializes the writer. Archives are created in directory when the first record of each arrives"""
+        self._directory = directory
+        self._games_per_shard = games_per_shard
+        self._extension = '.txt.gz' if compress else '.txt'
+        self._stream = None
+        self._count = 0
+        self._paths = []
+
+    def get_paths(self):
+        """Returns the paths of the archives written so far"""
+        return self._paths
+
+    def add(self, record):
+        """Appends a record, starting a new archive when the current one is full"""
+        if self._stream is None or self._count == self._games_per_shard:
+            self.close()
+            path = os.path.join(self._directory, f'games-{len(self._paths):05d}{self._extension}')
+            self._stream = open_archive(path, 'w')
+            self._paths.append(path)
+        write_records(self._stream, [record])
+        self._count += 1
+
+    def close(self):
+        """Closes the current archive"""
+        if self._stream is not None:
+            self._stream.close()
+            self._stream = None
+            self._count = 0
+
+
+class SampleShards:
+    """Collects training samples and writes them to numbered .npy files of positions_per_shard samples each"""
+
+    def __init__(self, directory, positions_per_shard=POSITIONS_PER_SHARD):
+        """Initializes the writer. The last file, written by close(), may hold fewer samples"""
+        self._directory = directory
+        self._positions_per_shard = positions_per_shard
+        self._pending = []
+        self._pending_count = 0
+        self._paths = []
+
+    def get_paths(self):
+        """Returns the paths of the files written so far"""
+        return self._paths
+
+    def add(self, samples):
+        """Adds the samples of a game, writing every shard they complete"""
+        self._pending.append(samples)
+        self._pending_count += len(samples)
+        while self._pending_count >= self._positions_per_shard:
+            self._write(self._positions_per_shard)
+
+    def _write(self, count):
+        """Writes the first count pending samples to the next file"""
+        import numpy as np
+
+        pending = np.concatenate(self._pending)
+        path = os.path.join(self._directory, f'samples-{len(self._paths):05d}.npy')
+        np.save(path, pending[:count])
+        self._paths.append(path)
+        self._pending = [pending[count:]]
+        self._pending_count = len(pending) - count
+
+    def close(self):
+        """Writes the samples left over"""
+        if self._pending_count:
+            self._write(self._pending_count)
+
+
+class _InProcess:
+    """Stands in for a multiprocessing.Pool when games are played in this process"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    @staticmethod
+    def imap_unordered(function, iterable, chunksize=1):
+        return map(function, iterable)
+
+
+def run_self_play(directory, games=GAMES, workers=None, policy='random', depth=DEPTH, max_plies=MAX_PLIES,
+                  random_plies=RANDOM_PLIES, samples=False, games_per_shard=GAMES_PER_SHARD,
+                  positions_per_shard=POSITIONS_PER_SHARD, compress=False, seed=None, chunksize=CHUNKSIZE,
+                  blue_selective=(), red_selective=()):
+    """
+    Plays games in a process pool, or in this process with workers=1, and streams them to shards in directory as they
+    finish. Training samples are only written when samples is True, which needs NumPy. Returns a summary dictionary
+    of counts, results, elapsed seconds and the paths written
+    """
+    if policy not in POLICIES:
+        raise ValueError(f'unknown policy {policy!r}, expected one of {", ".join(POLICIES)}')
+    for name in tuple(blue_selective) + tuple(red_selective):
+        if name not in SELECTIVE:
+            raise ValueError(f'unknown selective search {name!r}, expected one of {", ".join(SELECTIVE)}')
+
+    os.makedirs(directory, exist_ok=True)
+    seeds = random.Random(seed)
+    tasks = ((number, seeds.getrandbits(64), policy, depth, max_plies, random_plies, samples, tuple(blue_selective),
+              tuple(red_selective)) for number in range(1, games + 1))
+
+    records = RecordShards(directory, games_per_shard, compress)
+    sample_shards = SampleShards(directory, positions_per_shard) if samples else None
+    summary = {'games': 0, 'positions': 0, 'BLUE_WON': 0, 'RED_WON': 0, 'UNFINISHED': 0}
+    start = time.perf_counter()
+
+    with multiprocessing.Pool(workers) if workers != 1 else _InProcess() as pool:
+        for number, record, game_samples in pool.imap_unordered(_play_task, tasks, chunksize):
+            records.add(record)
+            if sample_shards is not None:
+                sample_shards.add(game_samples)
+            summary['games'] += 1
+            summary['positions'] += len(record.get_moves())
+            summary[record.get_result()] += 1
+
+    records.close()
+    if sample_shards is not None:
+        sample_shards.close()
+
+    summary['elapsed'] = time.perf_counter() - start
+    summary['record_paths'] = records.get_paths()
+    summary['sample_paths'] = sample_shards.get_paths() if sample_shards is not None else []
+    return summary
+
+
+def format_report(summary):
+    """Returns the throughput and results of a run_self_play() summary as text"""
+    elapsed = summary['elapsed']
+    games_rate = summary['games'] / elapsed if elapsed else 0.0
+    positions_rate = summary['positions'] / elapsed if elapsed else 0.0
+    return (f"{summary['games']} games, {summary['positions']} positions in {elapsed:.2f} s "
+            f"({games_rate:.2f} games/s, {positions_rate:.1f} positions/s)\n"
+            f"Blue won {summary['BLUE_WON']}, Red won {summary['RED_WON']}, unfinished {summary['UNFINISHED']}\n"
+            f"{len(summary['record_paths'])} record shards, {len(summary['sample_paths'])} sample shards")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Plays Janggi games against itself in parallel and writes the game '
+                                                 'records and training samples to sharded files')
+    parser.add_argument('directory', help='output directory')
+    parser.add_argument('--games', type=int, default=GAMES)
+    parser.add_argument('--workers', type=int, default=None, help='worker processes, defaults to the CPU count')
+    parser.add_argument('--policy', choices=POLICIES, default='random')
+    parser.add_argument('--depth', type=int, default=DEPTH, help='search depth of the engine policy, in plies')
+    parser.add_argument('--max-plies', type=int, default=MAX_PLIES, help='plies before a game is left unfinished')
+    parser.add_argument('--random-plies', type=int, default=RANDOM_PLIES,
+                        help='opening plies the engine policy plays at random')
+    parser.add_argument('--samples', action='store_true', help='also write .npy training samples (needs NumPy)')
+    parser.add_argument('--games-per-shard', type=int, default=GAMES_PER_SHARD)
+    parser.add_argument('--positions-per-shard', type=int, default=POSITIONS_PER_SHARD)
+    parser.add_argument('--compress', action='store_true', help='gzip the game record shards')
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--blue-selective', nargs='*', choices=SELECTIVE, default=[],
+                        help='selective search of the Blue engine')
+    parser.add_argument('--red-selective', nargs='*', choices=SELECTIVE, default=[],
+                        help='selective search of the Red engine')
+    args = parser.parse_args(argv)
+
+    summary = run_self_play(args.directory, args.games, args.workers, args.policy, args.depth, args.max_plies,
+                            args.random_plies, args.samples, args.games_per_shard, args.positions_per_shard,
+                            args.compress, args.seed, blue_selective=args.blue_selective,
+                            red_selective=args.red_selective)
+    print(format_report(summary))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,96 @@
+import json
+import sys
+
+
+class NullSink:
+    """
+    Receives the events of a JanggiGame and ignores them. This is also the base class of the other sinks, which
+    override the events they report. A game given a NullSink stores no sink at all, so make_move() does not even call
+    it
+    """
+
+    def move(self, game, source, destination):
+        """Called after a move is made. The game already shows the new position, turn, check and game state"""
+
+    def pass_turn(self, game):
+        """Called after the player whose turn it was passed"""
+
+    def error(self, game, message):
+        """Called when make_move() rejects a move with a message for the player"""
+
+
+class TextSink(NullSink):
+    """Prints the board after every move and the messages for the player, as the game always did"""
+
+    def __init__(self, stream=None):
+        """Writes to the given text stream, or to whatever sys.stdout is at the time of each event"""
+        self._stream = stream
+
+    def _write(self, text):
+        (self._stream or sys.stdout).write(text)
+
+    def move(self, game, source, destination):
+        self._write(game.format_board())
+
+    def pass_turn(self, game):
+        self._write("\nTurn Passed\n\n" + game.get_turn() + "'s turn\n\n")
+
+    def error(self, game, message):
+        self._write(message + "\n")
+
+
+class JsonLinesSink(NullSink):
+    """Writes one JSON object per event, for tools that read games as they are played"""
+
+    def __init__(self, stream):
+        """Writes to the given text stream"""
+        self._stream = stream
+
+    def _write(self, event, game, **fields):
+        fields.update(event=event, game_id=game.get_game_id(), ply=len(game.get_moves()), turn=game.get_turn(),
+                      check=game.get_check_state(), state=game.get_game_state())
+        self._stream.write(json.dumps(fields, ensure_ascii=False) + "\n")
+
+    def move(self, game, source, destination):
+        self._write("move", game, source=source, destination=destination)
+
+    def pass_turn(self, game):
+        self._write("pass", game)
+
+    def error(self, game, message):
+        self._write("error", game, message=message)
+
+
+class DiffSink(NullSink):
+    """
+    Writes only what a move changed: the two squares involved, plus check and game state when they are set, e.g.
+    '12. c7-c6: c7 ---, c6 ♙ (Red in check)'
+    """
+
+    def __init__(self, stream=None):
+        """Writes to the given text stream, or to whatever sys.stdout is at the time of each event"""
+        self._stream = stream
+
+    def _write(self, text):
+        (self._stream or sys.stdout).write(text)
+
+    @staticmethod
+    def _status(game):
+        status = ''
+        if game.get_check_state():
+            status += f' ({game.get_check_state()} in check)'
+        if game.get_game_state() != "UNFINISHED":
+            status += ' ' + game.get_game_state()
+        return status
+
+    def move(self, game, source, destination):
+        column, row = game.get_coordinates(destination)
+        symbol = game.get_piece_by_coordinate(column, row).get_symbol()
+        self._write(f'{len(game.get_moves())}. {source}-{destination}: {source} ---, {destination} {symbol}'
+                    f'{self._status(game)}\n')
+
+    def pass_turn(self, game):
+        self._write(f'{len(game.get_moves())}. pass{self._status(game)}\n')
+
+    def error(self, game, message):
+        self._write(message + "\n")
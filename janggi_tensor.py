@@ -0,0 +1,88 @@
+import numpy as np
+from janggi_game import ALGEBRAIC_SQUARES, SQUARE_COORDINATES
+from janggi_zobrist import PIECE_TYPES, COLORS
+
+# Positions are encoded as float planes of shape (PLANES, 10, 9), indexed [plane, row, column]:
+#
+#   planes 0 - 13   one per piece type and color, in the order of janggi_zobrist.PIECE_TYPES with Blue before Red
+#   plane 14        side to move, all ones when Red is to move
+#   plane 15        check, all ones when the side to move is in check
+#
+# Moves are encoded as from-square * 90 + to-square with squares counted along the rows from a1 (row * 9 + column),
+# and passing the turn as PASS_INDEX.
+#
+# Training samples pair the planes of a position (as int8) with the move played from it and the final result of the
+# game for the side to move: 1 for a win, -1 for a loss and 0 for an unfinished game.
+
+PIECE_CODES = {(piece_type, color): 1 + 2 * type_index + color_index
+               for type_index, piece_type in enumerate(PIECE_TYPES) for color_index, color in enumerate(COLORS)}
+PIECE_PLANES = len(PIECE_CODES)
+TURN_PLANE = PIECE_PLANES
+CHECK_PLANE = PIECE_PLANES + 1
+PLANES = PIECE_PLANES + 2
+
+PASS_INDEX = 90 * 90
+MOVE_INDICES = PASS_INDEX + 1
+
+SAMPLE_DTYPE = np.dtype([('planes', np.int8, (PLANES, 10, 9)), ('move', np.int16), ('value', np.int8)])
+
+SQUARE_INDICES = {square: row * 9 + column for square, (column, row) in SQUARE_COORDINATES.items()}
+SQUARE_NAMES = [ALGEBRAIC_SQUARES[index % 9, index // 9] for index in range(90)]
+
+# piece code of each plane, shaped to broadcast against a (N, 1, 10, 9) stack of boards
+_PLANE_CODES = np.arange(1, PIECE_PLANES + 1, dtype=np.int8).reshape(1, PIECE_PLANES, 1, 1)
+
+
+def encode_boards(games):
+    """
+    Returns an int8 array of shape (N, 10, 9) holding the piece code (see PIECE_CODES) on every square of each game,
+    0 for empty squares. Only the pieces are visited in Python; the array is filled by one scatter
+    """
+    game_indices = []
+    squares = []
+    codes = []
+    for game_index, game in enumerate(games):
+        for (column, row), piece in game.get_board().items():
+            if piece is not None:
+                game_indices.append(game_index)
+                squares.append(row * 9 + column)
+                codes.append(1 + 2 * piece.get_type_code() + piece.get_color_code())
+
+    boards = np.zeros((len(games), 90), dtype=np.int8)
+    boards[game_indices, squares] = codes
+    return boards.reshape(len(games), 10, 9)
+
+
+def encode_positions(games, dtype=np.float32):
+    """Returns the planes of every game as an array of shape (N, PLANES, 10, 9)"""
+    games = list(games)
+    boards = encode_boards(games)
+    red_to_move = np.fromiter((game.get_turn() == "Red" for game in games), dtype=bool, count=len(games))
+    in_check = np.fromiter((game.is_in_check(game.get_turn()) for game in games), dtype=bool, count=len(games))
+
+    planes = np.empty((len(games), PLANES, 10, 9), dtype=dtype)
+    planes[:, :PIECE_PLANES] = boards[:, np.newaxis] == _PLANE_CODES
+    planes[:, TURN_PLANE] = red_to_move[:, np.newaxis, np.newaxis]
+    planes[:, CHECK_PLANE] = in_check[:, np.newaxis, np.newaxis]
+    return planes
+
+
+def encode_moves(moves):
+    """
+    Returns the move indices of (source, destination) pairs in algebraic notation as an int16 array. A move from a
+    square to itself passes the turn and is encoded as PASS_INDEX
+    """
+    sources = np.fromiter((SQUARE_INDICES.get(source, -1) for source, _ in moves), dtype=np.int16)
+    destinations = np.fromiter((SQUARE_INDICES.get(destination, -1) for _, destination in moves), dtype=np.int16)
+    passes = np.fromiter((source == destination for source, destination in moves), dtype=bool, count=len(sources))
+    if ((sources < 0) | (destinations < 0))[~passes].any():
+        raise ValueError('moves must be between squares on the board')
+    return np.where(passes, PASS_INDEX, sources * 90 + destinations).astype(np.int16)
+
+
+def decode_moves(indices):
+    """Inverse of encode_moves(). Passes decode to ('pass', 'pass')"""
+    indices = np.asarray(indices)
+    sources, destinations = np.divmod(indices, 90)
+    return [('pass', 'pass') if index == PASS_INDEX else (SQUARE_NAMES[source], SQUARE_NAMES[destination])
+            for index, source, destination in zip(indices.tolist(), sources.tolist(), destinations.tolist())]
@@ -0,0 +1,47 @@
+import random
+from janggi_pieces import General, Guard, Horse, Elephant, Chariot, Cannon, Soldier
+
+# The keys are drawn from a fixed seed so position hashes stay the same across runs, which on-disk databases rely on.
+# Do not change the seed or the order of PIECE_TYPES and COLORS.
+ZOBRIST_SEED = 0x4A414E474749
+PIECE_TYPES = (General, Guard, Horse, Elephant, Chariot, Cannon, Soldier)
+COLORS = ("Blue", "Red")
+
+
+def _make_keys():
+    """Returns the per (piece type, color) lists of 90 square keys and the key for Red to move"""
+    rng = random.Random(ZOBRIST_SEED)
+    keys = {}
+    for piece_type in PIECE_TYPES:
+        for color in COLORS:
+            keys[piece_type, color] = [rng.getrandbits(64) for _ in range(90)]
+    return keys, rng.getrandbits(64)
+
+
+PIECE_KEYS, RED_TO_MOVE_KEY = _make_keys()
+
+# the same key lists indexed by 2 * piece type code + color code, so hashing needs no string or class lookups
+CODE_KEYS = [PIECE_KEYS[piece_type, color] for piece_type in PIECE_TYPES for color in COLORS]
+
+
+def square_index(column, row):
+    """Returns the 0 - 89 index of a square, counting along the rows from a1"""
+    return row * 9 + column
+
+
+def board_hash(board, turn):
+    """Returns the Zobrist hash of a board dictionary with the given color ('Blue' or 'Red') to move"""
+    position = RED_TO_MOVE_KEY if turn == "Red" else 0
+    for (column, row), piece in board.items():
+        if piece is not None:
+            position ^= CODE_KEYS[2 * piece.get_type_code() + piece.get_color_code()][row * 9 + column]
+    return position
+
+
+def position_hash(game):
+    """
+    Returns the 64-bit Zobrist hash of the position of a JanggiGame: the XOR of the key of every piece on its square,
+    plus the side to move. Equal positions have equal hashes no matter which moves led to them. A JanggiGame also keeps
+    this hash up to date as it plays (see JanggiGame.get_position_hash()); this function computes it from scratch
+    """
+    return board_hash(game.get_board(), game.get_turn())
@@ -1698,3 +1698,985 @@ class TestJanggiGame(unittest.TestCase):
         except:
             self.fail("Game state should be RED_WON when the BLUE general is checkmated")
 
+
+
+class TestLegalMoveGeneration(unittest.TestCase):
+    def test_opening_moves_are_all_playable(self):
+        """RULES: every move listed at the start of the game is accepted by make_move"""
+        g = JanggiGame()
+        moves = g.generate_legal_moves()
+        self.assertIn(('c7', 'c6'), moves)
+        self.assertNotIn(('c7', 'c8'), moves)  # soldiers cannot move backward
+        for source, destination in moves:
+            self.assertIs(JanggiGame().make_move(source, destination), True)
+
+    def test_algebraic_round_trip(self):
+        """RULES: get_algebraic is the inverse of get_coordinates"""
+        for column in range(9):
+            for row in range(10):
+                algebraic = JanggiGame.get_algebraic(column, row)
+                self.assertEqual(list(JanggiGame.get_coordinates(algebraic)), [column, row])
+
+
+class TestLoadGenerator(unittest.TestCase):
+    def test_percentile(self):
+        """LOAD: nearest-rank percentiles"""
+        from janggi_load_generator import percentile
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 99), 99)
+        self.assertEqual(percentile([], 50), 0.0)
+
+    def test_clients_play_against_server_over_loopback(self):
+        """LOAD: simulated clients play random games against the auto replying server without errors"""
+        import threading
+        from janggi_engine_server import create_server_socket, serve, random_move
+        from janggi_load_generator import run_load_test
+        server_socket = create_server_socket('localhost', 0)
+        port = server_socket.getsockname()[1]
+        threading.Thread(target=serve, args=(server_socket, random_move, None, True), daemon=True).start()
+
+        summary = run_load_test('localhost', port, clients=3, rate=0, duration=1.0, seed=7)
+        self.assertGreater(summary['moves'], 0)
+        self.assertEqual(summary['errors'], {})
+
+
+class TestGameRecords(unittest.TestCase):
+    def test_write_then_read_round_trip(self):
+        """RECORDS: records written to a stream are read back unchanged"""
+        import io
+        from janggi_records import GameRecord, read_records, write_records
+        records = [
+            GameRecord({"Blue": "Kim", "Red": "Lee"}, [('c7', 'c6'), ('a4', 'a4')] * 30, "RED_WON"),
+            GameRecord({"Event": 'The "Open"'}, [], "UNFINISHED"),
+        ]
+        stream = io.StringIO()
+        self.assertEqual(write_records(stream, iter(records)), 2)
+        stream.seek(0)
+        read_back = list(read_records(stream))
+        for record in records:
+            record.get_headers()["Result"] = {"RED_WON": "0-1", "UNFINISHED": "*"}[record.get_result()]
+        self.assertEqual(read_back, records)
+
+    def test_read_uses_result_header_and_accepts_upper_case(self):
+        """RECORDS: move text without a result token falls back to the Result header"""
+        from janggi_records import read_records
+        lines = ['[Result "1-0"]', '', '1. C7-C6 c4-c5', '[Result "*"]', '1. a7-b7']
+        first, second = read_records(lines)
+        self.assertEqual(first.get_moves(), [('c7', 'c6'), ('c4', 'c5')])
+        self.assertEqual(first.get_result(), "BLUE_WON")
+        self.assertEqual(second.get_result(), "UNFINISHED")
+
+    def test_malformed_move_is_reported_with_line_number(self):
+        """RECORDS: a token that is not a move raises RecordError"""
+        from janggi_records import read_records, RecordError
+        with self.assertRaisesRegex(RecordError, 'line 2'):
+            list(read_records(['[Result "*"]', '1. c7-c11 *']))
+
+
+class TestBulkReplay(unittest.TestCase):
+    def test_replay_flags_illegal_moves_and_mismatched_results(self):
+        """REPLAY: legal records pass, illegal moves and wrong results are flagged"""
+        from janggi_records import GameRecord
+        from janggi_replay import replay_record
+        moves = [('c7', 'c6'), ('c4', 'c5'), ('c6', 'c7')]
+        self.assertIsNone(replay_record(GameRecord({}, moves[:2], "UNFINISHED")))
+        self.assertRegex(replay_record(GameRecord({}, moves, "UNFINISHED")), 'ply 3: illegal move c6-c7')
+        self.assertRegex(replay_record(GameRecord({}, moves[:2], "RED_WON")), 'result mismatch')
+
+    def test_replay_archive_in_process(self):
+        """REPLAY: archives are streamed and every game is reported"""
+        import os
+        import tempfile
+        from janggi_records import GameRecord, open_archive, write_records
+        from janggi_replay import replay_archives
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'games.txt.gz')
+            with open_archive(path, 'w') as stream:
+                write_records(stream, [GameRecord({}, [('c7', 'c6')]), GameRecord({}, [('c7', 'c8')])])
+            results = sorted(replay_archives([path], workers=1))
+        self.assertEqual(results[0], (1, None))
+        self.assertEqual(results[1][0], 2)
+        self.assertIsNotNone(results[1][1])
+
+    def test_replay_archive_reads_ahead_boundedly(self):
+        """REPLAY: a pool is only handed a bounded number of records ahead of the results it has returned"""
+        from unittest import mock
+        import janggi_replay
+        from janggi_records import GameRecord
+        read = []
+
+        def records(path):
+            for number in range(1, 201):
+                read.append(number)
+                yield GameRecord({}, [('c7', 'c6')])
+
+        with mock.patch.object(janggi_replay, 'iter_archive', records):
+            results = janggi_replay.replay_archives(['games.txt'], workers=2, chunksize=3)
+            self.assertEqual(next(results), (1, None))
+            self.assertLessEqual(len(read), (janggi_replay.PENDING_CHUNKS * 2 + 1) * 3)
+            self.assertEqual(sorted(number for number, _ in results), list(range(2, 201)))
+
+
+class TestGameJournal(unittest.TestCase):
+    def setUp(self):
+        import tempfile
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = self.directory.name + '/games.journal'
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_games_are_restored_from_their_own_records(self):
+        """JOURNAL: interleaved games are restored after reopening the journal"""
+        from janggi_journal import GameJournal, restore_game
+        with GameJournal(self.path, sync='always', batch_size=2) as journal:
+            first, second = journal.new_game_id(), journal.new_game_id()
+            journal.append(first, 'c7', 'c6')
+            journal.append(second, 'a7', 'b7')
+            journal.append(first, 'c4', 'c5')
+            journal.append(second, 'a4', 'a4')
+
+        with GameJournal(self.path) as journal:
+            self.assertEqual(journal.game_ids(), [first, second])
+            self.assertEqual(journal.read_game(first), [(1, 'c7', 'c6'), (3, 'c4', 'c5')])
+            game = restore_game(journal, second)
+            self.assertEqual(game.get_moves(), [('a7', 'b7'), ('a4', 'a4')])
+            self.assertEqual(game.get_turn(), "Blue")
+            self.assertEqual(journal.append(first, 'e7', 'e6'), 5)
+
+    def test_torn_tail_and_stale_index_are_recovered(self):
+        """JOURNAL: a partial last record is dropped and the index is rebuilt"""
+        from janggi_journal import GameJournal
+        with GameJournal(self.path, sync='never') as journal:
+            game_id = journal.new_game_id()
+            journal.append(game_id, 'c7', 'c6')
+            journal.append(game_id, 'c4', 'c5')
+        with open(self.path, 'ab') as stream:
+            stream.write(b'\x01\x02\x03')
+        with open(self.path + '.idx', 'r+b') as stream:
+            stream.write(bytes(8))
+
+        with GameJournal(self.path) as journal:
+            self.assertEqual([move[1:] for move in journal.read_game(game_id)], [('c7', 'c6'), ('c4', 'c5')])
+
+    def test_server_journals_client_and_computer_moves(self):
+        """JOURNAL: the server keeps an authoritative copy of each game and journals both sides' moves"""
+        import pickle
+        from janggi_engine_server import journal_reply, restore_games
+        from janggi_journal import GameJournal
+        with GameJournal(self.path) as journal:
+            games = {}
+            client_game = JanggiGame(sink=None)
+            client_game.make_move('c7', 'c6')
+            # games travel pickled, so the client never holds the server's copy
+            reply = pickle.loads(pickle.dumps(journal_reply(client_game, games, journal, lambda game: ('c4', 'c5'))))
+            self.assertEqual(reply.get_moves(), [('c7', 'c6'), ('c4', 'c5')])
+            reply.set_sink(None)
+            reply.make_move('a7', 'b7')
+            journal_reply(reply, games, journal, lambda game: None)
+
+        with GameJournal(self.path) as journal:
+            restored = restore_games(journal)
+            self.assertEqual(list(restored), [reply.get_game_id()])
+            self.assertEqual(restored[reply.get_game_id()].get_moves(), reply.get_moves())
+
+    def test_finished_games_are_not_restored(self):
+        """JOURNAL: games the server saw end are marked finished and skipped on restore, rebuilt index included"""
+        from unittest import mock
+        import janggi_engine_server
+        from janggi_engine_server import journal_reply, restore_games
+        from janggi_journal import GameJournal
+        with GameJournal(self.path) as journal:
+            games = {}
+            won = JanggiGame(sink=None)
+            for source, destination in RED_WON_MOVES[:-1]:
+                won.make_move(source, destination)
+            won_id = journal_reply(won, games, journal, lambda game: RED_WON_MOVES[-1]).get_game_id()
+            open_id = journal_reply(JanggiGame(sink=None), games, journal, lambda game: ('c7', 'c6')).get_game_id()
+            self.assertEqual(list(games), [open_id])
+            self.assertTrue(journal.is_finished(won_id))
+            self.assertEqual(journal.read_game(won_id)[-1][1:], RED_WON_MOVES[-1])
+
+        with open(self.path + '.idx', 'r+b') as stream:
+            stream.write(bytes(8))  # stale index, rebuilt from the journal
+        for _ in range(2):
+            with GameJournal(self.path) as journal:
+                self.assertEqual(journal.unfinished_game_ids(), [open_id])
+                with mock.patch.object(janggi_engine_server, 'restore_game',
+                                       wraps=janggi_engine_server.restore_game) as restore:
+                    self.assertEqual(list(restore_games(journal)), [open_id])
+                self.assertEqual(restore.call_count, 1)
+
+
+class TestPositionDatabase(unittest.TestCase):
+    def test_transpositions_share_a_hash(self):
+        """ZOBRIST: the same position reached by different move orders has the same hash"""
+        from janggi_zobrist import position_hash
+        first, second = JanggiGame(sink=None), JanggiGame(sink=None)
+        for source, destination in [('a7', 'a6'), ('a4', 'a5'), ('i7', 'i6')]:
+            first.make_move(source, destination)
+        for source, destination in [('i7', 'i6'), ('a4', 'a5'), ('a7', 'a6')]:
+            second.make_move(source, destination)
+        self.assertEqual(position_hash(first), position_hash(second))
+        second.make_move('a5', 'a5')  # same pieces, other side to move
+        self.assertNotEqual(position_hash(first), position_hash(second))
+
+    def test_build_and_query(self):
+        """ZOBRIST: aggregate statistics are looked up from the memory-mapped database"""
+        import os
+        import tempfile
+        from janggi_records import GameRecord
+        from janggi_position_db import PositionDatabaseBuilder, PositionDatabase
+        builder = PositionDatabaseBuilder(max_entries=3)  # forces sorted runs to be spilled and merged
+        builder.add_game(GameRecord({}, [('c7', 'c6'), ('c4', 'c5')], "BLUE_WON"))
+        builder.add_game(GameRecord({}, [('c7', 'c6'), ('a4', 'a5')], "RED_WON"))
+        builder.add_game(GameRecord({}, [('a7', 'b7')], "UNFINISHED"))
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'positions.db')
+            self.assertEqual(builder.write(path), 5)
+            builder.close()
+            with PositionDatabase(path) as database:
+                start = database.lookup_game(JanggiGame())
+                after_c6 = JanggiGame(sink=None)
+                after_c6.make_move('c7', 'c6')
+                reply = database.lookup_game(after_c6)
+                missing = database.lookup(12345)
+
+        self.assertEqual(start[:4], (3, 1, 1, 1))
+        self.assertEqual([(move.source, move.destination, move.count) for move in start.moves],
+                         [('c7', 'c6', 2), ('a7', 'b7', 1)])
+        self.assertEqual(sorted((move.source, move.blue_wins, move.red_wins) for move in reply.moves),
+                         [('a4', 0, 1), ('c4', 1, 0)])
+        self.assertIsNone(missing)
+
+
+class TestOutputSinks(unittest.TestCase):
+    def test_text_sink_prints_the_board_after_a_move(self):
+        """SINKS: the default sink prints what print_board prints"""
+        import io
+        from janggi_sinks import TextSink
+        stream = io.StringIO()
+        g = JanggiGame(TextSink(stream))
+        g.make_move('c7', 'c6')
+        self.assertEqual(stream.getvalue(), g.format_board())
+        g.make_move('a1', 'a1')
+        self.assertIn("Turn Passed", stream.getvalue())
+
+    def test_null_sink_is_not_stored(self):
+        """SINKS: a game given a NullSink has no sink to call"""
+        from janggi_sinks import NullSink
+        self.assertIsNone(JanggiGame(NullSink()).get_sink())
+
+    def test_json_lines_and_diff_sinks(self):
+        """SINKS: JSON-lines and diff sinks report moves, passes and errors"""
+        import io
+        import json
+        from janggi_sinks import DiffSink, JsonLinesSink
+        json_stream, diff_stream = io.StringIO(), io.StringIO()
+        for sink in (JsonLinesSink(json_stream), DiffSink(diff_stream)):
+            g = JanggiGame(sink)
+            g.make_move('c7', 'c6')
+            g.make_move('c4', 'c4')
+            g.make_move('c4', 'c5')  # red piece on blue's turn
+        events = [json.loads(line) for line in json_stream.getvalue().splitlines()]
+        self.assertEqual([event['event'] for event in events], ['move', 'pass', 'error'])
+        self.assertEqual((events[0]['source'], events[0]['destination'], events[0]['turn']), ('c7', 'c6', 'Red'))
+        self.assertEqual(diff_stream.getvalue().splitlines(),
+                         ['1. c7-c6: c7 ---, c6 ♙', '2. pass', 'Piece not your color. Try again'])
+
+    def test_pickled_games_leave_their_sink_behind(self):
+        """SINKS: sinks holding streams do not stop games from being sent over the network"""
+        import io
+        import pickle
+        from janggi_game import DEFAULT_SINK
+        from janggi_sinks import JsonLinesSink
+        g = pickle.loads(pickle.dumps(JanggiGame(JsonLinesSink(io.StringIO()))))
+        self.assertIs(g.get_sink(), DEFAULT_SINK)
+
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+@unittest.skipIf(numpy is None, 'numpy is not installed')
+class TestTensorEncoding(unittest.TestCase):
+    def test_position_planes(self):
+        """TENSOR: pieces, side to move and check are encoded as (N, planes, 10, 9)"""
+        from janggi_tensor import encode_positions, PIECE_CODES, PLANES, TURN_PLANE, CHECK_PLANE
+        from janggi_pieces import Soldier
+        start, moved = JanggiGame(sink=None), JanggiGame(sink=None)
+        moved.make_move('c7', 'c6')
+        planes = encode_positions([start, moved])
+        self.assertEqual(planes.shape, (2, PLANES, 10, 9))
+        self.assertEqual(planes[:, :TURN_PLANE].sum(), 64)
+        blue_soldiers = PIECE_CODES[Soldier, "Blue"] - 1
+        self.assertEqual(planes[0, blue_soldiers, 6, 2], 1)  # c7
+        self.assertEqual(planes[1, blue_soldiers, 6, 2], 0)
+        self.assertEqual(planes[1, blue_soldiers, 5, 2], 1)  # c6
+        self.assertEqual(planes[:, TURN_PLANE, 0, 0].tolist(), [0, 1])
+        self.assertEqual(planes[:, CHECK_PLANE].sum(), 0)
+
+    def test_move_indices_round_trip(self):
+        """TENSOR: move indices decode back to the moves, passes included"""
+        from janggi_tensor import encode_moves, decode_moves, PASS_INDEX
+        moves = [('a1', 'i10'), ('c7', 'c6'), ('e9', 'e9')]
+        indices = encode_moves(moves)
+        self.assertEqual(indices.tolist(), [89, 56 * 90 + 47, PASS_INDEX])
+        self.assertEqual(decode_moves(indices), [('a1', 'i10'), ('c7', 'c6'), ('pass', 'pass')])
+
+
+RED_WON_MOVES = [('c7', 'c6'), ('c1', 'd3'), ('b10', 'd7'), ('b3', 'e3'), ('c10', 'd8'), ('h1', 'g3'), ('e7', 'e6'),
+                 ('e3', 'e6'), ('h8', 'c8'), ('d3', 'e5'), ('c8', 'c4'), ('e5', 'c4'), ('i10', 'i8'), ('g4', 'f4'),
+                 ('i8', 'f8'), ('g3', 'h5'), ('h10', 'g8'), ('e6', 'e3'), ('e9', 'd9'), ('c4', 'e5'), ('c6', 'd6'),
+                 ('e5', 'c4'), ('a7', 'a6'), ('h3', 'h9'), ('a10', 'a7'), ('c4', 'd6'), ('a6', 'b6'), ('h5', 'g7'),
+                 ('b8', 'b1'), ('a1', 'b1'), ('a7', 'a4'), ('b1', 'c1'), ('a4', 'a2'), ('e2', 'e1'), ('i7', 'h7'),
+                 ('c1', 'c9')]
+
+
+def red_won_positions():
+    """Returns a copy of the game from test_red_won after every move, checks and the final checkmate included"""
+    import pickle
+    g = JanggiGame(sink=None)
+    positions = []
+    for source, destination in RED_WON_MOVES:
+        g.make_move(source, destination)
+        position = pickle.loads(pickle.dumps(g))
+        position.set_sink(None)
+        positions.append(position)
+    return positions
+
+
+@unittest.skipIf(numpy is None, 'numpy is not installed')
+class TestBatchRules(unittest.TestCase):
+    def setUp(self):
+        from janggi_tensor import encode_boards
+        self.games = red_won_positions()
+        self.boards = encode_boards(self.games)
+
+    def test_batch_check_check_matches_check_check(self):
+        """BATCH: the batched check test agrees with check_check on every position"""
+        from janggi_batch_rules import batch_check_check
+        for color in ("Blue", "Red"):
+            expected = [g.check_check(color) for g in self.games]
+            self.assertEqual(batch_check_check(self.boards, color).tolist(), expected)
+        self.assertTrue(batch_check_check(self.boards[-1:], "Blue")[0])
+
+    def test_batch_move_check_and_legality_match_the_game(self):
+        """BATCH: every piece to every square agrees with move_check and will_move_end_check"""
+        from janggi_batch_rules import batch_move_check, batch_is_legal
+        for g, board in list(zip(self.games, self.boards))[::6]:
+            moves, pseudo, legal = [], [], []
+            for (column, row), piece in list(g.get_board().items()):
+                if piece is not None:
+                    for x in range(9):
+                        for y in range(10):
+                            moves.append((column, row, x, y))
+                            pseudo.append(bool(g.move_check(column, row, x, y)))
+                            legal.append(g.will_move_end_check(g.get_placed_piece(column, row), x, y))
+            boards = numpy.repeat(board[numpy.newaxis], len(moves), axis=0)
+            self.assertEqual(batch_move_check(boards, moves).tolist(), pseudo)
+            self.assertEqual(batch_is_legal(boards, moves).tolist(), legal)
+
+
+class TestSelfPlay(unittest.TestCase):
+    def test_undo_move_restores_every_position(self):
+        """SEARCH: undo_move takes back moves, passes and the checkmate in reverse order"""
+        from janggi_zobrist import position_hash
+        g = JanggiGame(sink=None)
+        seen = []
+        for source, destination in RED_WON_MOVES[:4] + [('e9', 'e9'), ('e2', 'e2')] + RED_WON_MOVES[4:]:
+            seen.append((position_hash(g), g.get_turn(), g.get_check_state(), g.get_game_state()))
+            g.make_move(source, destination)
+        self.assertEqual(g.get_game_state(), 'RED_WON')
+        while seen:
+            self.assertIs(g.undo_move(), True)
+            self.assertEqual((position_hash(g), g.get_turn(), g.get_check_state(), g.get_game_state()), seen.pop())
+        self.assertIs(g.undo_move(), False)
+        self.assertEqual(g.get_moves(), [])
+
+    def test_search_finds_the_checkmate_and_leaves_the_game_alone(self):
+        """SEARCH: a one ply search finds a mate in one without changing the game it searched"""
+        from janggi_search import Searcher, MATE_SCORE
+        from janggi_zobrist import position_hash
+        g = JanggiGame(sink=None)
+        for source, destination in RED_WON_MOVES[:-1]:
+            g.make_move(source, destination)
+        before = position_hash(g)
+        move, score = Searcher(depth=1).search(g)
+        self.assertEqual(score, MATE_SCORE - 1)
+        self.assertEqual(position_hash(g), before)
+        g.make_move(*move)
+        self.assertEqual(g.get_game_state(), 'RED_WON')
+
+    def test_self_play_writes_replayable_shards(self):
+        """SELF-PLAY: games are sharded to record archives that replay cleanly, with a sample per position"""
+        import tempfile
+        from janggi_records import iter_archive
+        from janggi_replay import replay_record
+        from janggi_self_play import run_self_play
+        with tempfile.TemporaryDirectory() as directory:
+            summary = run_self_play(directory, games=3, workers=1, max_plies=12, samples=numpy is not None,
+                                    games_per_shard=2, positions_per_shard=20, seed=7)
+            records = [record for path in summary['record_paths'] for record in iter_archive(path)]
+            self.assertEqual(len(summary['record_paths']), 2)
+            self.assertEqual(sorted(record.get_headers()['Round'] for record in records), ['1', '2', '3'])
+            self.assertEqual([replay_record(record) for record in records], [None] * 3)
+            self.assertEqual(summary['positions'], sum(len(record.get_moves()) for record in records))
+            if numpy is not None:
+                samples = numpy.concatenate([numpy.load(path) for path in summary['sample_paths']])
+                self.assertEqual(len(samples), summary['positions'])
+                self.assertEqual(len(summary['sample_paths']), 2)
+
+
+class TestClone(unittest.TestCase):
+    def test_clone_is_independent_of_the_original(self):
+        """CLONE: moves and undos on a clone leave the original alone, and the other way around"""
+        from janggi_zobrist import position_hash
+        g = JanggiGame(sink=None)
+        for source, destination in RED_WON_MOVES[:8]:
+            g.make_move(source, destination)
+        before = position_hash(g)
+        c = g.clone()
+        self.assertEqual(position_hash(c), before)
+        self.assertEqual(c.get_moves(), g.get_moves())
+        self.assertEqual((c.get_turn(), c.get_check_state()), (g.get_turn(), g.get_check_state()))
+        self.assertIsNot(c.get_board(), g.get_board())
+
+        for source, destination in RED_WON_MOVES[8:]:
+            c.make_move(source, destination)
+        self.assertEqual(c.get_game_state(), 'RED_WON')
+        self.assertEqual(position_hash(g), before)
+        self.assertEqual(len(g.get_moves()), 8)
+
+        # the clone's undo history points at its own pieces, captures included
+        while c.undo_move():
+            pass
+        self.assertEqual(position_hash(c), position_hash(JanggiGame(sink=None)))
+        self.assertEqual(position_hash(g), before)
+        self.assertIs(g.make_move(*RED_WON_MOVES[8]), True)
+
+
+class TestPieceCodes(unittest.TestCase):
+    def test_pieces_are_slotted_and_coded(self):
+        """PIECES: pieces have no __dict__ and keep their getters on top of the integer codes"""
+        from janggi_pieces import Cannon, GamePiece, CANNON, RED, COLOR_NAMES
+        piece = Cannon("Red")
+        self.assertFalse(hasattr(piece, '__dict__'))
+        self.assertEqual((piece.get_color(), piece.get_color_code(), piece.get_type_code()), ("Red", RED, CANNON))
+        self.assertEqual(piece.get_symbol(), "♛")
+        self.assertEqual(Cannon(RED).get_color(), "Red")
+        self.assertEqual(COLOR_NAMES, ("Blue", "Red"))
+        with self.assertRaises(KeyError):
+            GamePiece("Green")
+
+    def test_position_hashes_are_unchanged(self):
+        """PIECES: hashes, which on-disk position databases rely on, do not depend on how pieces are stored"""
+        from janggi_zobrist import position_hash
+        self.assertEqual(position_hash(JanggiGame(sink=None)), 1919664635542249720)
+
+    def test_is_in_check_ignores_case(self):
+        """PIECES: is_in_check still accepts colors in any case"""
+        g = JanggiGame(sink=None)
+        self.assertIs(g.is_in_check("blue"), False)
+        g.set_check_state("Blue")
+        self.assertIs(g.is_in_check("BLUE"), True)
+        self.assertIs(g.is_in_check("Red"), False)
+
+    def test_pieces_are_shared_flyweights(self):
+        """PIECES: games share one piece per type and color, and only the board knows where pieces stand"""
+        import pickle
+        from janggi_pieces import get_piece, Cannon, PlacedPiece, CANNON, BLUE
+        g = JanggiGame(sink=None)
+        other = JanggiGame(sink=None)
+        self.assertIs(g.get_piece_by_coordinate(1, 7), get_piece(CANNON, BLUE))
+        self.assertIs(g.get_piece_by_coordinate(7, 7), other.get_piece_by_coordinate(1, 7))
+        self.assertIs(pickle.loads(pickle.dumps(g)).get_piece_by_coordinate(1, 7), get_piece(CANNON, "Blue"))
+
+        # the placed view keeps the accessors pieces had when they carried their own location
+        placed = g.get_placed_piece(2, 6)
+        self.assertEqual((placed.get_column(), placed.get_row(), placed.get_color()), (2, 6, "Blue"))
+        self.assertIs(placed.is_legal_move(2, 5), True)
+        self.assertIs(placed.is_legal_move(2, 7), False)
+        self.assertIsNone(g.get_placed_piece(4, 4))
+        self.assertIs(PlacedPiece(Cannon("Red"), 4, 2).is_legal_move(4, 9), True)
+        g.make_move('c7', 'c6')
+        self.assertEqual((placed.get_column(), placed.get_row()), (2, 6))
+        self.assertIsNone(g.get_placed_piece(2, 6))
+
+
+def board_with(*placements):
+    """Returns a game whose board holds only the given (type code, color, column, row) pieces"""
+    from janggi_pieces import get_piece
+    g = JanggiGame(sink=None)
+    for column, row in list(g.get_board()):
+        g.set_piece_by_coordinate(column, row, None)
+    for type_code, color, column, row in placements:
+        g.set_piece_by_coordinate(column, row, get_piece(type_code, color))
+    return g
+
+
+def brute_force_legal_moves(g):
+    """Every legal move of the side to move found by probing all 90 squares for every piece, as the rules first did"""
+    moves = []
+    for column, row in sorted(g.get_board()):
+        piece = g.get_piece_by_coordinate(column, row)
+        if piece is not None and piece.get_color() == g.get_turn():
+            for x in range(9):
+                for y in range(10):
+                    if g.will_move_from_end_check(column, row, x, y):
+                        moves.append((g.get_algebraic(column, row), g.get_algebraic(x, y)))
+    return moves
+
+
+class TestTargetTables(unittest.TestCase):
+    def test_tables_match_the_move_sets(self):
+        """TARGETS: each piece's table lists exactly the squares its move-set allows, with horse and elephant legs"""
+        from janggi_pieces import PIECES, get_piece, HORSE, ELEPHANT, RED
+        for piece in (piece for colors in PIECES for piece in colors):
+            for column in range(9):
+                for row in range(10):
+                    expected = [(x, y) for x in range(9) for y in range(10)
+                                if piece.is_legal_move_from(column, row, x, y)]
+                    self.assertEqual([(x, y) for x, y, _ in piece.targets_from(column, row)], expected)
+        self.assertIn((3, 3, ((2, 2),)), get_piece(HORSE, RED).targets_from(1, 2))
+        self.assertIn((3, 6, ((1, 8), (2, 7))), get_piece(ELEPHANT, RED).targets_from(1, 9))
+
+    def test_generated_moves_match_probing_every_square(self):
+        """TARGETS: generate_legal_moves agrees with probing every square on every position of a game"""
+        for g in red_won_positions()[:-1]:
+            self.assertEqual(g.generate_legal_moves(), brute_force_legal_moves(g))
+
+
+class TestPalaceGeometry(unittest.TestCase):
+    def test_palace_lines(self):
+        """PALACE: the center joins all eight points, corners join their neighbours and the opposite corner"""
+        from janggi_pieces import PALACE_EDGES, PALACE_DIAGONALS, PALACE_CENTERS, FORTRESS_SQUARES, BLUE, RED
+        self.assertEqual(len(FORTRESS_SQUARES), 18)
+        self.assertEqual(PALACE_CENTERS[BLUE], (4, 8))
+        self.assertEqual(PALACE_CENTERS[RED], (4, 1))
+        self.assertEqual(PALACE_EDGES[4, 8], {(x, y) for x in range(3, 6) for y in range(7, 10)} - {(4, 8)})
+        self.assertEqual(PALACE_EDGES[3, 9], {(4, 9), (3, 8), (4, 8)})
+        self.assertEqual(PALACE_EDGES[4, 0], {(3, 0), (5, 0), (4, 1)})
+        self.assertEqual(PALACE_DIAGONALS[5, 2], {(3, 0): (4, 1)})
+        self.assertNotIn((4, 0), PALACE_DIAGONALS)
+
+    def test_palace_moves(self):
+        """PALACE: generals and guards keep to their palace lines, soldiers use the enemy palace's center"""
+        from janggi_pieces import get_piece, GENERAL, GUARD, SOLDIER, CHARIOT, BLUE, RED
+        for type_code in (GENERAL, GUARD):
+            piece = get_piece(type_code, BLUE)
+            self.assertEqual([(x, y) for x, y, _ in piece.targets_from(3, 9)], [(3, 8), (4, 8), (4, 9)])
+            self.assertEqual(len(piece.targets_from(4, 8)), 8)
+            self.assertIs(get_piece(type_code, RED).is_legal_move_from(3, 2, 3, 3), False)
+        blue_soldier = get_piece(SOLDIER, BLUE)
+        self.assertIs(blue_soldier.is_legal_move_from(3, 2, 4, 1), True)
+        self.assertIs(blue_soldier.is_legal_move_from(4, 1, 5, 2), True)
+        self.assertIs(blue_soldier.is_legal_move_from(3, 2, 3, 1), True)
+        self.assertIs(blue_soldier.is_legal_move_from(3, 1, 3, 2), False)
+        self.assertIs(blue_soldier.is_legal_move_from(3, 8, 4, 8), True)  # sideways only, not a palace move
+        self.assertIs(blue_soldier.is_legal_move_from(3, 7, 4, 8), False)
+        # the chariot's corner to corner diagonal toward the upper left is refused with None, as it always was
+        self.assertIs(get_piece(CHARIOT, RED).is_legal_move_from(5, 2, 3, 0), None)
+        self.assertIs(get_piece(CHARIOT, RED).is_legal_move_from(3, 0, 5, 2), True)
+
+
+class TestSlidingTables(unittest.TestCase):
+    def test_line_tables(self):
+        """SLIDING: chariots stop at the first piece, cannons land beyond exactly one screen"""
+        from janggi_pieces import RANK_SLIDES, RANK_JUMPS, FILE_JUMPS, BETWEEN_MASKS
+        occupied = 0b000100101  # pieces on points 0, 2 and 5 of a rank
+        self.assertEqual(RANK_SLIDES[3][occupied], 0b000110100)
+        self.assertEqual(RANK_JUMPS[3][occupied], 0b111000011)
+        self.assertEqual(FILE_JUMPS[0][0], 0)
+        self.assertEqual(BETWEEN_MASKS[7][3], 0b1110000)
+        self.assertEqual(BETWEEN_MASKS[4][4], 0)
+
+    def test_masks_follow_moves_undos_and_clones(self):
+        """SLIDING: the occupancy masks describe the board after every move and undo, clones included"""
+        from janggi_game import _board_masks
+        for g in red_won_positions()[::5] + [red_won_positions()[-1].clone()]:
+            while True:
+                rank_masks, file_masks, _, _ = _board_masks(g.get_board())
+                for column in range(9):
+                    for row in range(10):
+                        self.assertEqual(g.get_occupancy_masks(column, row), (rank_masks[row], file_masks[column]))
+                if not g.undo_move():
+                    break
+
+
+class TestAttackers(unittest.TestCase):
+    def test_attackers_of(self):
+        """ATTACKERS: the pieces that can move to a square, found from the square itself"""
+        from janggi_pieces import GENERAL, GUARD, RED, PlacedPiece
+        g = JanggiGame(sink=None)
+        attackers = g.attackers_of((3, 1), 'Red')
+        self.assertEqual(sorted((piece.get_column(), piece.get_row(), piece.get_type_code()) for piece in attackers),
+                         [(3, 0, GUARD), (4, 1, GENERAL)])
+        self.assertIsInstance(attackers[0], PlacedPiece)
+        self.assertEqual(g.attackers_of((4, 1), RED), [])  # Red's own general
+        self.assertEqual(sorted((piece.get_column(), piece.get_row()) for piece in g.attackers_of((0, 4), 'Red')),
+                         [(0, 3)])  # the chariot behind the soldier is blocked by it
+
+    def test_constructed_pieces(self):
+        """ATTACKERS: pieces constructed directly instead of taken from get_piece() check and pin like shared ones"""
+        from janggi_pieces import GENERAL, HORSE, Chariot
+        g = board_with((GENERAL, 'Red', 4, 1), (GENERAL, 'Blue', 4, 8))
+        g.set_piece_by_coordinate(4, 5, Chariot('Blue'))
+        self.assertTrue(g.move_check(4, 5, 4, 1))
+        self.assertTrue(g.check_check('Red'))
+        self.assertEqual([(piece.get_column(), piece.get_row()) for piece in g.attackers_of((4, 1), 'Blue')], [(4, 5)])
+
+        g = board_with((GENERAL, 'Red', 3, 0), (GENERAL, 'Blue', 4, 8), (HORSE, 'Blue', 4, 6))
+        g.set_piece_by_coordinate(4, 3, Chariot('Red'))
+        self.assertEqual(sorted(g.generate_legal_moves()), sorted(brute_force_legal_moves(g)))
+        self.assertNotIn('e7', [source for source, _ in g.generate_legal_moves()])  # the horse is pinned
+
+    def test_attackers_match_move_check(self):
+        """ATTACKERS: the reverse lookup finds exactly the pieces move_check() lets onto each square"""
+        from janggi_game import ALGEBRAIC_SQUARES
+        from janggi_pieces import BLUE, RED
+        for g in red_won_positions():
+            for (x, y) in ALGEBRAIC_SQUARES:
+                for color in (BLUE, RED):
+                    expected = sorted((column, row) for (column, row), piece in g.get_board().items()
+                                      if piece is not None and piece.get_color_code() == color and
+                                      g.move_check(column, row, x, y))
+                    self.assertEqual(sorted(g.generate_attackers(x, y, color)), expected)
+
+    def test_evasions(self):
+        """ATTACKERS: a side in check only gets the evasions, which are all of its legal moves"""
+        from janggi_pieces import BLUE, RED
+        checked = 0
+        for g in red_won_positions()[:-1]:
+            if g.get_check_state() == g.get_turn():
+                checked += 1
+                general = g.get_general_coords(g.get_turn())
+                checkers = list(g.generate_attackers(general[0], general[1], RED if g.get_turn() == "Blue" else BLUE))
+                evasions = [(g.get_algebraic(column, row), g.get_algebraic(x, y))
+                            for column, row, x, y in g.generate_evasions(general[0], general[1], checkers)]
+                self.assertEqual(evasions, brute_force_legal_moves(g))
+                self.assertEqual(g.generate_legal_moves(), evasions)
+        self.assertEqual(checked, 2)
+        self.assertTrue(red_won_positions()[-1].checkmate_check("Blue"))
+
+    def test_pins(self):
+        """ATTACKERS: pinned pieces and Cannon lines are found, and only their moves need a trial"""
+        from janggi_pieces import GENERAL, GUARD, HORSE, CHARIOT, CANNON
+        g = board_with((GENERAL, 'Red', 4, 1), (HORSE, 'Red', 4, 3), (GUARD, 'Red', 5, 0), (GENERAL, 'Blue', 4, 8),
+                       (CHARIOT, 'Blue', 4, 6), (CANNON, 'Blue', 8, 1))
+
+        self.assertEqual(g.find_pins(4, 1), ({(4, 3)}, {(5, 1), (6, 1), (7, 1)}))
+        moves = list(g.generate_moves('Red'))
+        self.assertNotIn((5, 0, 5, 1), moves)  # the guard would screen the cannon
+        self.assertFalse([move for move in moves if move[:2] == (4, 3)])  # the horse is pinned by the chariot
+        self.assertEqual(moves, [(column, row, x, y) for column, row in ((4, 1), (5, 0))
+                                 for x, y in g.generate_targets(column, row)
+                                 if g.move_leaves_general_safe(column, row, x, y)])
+
+    def test_attack_maps(self):
+        """ATTACKERS: attack maps kept through moves, undos and clones count what generate_attackers() finds"""
+        from janggi_pieces import BLUE, RED
+        g = JanggiGame(sink=None)
+        g.set_attack_maps(True)
+        self.assertEqual(g.get_attack_maps().get_mobility(BLUE), g.get_attack_maps().get_mobility(RED))
+        for source, destination in RED_WON_MOVES[:20]:
+            g.make_move(source, destination)
+        g.undo_move()
+        for game in (g, g.clone()):
+            game.generate_legal_moves()
+            for column in range(9):
+                for row in range(10):
+                    for color in (BLUE, RED):
+                        self.assertEqual(game.get_attack_count(column, row, color),
+                                         len(list(game.generate_attackers(column, row, color))))
+                    if game.get_piece_by_coordinate(column, row) is not None:
+                        self.assertEqual(sorted(game.get_attack_maps().get_targets(column, row)),
+                                         sorted(game.generate_targets(column, row)))
+            self.assertEqual(game.get_attack_maps().get_mobility(RED),
+                             sum(len(list(game.generate_targets(column, row)))
+                                 for (column, row), piece in game.get_board().items()
+                                 if piece is not None and piece.get_color_code() == RED))
+        plain = g.clone()
+        plain.set_attack_maps(False)
+        for color in ("Blue", "Red"):
+            self.assertEqual(g.check_check(color), plain.check_check(color))
+
+
+class TestPositionCache(unittest.TestCase):
+    def test_position_hash_is_kept(self):
+        """CACHE: the hash a game keeps matches the hash computed from scratch through moves, passes and undos"""
+        from janggi_zobrist import position_hash
+        g = JanggiGame(sink=None)
+        for source, destination in RED_WON_MOVES[:12] + [('e9', 'e9')]:
+            g.make_move(source, destination)
+            self.assertEqual(g.get_position_hash(), position_hash(g))
+        while g.undo_move():
+            self.assertEqual(g.get_position_hash(), position_hash(g))
+        self.assertEqual(g.get_position_hash(), 1919664635542249720)
+
+    def test_results_are_cached_by_position(self):
+        """CACHE: results are reused for the same position only, with hit, miss and eviction counts"""
+        from janggi_cache import PositionCache
+        cache = PositionCache(2)
+        g = JanggiGame(sink=None)
+        g.set_cache(cache)
+        moves = g.generate_legal_moves()
+        moves.clear()  # callers get their own list
+        self.assertEqual(g.generate_legal_moves(), JanggiGame(sink=None).generate_legal_moves())
+        self.assertEqual((cache.get_stats()['hits'], cache.get_stats()['misses']), (1, 1))
+
+        g.make_move('a7', 'b7')
+        self.assertEqual(g.generate_legal_moves(), JanggiGame.generate_legal_moves(g.clone()))
+        self.assertFalse(g.check_check('Red'))
+        g.undo_move()
+        self.assertEqual(g.generate_legal_moves(), JanggiGame(sink=None).generate_legal_moves())
+        stats = cache.get_stats()
+        self.assertEqual((stats['entries'], stats['evictions']), (2, 3))  # the opening moves were evicted and found again
+
+        other = JanggiGame(sink=None)
+        other.set_cache(cache)
+        other.generate_legal_moves()
+        self.assertEqual(cache.get_stats()['hits'], stats['hits'] + 1)
+
+    def test_general_squares_are_kept(self):
+        """CACHE: the General squares check_check() reads are kept through moves, undos, clones and edits"""
+        from janggi_pieces import GENERAL
+
+        def scan(g, color):
+            return next(([column, row] for (column, row), piece in g.get_board().items()
+                         if piece is not None and piece.get_type_code() == GENERAL and piece.get_color() == color),
+                        None)
+
+        g = JanggiGame(sink=None)
+        for source, destination in RED_WON_MOVES:
+            g.make_move(source, destination)
+            for color in ('Blue', 'Red'):
+                self.assertEqual(g.get_general_coords(color), scan(g, color))
+        copy = g.clone()
+        while g.undo_move():
+            self.assertEqual(g.get_general_coords('Red'), scan(g, 'Red'))
+        self.assertEqual(copy.get_general_coords('Blue'), scan(copy, 'Blue'))
+        g = board_with((GENERAL, 'Red', 3, 0))
+        self.assertEqual((g.get_general_coords('Red'), g.get_general_coords('Blue')), ([3, 0], None))
+
+    def test_cache_is_not_pickled(self):
+        """CACHE: pickled games leave their cache behind"""
+        import pickle
+        from janggi_cache import PositionCache
+        g = JanggiGame(sink=None)
+        g.set_cache(PositionCache())
+        self.assertIsNone(pickle.loads(pickle.dumps(g)).get_cache())
+        self.assertIs(g.clone().get_cache(), g.get_cache())
+
+    def test_eval_cache_slots(self):
+        """CACHE: evaluations share a slot by the low bits of their key, the newest one kept"""
+        from janggi_cache import EvalCache
+        self.assertRaises(ValueError, EvalCache, 12)
+        cache = EvalCache(4)
+        self.assertIsNone(cache.get(5))
+        cache.put(5, -7)
+        self.assertEqual(cache.get(5), -7)
+        cache.put(9, 3)  # same slot as 5
+        self.assertIsNone(cache.get(5))
+        self.assertEqual(cache.get(9), 3)
+        stats = cache.get_stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['replacements'], stats['entries']), (2, 2, 1, 1))
+        self.assertEqual(stats['hit_rate'], 0.5)
+
+    def test_search_with_eval_cache(self):
+        """CACHE: a search keeping its evaluations scores the same, and a second search finds them cached"""
+        import random
+        from janggi_cache import EvalCache
+        from janggi_search import Searcher
+        g = JanggiGame(sink=None)
+        g.make_move('c7', 'c6')
+        cache = EvalCache()
+        score = Searcher(2, random.Random(1)).search(g)[1]
+        self.assertEqual(Searcher(2, random.Random(1), eval_cache=cache).search(g)[1], score)
+        misses = cache.get_stats()['misses']
+        self.assertEqual(Searcher(2, random.Random(1), eval_cache=cache).search(g)[1], score)
+        self.assertEqual(cache.get_stats()['misses'], misses)
+        self.assertGreater(cache.get_stats()['hits'], 0)
+
+
+class TestPackedMoves(unittest.TestCase):
+    def test_codecs(self):
+        """MOVES: moves pack into 16 bits and back, passes included"""
+        from janggi_moves import (PASS_MOVE, encode_move, decode_move, encode_moves, decode_moves, pack_move,
+                                  MOVE_COORDINATES)
+        self.assertEqual(encode_move('a1', 'i10'), 89)
+        self.assertEqual(encode_move('c7', 'c6'), (6 * 9 + 2) * 90 + 5 * 9 + 2)
+        self.assertEqual(pack_move(2, 6, 2, 5), encode_move('c7', 'c6'))
+        self.assertEqual(MOVE_COORDINATES[encode_move('c7', 'c6')], (2, 6, 2, 5))
+        self.assertEqual(encode_move('e9', 'e9'), PASS_MOVE)
+        moves = encode_moves([('a1', 'i10'), ('c7', 'c6'), ('e9', 'e9')])
+        self.assertEqual(moves.typecode, 'H')
+        self.assertEqual(decode_moves(moves), [('a1', 'i10'), ('c7', 'c6'), ('pass', 'pass')])
+        self.assertEqual(decode_move(encode_move('i10', 'a1')), ('i10', 'a1'))
+
+    def test_packed_move_lists(self):
+        """MOVES: packed move lists hold the legal moves in order, in a buffer reused across positions"""
+        from janggi_moves import MoveBuffers, decode_moves, encode_moves, make_packed_move
+        g = JanggiGame(sink=None)
+        buffers = MoveBuffers()
+        buffer = buffers.get(0)
+        for source, destination in RED_WON_MOVES[:20]:
+            moves = g.generate_packed_moves(buffer)
+            self.assertIs(moves, buffer)
+            self.assertEqual(decode_moves(moves), g.generate_legal_moves())
+            self.assertTrue(make_packed_move(g, encode_moves([(source, destination)])[0]))
+        self.assertIs(buffers.get(0), buffer)
+        self.assertEqual(len(buffer), 0)
+        general = g.get_algebraic(*g.get_general_coords(g.get_turn()))
+        self.assertTrue(make_packed_move(g, encode_moves([('pass', 'pass')])[0]))
+        self.assertEqual(g.get_moves()[-1], (general, general))
+
+    def test_packed_games_can_be_archived(self):
+        """MOVES: games played with packed moves, passes included, write to game records that read back"""
+        import io
+        from janggi_moves import PASS_MOVE, encode_move, make_packed_move
+        from janggi_records import GameRecord, read_records, write_records
+        g = JanggiGame(sink=None)
+        for move in (encode_move('c7', 'c6'), PASS_MOVE, PASS_MOVE, encode_move('c4', 'c5')):
+            self.assertTrue(make_packed_move(g, move))
+        stream = io.StringIO()
+        write_records(stream, [GameRecord({}, g.get_moves())])
+        records = list(read_records(io.StringIO(stream.getvalue())))
+        self.assertEqual(records[0].get_moves(), [('c7', 'c6'), ('e2', 'e2'), ('e9', 'e9'), ('c4', 'c5')])
+
+
+class TestStaticExchange(unittest.TestCase):
+    def test_recaptures(self):
+        """EXCHANGE: captures are resolved least valuable attacker first, and either side may stop"""
+        from janggi_pieces import HORSE, CHARIOT, CANNON, SOLDIER
+        from janggi_search import static_exchange, square_exchange
+        from janggi_zobrist import position_hash
+        # a Blue horse guarded by a soldier, attacked down the file by a Red chariot and a cannon screened by it
+        g = board_with((HORSE, 'Blue', 4, 5), (SOLDIER, 'Blue', 4, 6), (CHARIOT, 'Red', 4, 2), (CANNON, 'Red', 4, 0))
+        before = (dict(g.get_board()), g.get_position_hash())
+        # the chariot leaving the file takes the cannon's screen with it, so the soldier wins the chariot for a horse
+        self.assertEqual(static_exchange(g, 4, 2, 4, 5), 5 - 13)
+        # the cannon takes first: the soldier takes it and the chariot takes the soldier back
+        self.assertEqual(static_exchange(g, 4, 0, 4, 5), 0)
+        self.assertEqual(square_exchange(g, 4, 5, 1), 0)
+        self.assertEqual((g.get_board(), g.get_position_hash()), before)
+        self.assertEqual(g.get_position_hash(), position_hash(g))
+
+    def test_cannons_do_not_take_cannons(self):
+        """EXCHANGE: a Cannon is never counted as a recapture on a Cannon"""
+        from janggi_pieces import CHARIOT, CANNON, SOLDIER, get_piece
+        from janggi_search import static_exchange
+        # the Red chariot takes a Blue cannon guarded only by a screened Blue cannon
+        g = board_with((CANNON, 'Blue', 4, 5), (SOLDIER, 'Blue', 4, 7), (CANNON, 'Blue', 4, 9), (CHARIOT, 'Red', 4, 2))
+        self.assertEqual(static_exchange(g, 4, 2, 4, 5), 7 - 13)
+        g.set_piece_by_coordinate(4, 2, None)
+        g.set_piece_by_coordinate(0, 5, get_piece(CANNON, 'Red'))
+        g.set_piece_by_coordinate(2, 5, get_piece(SOLDIER, 'Red'))
+        self.assertEqual(list(g.generate_attackers(4, 5, 1)), [])
+
+
+class TestSelectiveSearch(unittest.TestCase):
+    def test_selective_search_finds_the_checkmate(self):
+        """SEARCH: with each part of the selective search on, the mate in one is still found and the game left alone"""
+        import random
+        from janggi_search import SELECTIVE, Searcher, MATE_SCORE
+        g = JanggiGame(sink=None)
+        for source, destination in RED_WON_MOVES[:-1]:
+            g.make_move(source, destination)
+        before = g.get_position_hash()
+        self.assertEqual(Searcher(depth=3).get_selective(), ())
+        for selective in [(name,) for name in SELECTIVE] + [SELECTIVE]:
+            searcher = Searcher(3, random.Random(1), **dict.fromkeys(selective, True))
+            self.assertEqual(searcher.get_selective(), selective)
+            move, score = searcher.search(g)
+            self.assertEqual(score, MATE_SCORE - 1)
+            self.assertEqual(g.get_position_hash(), before)
+
+    def test_selective_search_visits_fewer_nodes(self):
+        """SEARCH: a selective search of the opening visits fewer positions than the full search"""
+        import random
+        from janggi_search import SELECTIVE, Searcher
+        g = JanggiGame(sink=None)
+        full = Searcher(3, random.Random(1))
+        full.search(g)
+        selective = Searcher(3, random.Random(1), **dict.fromkeys(SELECTIVE, True))
+        selective.search(g)
+        stats = selective.get_stats()
+        self.assertLess(stats['nodes'], full.get_nodes())
+        self.assertGreater(stats['reduced'] + stats['futile'], 0)
+        self.assertEqual(full.get_stats()['futile'], 0)
+
+    def test_engine_match_headers(self):
+        """SELF-PLAY: engines with different selective search can play each other, as named in the headers"""
+        from janggi_self_play import play_game
+        number, record, samples = play_game(1, 5, 'engine', depth=1, max_plies=8, red_selective=('futility',))
+        self.assertEqual((record.get_headers()['Blue'], record.get_headers()['Red']), ('engine', 'engine+futility'))
+        self.assertEqual(len(record.get_moves()), 8)
+
+
+@unittest.skipIf(numpy is None, 'numpy is not installed')
+class TestNNUE(unittest.TestCase):
+    def random_network(self, seed=1):
+        from janggi_nnue import HIDDEN, INPUTS, Network
+        weights = numpy.random.default_rng(seed)
+        return Network(weights.integers(-64, 64, (INPUTS, HIDDEN)), weights.integers(-64, 64, HIDDEN),
+                       weights.integers(-64, 64, 2 * HIDDEN), 5, 1 / 64)
+
+    def test_material_network_matches_evaluate(self):
+        """NNUE: the material network scores every position of a game like the handcrafted evaluation"""
+        from janggi_nnue import material_network
+        from janggi_search import evaluate
+        network = material_network()
+        for g in red_won_positions():
+            self.assertEqual(network.evaluate(g), evaluate(g))
+
+    def test_accumulators_follow_moves(self):
+        """NNUE: accumulators kept through moves, captures, passes, undos and clones match ones summed afresh"""
+        network = self.random_network()
+        g = JanggiGame(sink=None)
+        network.attach(g)
+        for source, destination in RED_WON_MOVES[:10] + [('e9', 'e9')] + RED_WON_MOVES[10:]:
+            g.make_move(source, destination)
+            self.assertTrue((g.get_accumulator().get_values() == network.accumulate(g)).all())
+        copy = g.clone()
+        while g.undo_move():
+            self.assertTrue((g.get_accumulator().get_values() == network.accumulate(g)).all())
+        self.assertEqual(network.evaluate(copy), network.evaluate(copy.clone()))
+        self.assertTrue((copy.get_accumulator().get_values() == network.accumulate(copy)).all())
+        fresh = JanggiGame(sink=None)
+        self.assertEqual(network.evaluate(g), network.evaluate(fresh))
+
+    def test_weights_file_round_trip(self):
+        """NNUE: networks are saved to and loaded from a binary file, which is checked on loading"""
+        import os
+        import tempfile
+        from janggi_nnue import load_network, save_network
+        network = self.random_network(2)
+        g = JanggiGame(sink=None)
+        g.make_move('c7', 'c6')
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'janggi.nnue')
+            save_network(network, path)
+            loaded = load_network(path)
+            self.assertEqual(loaded.get_hidden(), network.get_hidden())
+            self.assertEqual(loaded.evaluate(g), network.evaluate(g))
+            with open(path, 'r+b') as stream:
+                stream.truncate(100)
+            self.assertRaises(ValueError, load_network, path)
+
+    def test_search_with_network(self):
+        """NNUE: a search evaluating with the material network through kept accumulators finds the same mate"""
+        import random
+        from janggi_nnue import material_network
+        from janggi_search import Searcher, MATE_SCORE
+        network = material_network()
+        g = JanggiGame(sink=None)
+        for source, destination in RED_WON_MOVES[:-1]:
+            g.make_move(source, destination)
+        network.attach(g)
+        move, score = Searcher(3, random.Random(1), evaluator=network.evaluate).search(g)
+        self.assertEqual(score, MATE_SCORE - 1)
+        self.assertTrue((g.get_accumulator().get_values() == network.accumulate(g)).all())